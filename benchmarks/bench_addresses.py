@@ -0,0 +1,121 @@
+# bench_addresses.py
+"""
+Compares the size of a /chain payload, the time it takes to encode it as
+JSON and the time it takes to compute the Merkle root of every block's
+transactions, for the legacy address format (hex-encoded PEM public key) and
+the compact one (hash of the compressed public key, with the key carried once
+per transaction in its `public_key` field). Block hashes cover only headers,
+which hold no addresses, so they are not timed.
+
+Run from the repository root:
+
+    python benchmarks/bench_addresses.py -b 200 -t 20
+"""
+
+import json
+import random
+import time
+from argparse import ArgumentParser
+
+from cryptography.hazmat.primitives import serialization
+
+from simple_blockchain.merkle import merkle_root
+from simple_blockchain.wallet import Wallet
+
+
+def legacy_address(wallet: Wallet) -> str:
+    """The address a wallet had before compact addresses."""
+    return wallet.public_key.public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo,
+    ).hex()
+
+
+def build_chain(wallets: list, blocks: int, per_block: int, compact: bool) -> list:
+    """Builds a chain of blocks full of signed transactions between `wallets`."""
+    rng = random.Random(42)
+    chain = []
+    for index in range(1, blocks + 1):
+        transactions = []
+        for _ in range(per_block):
+            sender, recipient = rng.sample(wallets, 2)
+            transaction_data = {
+                "sender": sender.address if compact else legacy_address(sender),
+                "recipient": (
+                    recipient.address if compact else legacy_address(recipient)
+                ),
+                "amount": round(rng.uniform(0.1, 10.0), 4),
+                "fee": round(rng.uniform(0.001, 0.1), 4),
+            }
+            signature = sender.sign(json.dumps(transaction_data, sort_keys=True))
+            transaction = {**transaction_data, "signature": signature}
+            if compact:
+                transaction["public_key"] = sender.public_key_hex
+            transactions.append(transaction)
+        chain.append(
+            {
+                "index": index,
+                "timestamp": 1_700_000_000.0 + index,
+                "transactions": transactions,
+                "proof": rng.randrange(1 << 20),
+                "previous_hash": "ab" * 32,
+            }
+        )
+    return chain
+
+
+def measure(chain: list, repeat: int) -> tuple:
+    """
+    :return: (/chain payload bytes, seconds to encode it, seconds to compute
+        every block's Merkle root)
+    """
+    data = {"chain": chain, "length": len(chain)}
+    payload = len(json.dumps(data))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        json.dumps(data)
+    encode = (time.perf_counter() - start) / repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for block in chain:
+            merkle_root(block["transactions"])
+    return payload, encode, (time.perf_counter() - start) / repeat
+
+
+def main(blocks: int, per_block: int, senders: int, repeat: int):
+    wallets = [Wallet() for _ in range(senders)]
+    print(f"{blocks:,} blocks of {per_block} transactions between {senders} wallets")
+    print(f"{'format':>8} {'payload':>12} {'encode':>10} {'merkle':>10}")
+    results = {}
+    for name, compact in (("legacy", False), ("compact", True)):
+        payload, encode, merkle = measure(
+            build_chain(wallets, blocks, per_block, compact), repeat
+        )
+        results[name] = payload, encode, merkle
+        print(
+            f"{name:>8} {payload:>12,} {encode * 1000:>8.1f}ms {merkle * 1000:>8.1f}ms"
+        )
+
+    old, new = results["legacy"], results["compact"]
+    print(
+        f"compact addresses: {1 - new[0] / old[0]:.0%} smaller payload, "
+        f"{old[1] / new[1]:.2f}x faster encoding, "
+        f"{old[2] / new[2]:.2f}x faster Merkle roots"
+    )
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Benchmark legacy vs compact addresses.")
+    parser.add_argument("-b", "--blocks", default=200, type=int, help="Blocks.")
+    parser.add_argument(
+        "-t", "--transactions", default=20, type=int, help="Transactions per block."
+    )
+    parser.add_argument(
+        "-s", "--senders", default=20, type=int, help="Number of distinct wallets."
+    )
+    parser.add_argument(
+        "-r", "--repeat", default=5, type=int, help="Timing passes to average."
+    )
+    args = parser.parse_args()
+
+    main(args.blocks, args.transactions, args.senders, args.repeat)
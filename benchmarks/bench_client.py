@@ -0,0 +1,95 @@
+# bench_client.py
+"""
+Measures request latency against a running node with a fresh connection per
+request (bare requests.get/requests.post, as the client scripts used to do)
+and over a pooled keep-alive NodeSession. Each pass alternates GET
+/chain/length and POST /transactions/new (rejected duplicates, so the
+mempool does not grow), the two calls peers and wallets make most often.
+
+Run from the repository root:
+
+    python benchmarks/bench_client.py -n 500
+"""
+
+import json
+import time
+from argparse import ArgumentParser
+
+import requests
+
+from bench_server import free_port, start
+from simple_blockchain.client import NodeSession
+from simple_blockchain.wallet import Wallet
+
+
+def signed_transaction() -> dict:
+    sender, recipient = Wallet(), Wallet()
+    transaction_data = {
+        "sender": sender.address,
+        "recipient": recipient.address,
+        "amount": 1.0,
+        "fee": 0.01,
+    }
+    signature = sender.sign(json.dumps(transaction_data, sort_keys=True))
+    return {
+        **transaction_data,
+        "signature": signature,
+        "public_key": sender.public_key_hex,
+    }
+
+
+def measure(client, url: str, transaction: dict, requests_count: int) -> list:
+    """:return: The latency of every request, sorted"""
+    latencies = []
+    for i in range(requests_count):
+        began = time.perf_counter()
+        if i % 2:
+            client.post(f"{url}/transactions/new", json=transaction, timeout=5)
+        else:
+            client.get(f"{url}/chain/length", timeout=5)
+        latencies.append(time.perf_counter() - began)
+    return sorted(latencies)
+
+
+def main(requests_count: int, module: str):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    process = start(module, port)
+    try:
+        transaction = signed_transaction()
+        requests.post(f"{url}/transactions/new", json=transaction, timeout=5)
+
+        print(f"{requests_count:,} requests to {module}")
+        print(f"{'client':>10} {'mean':>9} {'p50':>9} {'p99':>9}")
+        results = {}
+        with NodeSession() as session:
+            for name, client in (("unpooled", requests), ("pooled", session)):
+                latencies = measure(client, url, transaction, requests_count)
+                mean = sum(latencies) / len(latencies)
+                results[name] = mean
+                print(
+                    f"{name:>10} {mean * 1000:>7.2f}ms "
+                    f"{latencies[len(latencies) // 2] * 1000:>7.2f}ms "
+                    f"{latencies[int(len(latencies) * 0.99)] * 1000:>7.2f}ms"
+                )
+        print(f"pooling: {results['unpooled'] / results['pooled']:.2f}x lower latency")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Benchmark pooled vs unpooled requests.")
+    parser.add_argument(
+        "-n", "--requests", default=500, type=int, help="Requests per client."
+    )
+    parser.add_argument(
+        "-m",
+        "--module",
+        default="simple_blockchain.blockchain",
+        choices=["simple_blockchain.blockchain", "simple_blockchain.async_node"],
+        help="Node server to run.",
+    )
+    args = parser.parse_args()
+
+    main(args.requests, args.module)
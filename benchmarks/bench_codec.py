@@ -0,0 +1,99 @@
+# bench_codec.py
+"""
+Compares the canonical binary block encoding (codec.py) with the JSON path
+it replaced (json.dumps with sorted keys): encoded size, encode, decode and
+hash time per block of signed transactions.
+
+Run from the repository root:
+
+    python benchmarks/bench_codec.py -b 500 -t 20
+"""
+
+import hashlib
+import json
+import random
+import time
+from argparse import ArgumentParser
+
+from simple_blockchain import codec
+from simple_blockchain.wallet import Wallet
+
+
+def build_blocks(count: int, per_block: int, senders: int) -> list:
+    """Builds blocks full of signed transactions between a pool of wallets."""
+    wallets = [Wallet() for _ in range(senders)]
+    blocks = []
+    for index in range(1, count + 1):
+        transactions = []
+        for _ in range(per_block):
+            sender, recipient = random.sample(wallets, 2)
+            transaction_data = {
+                "sender": sender.address,
+                "recipient": recipient.address,
+                "amount": round(random.uniform(0.1, 10.0), 4),
+                "fee": round(random.uniform(0.001, 0.1), 4),
+            }
+            signature = sender.sign(json.dumps(transaction_data, sort_keys=True))
+            transactions.append(
+                {
+                    **transaction_data,
+                    "signature": signature,
+                    "public_key": sender.public_key_hex,
+                }
+            )
+        blocks.append(
+            {
+                "index": index,
+                "timestamp": time.time(),
+                "transactions": transactions,
+                "proof": random.randrange(1 << 20),
+                "previous_hash": "%064x" % random.getrandbits(256),
+            }
+        )
+    return blocks
+
+
+def per_block(function, items: list) -> float:
+    """Average microseconds `function` takes per item."""
+    start = time.perf_counter()
+    for item in items:
+        function(item)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+
+def json_encode(block: dict) -> bytes:
+    return json.dumps(block, sort_keys=True).encode()
+
+
+def main(count: int, transactions: int, senders: int):
+    print(f"Signing {count:,} blocks of {transactions} transactions...")
+    blocks = build_blocks(count, transactions, senders)
+
+    print(f"{'format':>8} {'bytes':>8} {'encode':>10} {'decode':>10} {'hash':>10}")
+    for name, encode, decode in (
+        ("json", json_encode, json.loads),
+        ("binary", codec.encode, codec.decode),
+    ):
+        encoded = [encode(block) for block in blocks]
+        size = sum(map(len, encoded)) / count
+        encode_time = per_block(encode, blocks)
+        decode_time = per_block(decode, encoded)
+        hash_time = per_block(lambda b: hashlib.sha256(encode(b)).hexdigest(), blocks)
+        print(
+            f"{name:>8} {size:>8,.0f} {encode_time:>8.1f}us {decode_time:>8.1f}us "
+            f"{hash_time:>8.1f}us"
+        )
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Benchmark binary vs JSON block encoding.")
+    parser.add_argument("-b", "--blocks", default=500, type=int, help="Blocks.")
+    parser.add_argument(
+        "-t", "--transactions", default=20, type=int, help="Transactions per block."
+    )
+    parser.add_argument(
+        "-s", "--senders", default=50, type=int, help="Number of distinct wallets."
+    )
+    args = parser.parse_args()
+
+    main(args.blocks, args.transactions, args.senders)
@@ -0,0 +1,58 @@
+# bench_hashing.py
+"""
+Compares the hashes/second of the original proof-of-work inner loop
+(format, encode, new sha256, hexdigest) with the midstate search used by
+Blockchain.proof_of_work.
+
+Run from the repository root:
+
+    python benchmarks/bench_hashing.py -n 500000
+"""
+
+import time
+from argparse import ArgumentParser
+
+from simple_blockchain.blockchain import Blockchain
+from simple_blockchain.mining import search_proof
+
+LAST_PROOF = 35293
+LAST_HASH = "ab" * 32
+
+
+def naive_loop(count: int) -> None:
+    """The inner loop of proof_of_work before the midstate optimisation."""
+    for proof in range(count):
+        Blockchain.validate_proof(LAST_PROOF, proof, LAST_HASH)
+
+
+def midstate_loop(count: int) -> None:
+    """The same nonces, scanned by search_proof (which stops at the first hit)."""
+    start = 0
+    while start < count:
+        proof = search_proof(LAST_PROOF, LAST_HASH, start, count)
+        start = count if proof is None else proof + 1
+
+
+def rate(loop, count: int) -> float:
+    start = time.perf_counter()
+    loop(count)
+    return count / (time.perf_counter() - start)
+
+
+def main(count: int):
+    naive = rate(naive_loop, count)
+    midstate = rate(midstate_loop, count)
+    print(f"{'loop':>10} {'hashes/s':>14}")
+    print(f"{'naive':>10} {naive:>14,.0f}")
+    print(f"{'midstate':>10} {midstate:>14,.0f}")
+    print(f"speedup: {midstate / naive:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Benchmark the proof-of-work inner loop.")
+    parser.add_argument(
+        "-n", "--count", default=500_000, type=int, help="Nonces to hash per loop."
+    )
+    args = parser.parse_args()
+
+    main(args.count)
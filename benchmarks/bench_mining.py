@@ -0,0 +1,58 @@
+# bench_mining.py
+"""
+Measures proof-of-work throughput (hashes/second) of the parallel mining
+engine for an increasing number of worker processes.
+
+Run from the repository root:
+
+    python benchmarks/bench_mining.py --rounds 5
+"""
+
+import os
+import random
+import time
+from argparse import ArgumentParser
+
+from simple_blockchain.mining import parallel_proof_of_work
+
+
+def measure(workers: int, rounds: int) -> float:
+    """Mines `rounds` proofs over random previous hashes and returns hashes/second."""
+    rng = random.Random(workers)
+    total_hashes = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        last_proof = rng.randrange(1_000_000)
+        last_hash = "%064x" % rng.getrandbits(256)
+        _, hashes = parallel_proof_of_work(last_proof, last_hash, workers=workers)
+        total_hashes += hashes
+    elapsed = time.perf_counter() - start
+    return total_hashes / elapsed
+
+
+def main(max_workers: int, rounds: int):
+    print(f"{'workers':>8} {'hashes/s':>14} {'speedup':>8}")
+    baseline = None
+    workers = 1
+    while workers <= max_workers:
+        rate = measure(workers, rounds)
+        baseline = baseline or rate
+        print(f"{workers:>8} {rate:>14,.0f} {rate / baseline:>7.2f}x")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Benchmark the parallel proof-of-work engine.")
+    parser.add_argument(
+        "-w",
+        "--max-workers",
+        default=os.cpu_count() or 1,
+        type=int,
+        help="Largest worker count to measure (doubles from 1).",
+    )
+    parser.add_argument(
+        "-r", "--rounds", default=5, type=int, help="Proofs to mine per worker count."
+    )
+    args = parser.parse_args()
+
+    main(args.max_workers, args.rounds)
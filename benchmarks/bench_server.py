@@ -0,0 +1,147 @@
+# bench_server.py
+"""
+Load-tests the Flask node and the asyncio node (async_node) side by side: each
+server is started in its own process and hit by a fixed number of concurrent
+keep-alive clients requesting GET /chain/length and GET /chain/headers, which
+is the traffic a node sees from peers polling it. Reports requests per second
+and p50/p99 latency for every concurrency level.
+
+Run from the repository root:
+
+    python benchmarks/bench_server.py -c 10 100 1000 -d 5
+"""
+
+import asyncio
+import resource
+import socket
+import subprocess
+import sys
+import time
+from argparse import ArgumentParser
+
+SERVERS = {
+    "flask": "simple_blockchain.blockchain",
+    "asyncio": "simple_blockchain.async_node",
+}
+PATHS = (b"/chain/length", b"/chain/headers")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start(module: str, port: int) -> subprocess.Popen:
+    """Starts a node process and waits until it accepts connections."""
+    process = subprocess.Popen(
+        [sys.executable, "-m", module, "-p", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{module} did not start")
+
+
+async def client(port: int, stop: float, latencies: list, errors: list) -> None:
+    """Sends requests over one keep-alive connection until `stop`."""
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    except OSError:
+        errors.append(1)
+        return
+    sent = 0
+    try:
+        while time.monotonic() < stop:
+            path = PATHS[sent % len(PATHS)]
+            sent += 1
+            began = time.perf_counter()
+            writer.write(b"GET " + path + b" HTTP/1.1\r\nHost: bench\r\n\r\n")
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                name, _, value = line.partition(b":")
+                if name.lower() == b"content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - began)
+            if b"connection: close" in head.lower():
+                break
+    except (OSError, asyncio.IncompleteReadError):
+        errors.append(1)
+    finally:
+        writer.close()
+
+
+async def load(port: int, concurrency: int, duration: float) -> tuple:
+    """:return: (latencies of completed requests, failed connections)"""
+    latencies, errors = [], []
+    stop = time.monotonic() + duration
+    await asyncio.gather(
+        *(client(port, stop, latencies, errors) for _ in range(concurrency))
+    )
+    return latencies, len(errors)
+
+
+def percentile(values: list, fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main(concurrency: list, duration: float):
+    # Each client holds a socket open; raise the descriptor limit to allow it
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = max(concurrency) * 2 + 64
+    if soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(wanted, hard), hard))
+
+    print(
+        f"{'server':>8} {'clients':>8} {'req/s':>9} {'p50':>9} {'p99':>9} "
+        f"{'errors':>7}"
+    )
+    for name, module in SERVERS.items():
+        port = free_port()
+        process = start(module, port)
+        try:
+            for clients in concurrency:
+                began = time.perf_counter()
+                latencies, errors = asyncio.run(load(port, clients, duration))
+                elapsed = time.perf_counter() - began
+                latencies.sort()
+                if not latencies:
+                    print(
+                        f"{name:>8} {clients:>8} {'-':>9} {'-':>9} {'-':>9} {errors:>7}"
+                    )
+                    continue
+                print(
+                    f"{name:>8} {clients:>8} {len(latencies) / elapsed:>9,.0f} "
+                    f"{percentile(latencies, 0.5) * 1000:>7.1f}ms "
+                    f"{percentile(latencies, 0.99) * 1000:>7.1f}ms {errors:>7}"
+                )
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Benchmark the Flask vs asyncio node.")
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        nargs="+",
+        default=[10, 100, 1000],
+        type=int,
+        help="Numbers of concurrent clients to test.",
+    )
+    parser.add_argument(
+        "-d", "--duration", default=5.0, type=float, help="Seconds per level."
+    )
+    args = parser.parse_args()
+
+    main(args.concurrency, args.duration)
@@ -0,0 +1,108 @@
+# bench_store.py
+"""
+Measures node startup time from the on-disk block store.
+
+A chain of --blocks synthetic blocks is written to a temporary store and
+replayed with a trusted restart (checkpoint hash only). Full revalidation
+needs real proofs, so it is measured on a short mined chain of
+--validate-blocks blocks and extrapolated per block.
+
+Run from the repository root:
+
+    python benchmarks/bench_store.py --blocks 100000
+"""
+
+import tempfile
+import time
+from argparse import ArgumentParser
+
+from simple_blockchain.blockchain import Blockchain
+from simple_blockchain.merkle import merkle_root
+from simple_blockchain.mining import DIFFICULTY_BITS
+from simple_blockchain.storage import BlockStore
+
+
+def synthetic_block(index: int, previous_hash: str) -> dict:
+    """A block shaped like a mined one: a reward plus two transfers."""
+    transactions = [
+        {
+            "sender": "0",
+            "recipient": "miner",
+            "amount": 1.02,
+            "fee": 0,
+            "signature": "0",
+        }
+    ] + [
+        {
+            "sender": f"{index:064x}",
+            "recipient": f"{index + n:064x}",
+            "amount": 1.5,
+            "fee": 0.01,
+            "signature": "ab" * 70,
+        }
+        for n in range(2)
+    ]
+    return {
+        "index": index,
+        "timestamp": time.time(),
+        "transactions": transactions,
+        "proof": index,
+        "previous_hash": previous_hash,
+        "merkle_root": merkle_root(transactions),
+        "difficulty": DIFFICULTY_BITS,
+    }
+
+
+def trusted_restart(count: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        store = BlockStore(directory)
+        previous_hash = "1"
+        start = time.perf_counter()
+        for index in range(1, count + 1):
+            block = synthetic_block(index, previous_hash)
+            previous_hash = Blockchain.hash(block)
+            store.append(block, previous_hash)
+        store.write_checkpoint(count, previous_hash)
+        store.close()
+        print(f"wrote {count:,} blocks in {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        blockchain = Blockchain(store=BlockStore(directory), trusted_restart=True)
+        elapsed = time.perf_counter() - start
+        assert len(blockchain.chain) == count
+        print(f"trusted restart of {count:,} blocks: {elapsed:.2f}s")
+
+
+def validating_restart(count: int, extrapolate_to: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        blockchain = Blockchain(store=BlockStore(directory))
+        for _ in range(count - 1):
+            last_block = blockchain.last_block
+            blockchain.new_block(blockchain.proof_of_work(last_block), [])
+        blockchain.store.close()
+
+        start = time.perf_counter()
+        Blockchain(store=BlockStore(directory))
+        elapsed = time.perf_counter() - start
+        per_block = elapsed / count
+        print(
+            f"validating restart of {count:,} blocks: {elapsed:.3f}s "
+            f"(~{per_block * extrapolate_to:.2f}s for {extrapolate_to:,})"
+        )
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Benchmark restarting a node from disk.")
+    parser.add_argument(
+        "-n", "--blocks", default=100_000, type=int, help="Blocks in the chain."
+    )
+    parser.add_argument(
+        "--validate-blocks",
+        default=100,
+        type=int,
+        help="Mined blocks used to measure full revalidation.",
+    )
+    args = parser.parse_args()
+
+    trusted_restart(args.blocks)
+    validating_restart(args.validate_blocks, args.blocks)
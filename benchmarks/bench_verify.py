@@ -0,0 +1,86 @@
+# bench_verify.py
+"""
+Measures how many signed transactions per second a node accepts through
+Blockchain.new_transactions (the /transactions/batch path) when signature
+verification is spread over 1, 2, 4 and 8 worker processes.
+
+Run from the repository root:
+
+    python benchmarks/bench_verify.py -n 4000
+"""
+
+import json
+import random
+import time
+from argparse import ArgumentParser
+
+from simple_blockchain.blockchain import Blockchain
+from simple_blockchain.wallet import Wallet
+
+
+def signed_batch(count: int, senders: int) -> list:
+    """Pre-signs `count` transactions between a pool of wallets."""
+    wallets = [Wallet() for _ in range(senders)]
+    batch = []
+    for _ in range(count):
+        sender, recipient = random.sample(wallets, 2)
+        transaction_data = {
+            "sender": sender.address,
+            "recipient": recipient.address,
+            "amount": round(random.uniform(0.1, 10.0), 4),
+            "fee": round(random.uniform(0.001, 0.1), 4),
+        }
+        signature = sender.sign(json.dumps(transaction_data, sort_keys=True))
+        batch.append(
+            {
+                **transaction_data,
+                "signature": signature,
+                "public_key": sender.public_key_hex,
+            }
+        )
+    return batch
+
+
+def main(count: int, senders: int, batch_size: int):
+    print(f"Signing {count:,} transactions from {senders} senders...")
+    transactions = signed_batch(count, senders)
+
+    print(f"{'workers':>8} {'accepted/s':>12} {'speedup':>8}")
+    baseline = None
+    for workers in (1, 2, 4, 8):
+        # Fund every sender so no transaction is rejected for overspending
+        blockchain = Blockchain(verify_workers=workers, initial_balance=float(count))
+        try:
+            # Warm up the worker processes before timing
+            blockchain.new_transactions(transactions[:batch_size])
+            blockchain.mempool.clear()
+
+            start = time.perf_counter()
+            accepted = 0
+            for first in range(0, count, batch_size):
+                results = blockchain.new_transactions(
+                    transactions[first : first + batch_size]
+                )
+                accepted += sum(index != -1 for index, _ in results)
+            rate = accepted / (time.perf_counter() - start)
+        finally:
+            blockchain.close()
+
+        baseline = baseline or rate
+        print(f"{workers:>8} {rate:>12,.0f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Benchmark batch signature verification.")
+    parser.add_argument(
+        "-n", "--count", default=4000, type=int, help="Transactions per run."
+    )
+    parser.add_argument(
+        "-s", "--senders", default=50, type=int, help="Number of distinct senders."
+    )
+    parser.add_argument(
+        "-b", "--batch-size", default=500, type=int, help="Transactions per batch."
+    )
+    args = parser.parse_args()
+
+    main(args.count, args.senders, args.batch_size)
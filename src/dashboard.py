@@ -2,6 +2,7 @@ import streamlit as st
 import requests
 import json
 import time
+from simple_blockchain.client import NodeSession
 from simple_blockchain.wallet import Wallet
 
 # --- Page Configuration ---
@@ -14,21 +15,36 @@ st.set_page_config(
 # --- Helper Functions to Interact with the Node API ---
 
 
+@st.cache_resource
+def node_session():
+    """One pooled keep-alive session to the nodes, kept across Streamlit reruns."""
+    return NodeSession()
+
+
 def get_node_status(node_url):
     """Checks if the node is online."""
     try:
-        response = requests.get(f"{node_url}/chain", timeout=2)
+        response = node_session().get(f"{node_url}/chain", timeout=2)
         return response.status_code == 200
     except requests.exceptions.RequestException:
         return False
 
 
 def get_node_chain(node_url):
-    """Fetches the full chain from a node."""
+    """
+    Fetches the full chain from a node. The last copy is kept in the session
+    with its ETag, so an unchanged chain is not downloaded again.
+    """
+    cache = st.session_state.setdefault("chain_cache", {})
+    etag, chain = cache.get(node_url, (None, None))
     try:
-        response = requests.get(f"{node_url}/chain")
-        response.raise_for_status()
-        return list(reversed(response.json()["chain"]))  # Reversed for display
+        headers = {"If-None-Match": etag} if etag else {}
+        response = node_session().get(f"{node_url}/chain", headers=headers)
+        if response.status_code != 304:
+            response.raise_for_status()
+            chain = response.json()["chain"]
+            cache[node_url] = (response.headers.get("ETag"), chain)
+        return list(reversed(chain))  # Reversed for display
     except requests.exceptions.RequestException as e:
         st.error(f"Could not connect to node at {node_url}. Error: {e}")
         return None
@@ -37,7 +53,7 @@ def get_node_chain(node_url):
 def get_pending_transactions(node_url):
     """Fetches pending transactions from the mempool."""
     try:
-        response = requests.get(f"{node_url}/transactions/pending")
+        response = node_session().get(f"{node_url}/transactions/pending")
         response.raise_for_status()
         return response.json().get("transactions", [])
     except requests.exceptions.RequestException:
@@ -54,13 +70,17 @@ def post_transaction(node_url, sender_wallet, recipient_address, amount, fee):
     }
     transaction_string = json.dumps(transaction_data, sort_keys=True)
     signature = sender_wallet.sign(transaction_string)
-    payload = {**transaction_data, "signature": signature}
+    payload = {
+        **transaction_data,
+        "signature": signature,
+        "public_key": sender_wallet.public_key_hex,
+    }
     st.session_state.last_submitted_tx = {
         "data": transaction_data, "signature": signature
     }
 
     try:
-        response = requests.post(f"{node_url}/transactions/new", json=payload)
+        response = node_session().post(f"{node_url}/transactions/new", json=payload)
         response.raise_for_status()
         st.success("Transaction submitted to the network!")
         st.balloons()
@@ -70,41 +90,63 @@ def post_transaction(node_url, sender_wallet, recipient_address, amount, fee):
         return False
 
 
-def calculate_balances(chain: list, wallets: dict) -> dict:
-    """Calculates balances by iterating through the entire blockchain."""
-    # Create a reverse lookup from address to wallet name for convenience
-    address_to_name = {wallet.address: name for name, wallet in wallets.items()}
-    balances = {name: 100.0 for name, wallet in wallets.items()}  # Airdrop 100 coins!
-
-    # get_node_chain provides a reversed list (latest block first).
-    # To calculate balances chronologically, we reverse it back to genesis block first.
-    for block in reversed(chain or []):
-        for tx in block.get("transactions", []):
-            sender_address = tx.get("sender")
-            recipient_address = tx.get("recipient")
-            amount = tx.get("amount", 0)
-            fee = tx.get("fee", 0)
-
-            # Subtract from sender's balance if they are one of our wallets
-            if sender_address in address_to_name:
-                balances[address_to_name[sender_address]] -= amount + fee
+def calculate_balances(node_url, wallets: dict) -> dict:
+    """
+    Fetches the balances of our wallets from the node, which keeps them up to
+    date as blocks are added instead of re-walking the chain on every rerun.
+    Coins already spent by pending transactions are not available.
+    """
+    try:
+        response = node_session().get(
+            f"{node_url}/balances",
+            params=[("address", wallet.address) for wallet in wallets.values()],
+        )
+        response.raise_for_status()
+        accounts = response.json()["balances"]
+    except requests.exceptions.RequestException as e:
+        st.error(f"Could not fetch balances from {node_url}. Error: {e}")
+        return {}
+    return {
+        name: accounts[wallet.address]["available"] for name, wallet in wallets.items()
+    }
 
-            # Add to recipient's balance if they are one of our wallets
-            if recipient_address in address_to_name:
-                balances[address_to_name[recipient_address]] += amount
 
-    return balances
+def get_address_history(node_url, address, limit=10):
+    """Fetches the latest confirmed transactions of an address from the node."""
+    try:
+        response = node_session().get(
+            f"{node_url}/address/{address}/transactions", params={"limit": limit}
+        )
+        response.raise_for_status()
+        return response.json()
+    except requests.exceptions.RequestException:
+        return None
 
 
 def mine_on_node(node_url):
-    """Sends a request to the node to mine a new block."""
+    """Starts a mining job on the node and polls it until the block is forged."""
     try:
+        response = node_session().get(f"{node_url}/mine")
+        response.raise_for_status()
+        status_url = f"{node_url}{response.json()['status_url']}"
+        progress = st.empty()
         with st.spinner("Mining a new block... This could take a moment."):
-            response = requests.get(f"{node_url}/mine")
-            response.raise_for_status()
+            while True:
+                status_response = node_session().get(status_url)
+                status_response.raise_for_status()
+                status = status_response.json()
+                progress.caption(
+                    f"{status['hashes']:,} hashes tried ({status['hash_rate']:,.0f} hashes/s)"
+                )
+                if status["status"] != "running":
+                    break
+                time.sleep(0.25)
+        if status["status"] != "done":
+            st.error(f"Mining failed. Error: {status['error']}")
+            return None
         st.success("Block mined successfully! ⛏️")
         st.toast("A new block was forged and added to the chain!")
-        return response.json()
+        return status["result"]
     except requests.exceptions.RequestException as e:
         st.error(f"Failed to mine. Error: {e}")
         return None
@@ -114,7 +156,8 @@ def resolve_conflicts_on_node(node_url):
     """Triggers the consensus algorithm on the node."""
     try:
         with st.spinner("Asking the node to check for longer chains from its peers..."):
-            response = requests.get(f"{node_url}/nodes/resolve")
+            # Consensus may wait up to the node's deadline on its peers
+            response = node_session().get(f"{node_url}/nodes/resolve", timeout=30)
             response.raise_for_status()
             data = response.json()
             if data.get("message") == "Our chain was replaced":
@@ -141,10 +184,7 @@ def handle_transaction_submission():
 
     if sender_name and recipient_name and amount > 0 and fee is not None:
         # Overspending Check
-        chain_for_balance = get_node_chain(node_url)
-        current_balances = calculate_balances(
-            chain_for_balance, st.session_state.wallets
-        )
+        current_balances = calculate_balances(node_url, st.session_state.wallets)
         sender_balance = current_balances.get(sender_name, 0)
         total_cost = amount + fee
 
@@ -207,7 +247,7 @@ with st.container(border=True):
     A crypto wallet doesn't store coins. Instead, it holds your **keys**. This is the foundation of self-custody.
     As the saying goes: **"Not your keys, not your coins."** By creating wallets here, *you* control the private keys, not a centralized exchange.
 
-    - **Public Key (Address):** Like your bank account number. You can share it with anyone to receive funds.
+    - **Address:** Like your bank account number. It is a short hash of your **public key**, and you can share it with anyone to receive funds.
     - **Private Key:** Like your bank account password. It's a secret key used to *sign* (authorize) transactions. **Never share it!**
 
     Let's create some wallets for this simulation. We'll give each wallet an initial "airdrop" of **100 coins** to get started.
@@ -234,8 +274,7 @@ with st.container(border=True):
         if not st.session_state.wallets:
             st.info("Create a wallet to see balances.")
         else:
-            chain_for_balance = get_node_chain(node_url)
-            balances = calculate_balances(chain_for_balance, st.session_state.wallets)
+            balances = calculate_balances(node_url, st.session_state.wallets)
             for name, balance in balances.items():
                 st.metric(label=f"{name}'s Balance", value=f"{balance:,.2f} Coins")
 
@@ -247,14 +286,30 @@ with st.container(border=True):
         )
         for name, wallet in st.session_state.wallets.items():
             with st.expander(f"Wallet: **{name}**"):
-                st.markdown(f"**Public Key (Address):**")
+                st.markdown(f"**Address:**")
                 st.code(wallet.address, language=None)
+                st.markdown(f"**Public Key:**")
+                st.code(wallet.public_key_hex, language=None)
 
                 if st.toggle("Reveal Private Key", key=f"toggle_{name}"):
                     st.markdown(f"**Private Key (Secret):**")
                     st.code(wallet.get_private_key_hex(), language=None)
                     st.warning("This is your secret key! Keep it safe.", icon="⚠️")
 
+                history = get_address_history(node_url, wallet.address)
+                if history and history["transactions"]:
+                    st.markdown(
+                        f"**Recent Transactions** ({history['total']} in total):"
+                    )
+                    for item in history["transactions"]:
+                        tx = item["transaction"]
+                        direction = (
+                            "Sent" if tx["sender"] == wallet.address else "Received"
+                        )
+                        st.caption(
+                            f"Block #{item['block_index']}: {direction} {tx['amount']:,.4f} coins"
+                        )
+
 # --- Step 2: Create a Transaction ---
 with st.container(border=True):
     st.header("Step 2: Create and Sign a Transaction")
@@ -1,10 +1,17 @@
 import requests
 import json
+from simple_blockchain.client import NodeSession
 from simple_blockchain.wallet import Wallet
 
 # --- Configuration ---
 NODE_URL = "http://127.0.0.1:5001"
 
+# Seconds to wait for /mine?wait=true to forge a block
+MINE_TIMEOUT = 120
+
+# One pooled keep-alive connection serves every request to the node
+session = NodeSession()
+
 
 def main():
     """Runs a full demonstration of the blockchain client."""
@@ -16,7 +23,9 @@ def main():
 
     print("\n--- ⛏️ Mining a block to reward the node (miner) ---")
     try:
-        mine_response = requests.get(f"{NODE_URL}/mine")
+        mine_response = session.get(
+            f"{NODE_URL}/mine", params={"wait": "true"}, timeout=MINE_TIMEOUT
+        )
         if mine_response.status_code != 200:
             print("Error: Could not connect to the node. Is it running?")
             return
@@ -46,9 +55,13 @@ def main():
     print("Transaction signed successfully.")
 
     # 3. Broadcast the transaction to the network
-    payload = {**transaction_data, "signature": signature}
+    payload = {
+        **transaction_data,
+        "signature": signature,
+        "public_key": alice_wallet.public_key_hex,
+    }
     headers = {"Content-Type": "application/json"}
-    response = requests.post(
+    response = session.post(
         f"{NODE_URL}/transactions/new", json=payload, headers=headers
     )
 
@@ -59,11 +72,11 @@ def main():
         return
 
     print("\n--- ⛏️ Mining a new block to confirm the transaction ---")
-    requests.get(f"{NODE_URL}/mine")
+    session.get(f"{NODE_URL}/mine", params={"wait": "true"}, timeout=MINE_TIMEOUT)
     print("New block mined!")
 
     print("\n--- 🔗 Verifying the final chain state ---")
-    chain_response = requests.get(f"{NODE_URL}/chain")
+    chain_response = session.get(f"{NODE_URL}/chain")
     chain = chain_response.json()["chain"]
     last_transaction = chain[-1]["transactions"][
         -1
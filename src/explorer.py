@@ -2,6 +2,7 @@ from flask import Flask, render_template_string
 import requests
 import datetime
 from argparse import ArgumentParser
+from simple_blockchain.client import NodeSession
 
 app = Flask(__name__)
 
@@ -68,15 +69,34 @@ def fromtimestamp_filter(s):
     return datetime.datetime.fromtimestamp(s).strftime("%Y-%m-%d %H:%M:%S UTC")
 
 
+# The last chain fetched from the node and its ETag, so an unchanged chain is
+# answered with 304 Not Modified instead of being downloaded again
+chain_cache = {"etag": None, "chain": None}
+
+# Keep-alive connections to the node, shared by the explorer's request threads
+session = NodeSession()
+
+
+def fetch_chain() -> list:
+    """Fetches the full chain from the node, reusing the cached copy if unchanged."""
+    headers = {}
+    if chain_cache["etag"]:
+        headers["If-None-Match"] = chain_cache["etag"]
+    response = session.get(f"{NODE_URL}/chain", headers=headers)
+    if response.status_code == 304:
+        return chain_cache["chain"]
+    response.raise_for_status()
+    chain_cache["etag"] = response.headers.get("ETag")
+    chain_cache["chain"] = response.json()["chain"]
+    return chain_cache["chain"]
+
+
 @app.route("/")
 def view_chain():
     global NODE_URL
     try:
-        response = requests.get(f"{NODE_URL}/chain")
-        response.raise_for_status()
-        chain_data = response.json()
         return render_template_string(
-            HTML_TEMPLATE, chain=chain_data["chain"], node_url=NODE_URL
+            HTML_TEMPLATE, chain=fetch_chain(), node_url=NODE_URL
         )
     except requests.exceptions.RequestException as e:
         return (
@@ -0,0 +1,779 @@
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from time import perf_counter
+from urllib.parse import parse_qsl, urlencode
+from uuid import uuid4
+
+from . import codec
+from .blockchain import (
+    MAX_BLOCKS_PER_REQUEST,
+    MAX_HEADERS_PER_REQUEST,
+    PEER_ACCEPT,
+    RETARGET_WINDOW,
+    TARGET_BLOCK_TIME,
+    TRANSACTION_FIELDS,
+    Blockchain,
+)
+from .gossip import BLOCK, FANOUT, Gossip
+from .mempool import DEFAULT_MAX_SIZE
+from .mining import DIFFICULTY_BITS, POLL_INTERVAL, MiningJob
+from .storage import BlockStore
+
+# Threads running blocking work (signature checks, consensus, shared-store
+# refreshes) off the event loop
+EXECUTOR_WORKERS = 8
+
+# Largest request head (request line and headers) and body the server accepts
+MAX_HEAD_BYTES = 64 * 1024
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+# Seconds an idle keep-alive connection is kept open
+KEEP_ALIVE_TIMEOUT = 5.0
+
+# Pending connections the listening socket queues (capped by the OS)
+BACKLOG = 4096
+
+# How many finished jobs are kept around for /mine/status lookups
+MAX_MINING_JOBS = 100
+
+MISSING_FIELDS = (
+    "Missing values (sender, recipient, amount, fee, signature are required)"
+)
+
+_REASONS = {
+    200: "OK",
+    201: "Created",
+    202: "Accepted",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    501: "Not Implemented",
+}
+
+
+def _json(data, status: int = 200) -> tuple:
+    return status, json.dumps(data).encode(), "application/json"
+
+
+def _text(text: str, status: int) -> tuple:
+    return status, text.encode(), "text/plain; charset=utf-8"
+
+
+# Sent with every response whose encoding depends on the Accept header, so
+# caches keep the JSON and binary representations apart
+VARY_ACCEPT = (b"vary", b"Accept")
+
+
+def _is_binary(accept: str) -> bool:
+    """Whether the Accept header lists the binary encoding first."""
+    return accept.startswith(codec.CONTENT_TYPE)
+
+
+def _encoded(accept: str, data, extra_headers: list = ()) -> tuple:
+    """Encodes `data` in binary if the Accept header lists it first, else as JSON."""
+    headers = [VARY_ACCEPT, *extra_headers]
+    if _is_binary(accept):
+        return 200, codec.encode(data), codec.CONTENT_TYPE, headers
+    return (*_json(data), headers)
+
+
+def _flag(query: dict, name: str) -> bool:
+    return query.get(name, "").lower() in ("1", "true", "yes")
+
+
+def _int_arg(query: dict, name: str, default: int) -> int:
+    try:
+        return int(query[name])
+    except (KeyError, ValueError):
+        return default
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header lists `etag` (weak or strong) or is '*'."""
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def _conditional(headers: dict, tag: str, build) -> tuple:
+    """
+    Like the Flask app's _conditional: answers 304 Not Modified if the client
+    already holds the representation its Accept header selects, and otherwise
+    encodes `build()`. The binary representation's ETag is `tag` with a -bin
+    suffix, so the two never share one.
+
+    :param headers: Request headers
+    :param tag: Opaque tag of the current resource state, e.g. the tip hash
+    :param build: Callable returning the response data
+    """
+    accept = headers.get("accept", "")
+    etag = f'"{tag}-bin"' if _is_binary(accept) else f'"{tag}"'
+    etag_header = (b"etag", etag.encode())
+    if _etag_matches(headers.get("if-none-match", ""), etag):
+        return 304, b"", "text/plain; charset=utf-8", [etag_header, VARY_ACCEPT]
+    return _encoded(accept, build(), [etag_header])
+
+
+async def fetch_json(node: str, path: str, params: dict = None, timeout=5.0):
+    """
+    Sends a GET request to a peer without blocking the event loop. The binary
+    encoding is preferred, falling back to JSON for peers without it.
+
+    :param node: Peer address, e.g. '192.168.0.5:5000'
+    :param path: Endpoint path, e.g. '/chain/length'
+    :param params: Optional query parameters
+    :param timeout: Seconds the whole request may take
+    :return: The decoded response
+    :raises OSError: If the peer cannot be reached
+    :raises ValueError: If the peer answers with an error or a malformed body
+    :raises asyncio.TimeoutError: If the peer is too slow
+    """
+    host, _, port = node.partition(":")
+    target = path + (f"?{urlencode(params)}" if params else "")
+    request = (
+        f"GET {target} HTTP/1.1\r\nHost: {node}\r\nAccept: {PEER_ACCEPT}\r\n"
+        "Connection: close\r\n\r\n"
+    )
+
+    async def exchange() -> bytes:
+        reader, writer = await asyncio.open_connection(host, int(port or 80))
+        try:
+            writer.write(request.encode())
+            return await reader.read()
+        finally:
+            writer.close()
+
+    response = await asyncio.wait_for(exchange(), timeout)
+    head, _, body = response.partition(b"\r\n\r\n")
+    status_line, *lines = head.decode("latin-1").split("\r\n")
+    parts = status_line.split(" ", 2)
+    if len(parts) < 2 or not parts[0].startswith("HTTP/") or not parts[1].isdigit():
+        raise ValueError(f"Peer sent a malformed status line {status_line[:80]!r}")
+    status = int(parts[1])
+    headers = {}
+    for line in lines:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if status != 200:
+        raise ValueError(f"Peer answered {status}")
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        raise ValueError("Chunked peer responses are not supported")
+    if headers.get("content-type", "").startswith(codec.CONTENT_TYPE):
+        return codec.decode(body)
+    return json.loads(body)
+
+
+class AsyncNode:
+    """
+    The node API as an ASGI application, for serving many concurrent clients
+    from one process.
+
+    Requests are handled on the event loop. Work that would block it runs
+    elsewhere: signature checks and consensus run in a thread pool (and in
+    the Blockchain's verify_workers processes, if configured), and proof of
+    work runs in a MiningJob's worker processes (at least one, even with
+    --workers 1). Peers are queried with non-blocking sockets.
+
+    It serves the routes nodes and clients need, with the same request and
+    response formats as the Flask app: /chain, /chain/length, /headers,
+    /blocks, /block/hash/<hash>, /mine, /mine/status/<job_id>,
+    /transactions/new, /transactions/batch, /transactions/pending, /transactions/pending/<id>,
+    /inv, /nodes/register and /nodes/resolve. Run it with `serve` or any
+    ASGI server, e.g. `uvicorn`.
+    """
+
+    def __init__(
+        self,
+        blockchain: Blockchain,
+        node_identifier: str = None,
+        port: int = 5001,
+        fanout: int = FANOUT,
+    ):
+        """
+        :param blockchain: The Blockchain to serve
+        :param node_identifier: Address mining rewards are paid to (random if
+            omitted)
+        :param port: Port the node is served on, which peers fetch announced
+            blocks and transactions from
+        :param fanout: Number of peers each new block or transaction is
+            announced to
+        """
+        self.blockchain = blockchain
+        self.node_identifier = node_identifier or uuid4().hex
+        self.gossip = Gossip(blockchain, port=port, fanout=fanout)
+        self.executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS)
+        # Background mining jobs by id, oldest first
+        self.mining_jobs = OrderedDict()
+        self.routes = {
+            ("GET", "/chain"): self.full_chain,
+            ("GET", "/chain/length"): self.chain_length,
+            ("GET", "/headers"): self.headers,
+            ("GET", "/blocks"): self.blocks,
+            ("GET", "/mine"): self.mine,
+            ("POST", "/transactions/new"): self.new_transaction,
+            ("POST", "/transactions/batch"): self.new_transactions_batch,
+            ("GET", "/transactions/pending"): self.pending_transactions,
+            ("POST", "/nodes/register"): self.register_nodes,
+            ("GET", "/nodes/resolve"): self.consensus,
+        }
+
+    async def _run(self, function, *args):
+        """Runs a blocking call in the thread pool."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, function, *args
+        )
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    self.executor.shutdown(wait=False, cancel_futures=True)
+                    self.blockchain.close()
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        try:
+            status, payload, content_type, *extra = await self.dispatch(scope, body)
+        except Exception as e:
+            print(f"Error handling {scope['method']} {scope['path']}: {e!r}")
+            status, payload, content_type = _text("Internal Server Error", 500)
+            extra = []
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", content_type.encode()),
+                    (b"content-length", str(len(payload)).encode()),
+                    *(extra[0] if extra else ()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": payload})
+
+    async def dispatch(self, scope: dict, body: bytes) -> tuple:
+        """
+        Routes a request to its handler.
+
+        :return: A (status, body, content type) tuple, optionally followed by
+            a list of extra (name, value) response headers
+        """
+        method, path = scope["method"], scope["path"]
+        query = dict(parse_qsl(scope.get("query_string", b"").decode()))
+        headers = {name.decode(): value.decode() for name, value in scope["headers"]}
+        if self.blockchain.shared is not None:
+            # Taking the store's file lock may block: not on the event loop
+            await self._run(self.blockchain.refresh)
+
+        if path.startswith("/mine/status/") and method == "GET":
+            return self.mine_status(path[len("/mine/status/") :])
+        if path.startswith("/block/hash/") and method == "GET":
+            return self.block_by_hash(path[len("/block/hash/") :], headers)
+        if path.startswith("/transactions/pending/") and method == "GET":
+            return self.pending_transaction(path[len("/transactions/pending/") :])
+        if path == "/inv" and method == "POST":
+            return self.inventory(body, scope.get("client"))
+        handler = self.routes.get((method, path))
+        if handler is None:
+            if any(route_path == path for _, route_path in self.routes):
+                return _text("Method Not Allowed", 405)
+            return _text("Not Found", 404)
+
+        values = None
+        if method == "POST":
+            try:
+                values = json.loads(body)
+            except ValueError:
+                return _text("Error: Request body is not valid JSON", 400)
+        return await handler(query=query, headers=headers, values=values)
+
+    async def full_chain(self, query, headers, values) -> tuple:
+        """
+        Serves the chain like the Flask app: ?start, ?limit and ?order=desc
+        select a page, and the tip hash is sent as ETag, so clients sending
+        If-None-Match get a 304 while the chain is unchanged.
+        """
+
+        def page():
+            blocks = self.blockchain.chain_page(
+                _int_arg(query, "start", None),
+                _int_arg(query, "limit", None),
+                query.get("order", "asc").lower() == "desc",
+            )
+            return {"chain": blocks, "length": len(self.blockchain.chain)}
+
+        # Encoding a long chain takes a while: keep the loop responsive
+        tip_hash = self.blockchain.block_hashes[-1]
+        return await self._run(_conditional, headers, tip_hash, page)
+
+    async def chain_length(self, query, headers, values) -> tuple:
+        return _json(
+            {
+                "length": len(self.blockchain.chain),
+                "work": self.blockchain.total_work,
+                "tip_hash": self.blockchain.block_hashes[-1],
+            }
+        )
+
+    def _range(self, query: dict, max_limit: int) -> list:
+        start = max(_int_arg(query, "start", 1), 1)
+        limit = min(max(_int_arg(query, "limit", max_limit), 0), max_limit)
+        return self.blockchain.chain[start - 1 : start - 1 + limit]
+
+    async def headers(self, query, headers, values) -> tuple:
+        blocks = self._range(query, MAX_HEADERS_PER_REQUEST)
+        data = {
+            "headers": [Blockchain.header(block) for block in blocks],
+            "length": len(self.blockchain.chain),
+        }
+        return _encoded(headers.get("accept", ""), data)
+
+    async def blocks(self, query, headers, values) -> tuple:
+        data = {
+            "blocks": self._range(query, MAX_BLOCKS_PER_REQUEST),
+            "length": len(self.blockchain.chain),
+        }
+        return await self._run(_encoded, headers.get("accept", ""), data)
+
+    def block_by_hash(self, block_hash: str, headers: dict) -> tuple:
+        position = self.blockchain.block_positions.get(block_hash)
+        if position is None:
+            return _text("Block not found", 404)
+        return _conditional(
+            headers,
+            block_hash,
+            lambda: {"block": self.blockchain.chain[position], "hash": block_hash},
+        )
+
+    def _forge(self, last_block: dict, proof: int):
+        """Forges a block for a MiningJob and announces it to our peers."""
+        result = self.blockchain.forge(last_block, proof, self.node_identifier)
+        if result is not None:
+            block_hash = self.blockchain.block_hashes[result["index"] - 1]
+            self.gossip.announce(BLOCK, [block_hash])
+        return result
+
+    async def mine(self, query, headers, values) -> tuple:
+        running = [job for job in self.mining_jobs.values() if job.is_alive()]
+        if running:
+            job = running[0]
+        else:
+            # In a thread, the search would hold the GIL against the loop
+            job = MiningJob(self.blockchain, self._forge, in_process=True)
+            self.mining_jobs[job.id] = job
+            while len(self.mining_jobs) > MAX_MINING_JOBS:
+                self.mining_jobs.popitem(last=False)
+            job.start()
+
+        if _flag(query, "wait"):
+            # Poll rather than join, so waiting clients hold no threads
+            while job.is_alive():
+                await asyncio.sleep(POLL_INTERVAL)
+            if job.status != "done":
+                return _json(job.to_dict(), 500)
+            return _json(job.result)
+
+        response = {
+            "message": "Mining started",
+            "job_id": job.id,
+            "status_url": f"/mine/status/{job.id}",
+        }
+        return _json(response, 202)
+
+    def mine_status(self, job_id: str) -> tuple:
+        job = self.mining_jobs.get(job_id)
+        if job is None:
+            return _text("Unknown mining job", 404)
+        return _json(job.to_dict())
+
+    async def new_transaction(self, query, headers, values) -> tuple:
+        if not isinstance(values, dict) or not all(
+            k in values for k in TRANSACTION_FIELDS
+        ):
+            return _text(MISSING_FIELDS, 400)
+
+        # Checking the signature is CPU-bound
+        results = await self._run(self.blockchain.new_transactions, [values])
+        index, error = results[0]
+        if index == -1:
+            return _text(error, 400)
+        self.gossip.announce_transactions([values])
+        return _json({"message": f"Transaction will be added to Block {index}"}, 201)
+
+    async def new_transactions_batch(self, query, headers, values) -> tuple:
+        transactions = values.get("transactions") if isinstance(values, dict) else None
+        if not isinstance(transactions, list):
+            return _text("Error: Please supply a list of transactions", 400)
+
+        results = [{"accepted": False, "error": MISSING_FIELDS}] * len(transactions)
+        well_formed = [
+            position
+            for position, tx in enumerate(transactions)
+            if isinstance(tx, dict) and all(k in tx for k in TRANSACTION_FIELDS)
+        ]
+        outcomes = await self._run(
+            self.blockchain.new_transactions, [transactions[p] for p in well_formed]
+        )
+        for position, (index, error) in zip(well_formed, outcomes):
+            if index == -1:
+                results[position] = {"accepted": False, "error": error}
+            else:
+                results[position] = {"accepted": True, "index": index}
+        self.gossip.announce_transactions(
+            [transactions[p] for p in well_formed if results[p]["accepted"]]
+        )
+
+        accepted = sum(result["accepted"] for result in results)
+        response = {
+            "accepted": accepted,
+            "rejected": len(results) - accepted,
+            "results": results,
+        }
+        return _json(response)
+
+    async def pending_transactions(self, query, headers, values) -> tuple:
+        return _json({"transactions": self.blockchain.current_transactions})
+
+    def pending_transaction(self, tx_id: str) -> tuple:
+        transaction = self.blockchain.mempool.get(tx_id)
+        if transaction is None:
+            return _text("Transaction not found", 404)
+        return _json({"transaction": transaction})
+
+    def inventory(self, body: bytes, client) -> tuple:
+        try:
+            values = json.loads(body)
+        except ValueError:
+            return _text("Error: Request body is not valid JSON", 400)
+        if not isinstance(values, dict) or not isinstance(values.get("port"), int):
+            return _text(
+                "Error: Please supply the inventory type, hashes and port", 400
+            )
+        host = client[0] if client else "127.0.0.1"
+        try:
+            wanted = self.gossip.receive(
+                values.get("type"), values.get("hashes"), f"{host}:{values['port']}"
+            )
+        except ValueError as e:
+            return _text(f"Error: {e}", 400)
+        return _json({"wanted": wanted}, 202)
+
+    async def register_nodes(self, query, headers, values) -> tuple:
+        nodes = values.get("nodes") if isinstance(values, dict) else None
+        if nodes is None:
+            return _text("Error: Please supply a valid list of nodes", 400)
+        try:
+            for node in nodes:
+                await self._run(self.blockchain.register_node, node)
+        except ValueError as e:
+            return _text(f"Error: {e}", 400)
+        response = {
+            "message": "New nodes have been added",
+            "total_nodes": list(self.blockchain.nodes),
+        }
+        return _json(response, 201)
+
+    async def _fetch_timed(self, node: str, path: str):
+        """Like fetch_json, but records the peer's latency; None on failure."""
+        start = perf_counter()
+        try:
+            data = await fetch_json(node, path, timeout=self.blockchain.peer_timeout)
+        except (OSError, ValueError, asyncio.TimeoutError) as e:
+            self.blockchain.peer_latency[node] = None
+            print(f"Could not fetch {path} from node {node}: {e!r}. Skipping.")
+            return None
+        self.blockchain.peer_latency[node] = perf_counter() - start
+        return node, data
+
+    async def fetch_from_peers(self, path: str) -> list:
+        """
+        Sends the same GET request to all registered peers at once. Peers that
+        have not answered after `consensus_deadline` seconds are skipped.
+
+        :return: (node, response) pairs of the peers that answered
+        """
+        tasks = [
+            asyncio.ensure_future(self._fetch_timed(node, path))
+            for node in list(self.blockchain.nodes)
+        ]
+        if not tasks:
+            return []
+        done, pending = await asyncio.wait(
+            tasks, timeout=self.blockchain.consensus_deadline
+        )
+        for task in pending:
+            task.cancel()
+        return [task.result() for task in done if task.result() is not None]
+
+    async def consensus(self, query, headers, values) -> tuple:
+        if _flag(query, "full"):
+            replaced = await self._run(self.blockchain.resolve_conflicts, True)
+        else:
+            answers = await self.fetch_from_peers("/chain/length")
+            # Only the heaviest peer (if any) is synced from, in the pool
+            replaced = await self._run(self.blockchain.adopt_heaviest, answers)
+
+        chain = list(self.blockchain.chain)
+        if replaced:
+            self.gossip.announce(BLOCK, [self.blockchain.block_hashes[-1]])
+            response = {"message": "Our chain was replaced", "new_chain": chain}
+        else:
+            response = {"message": "Our chain is authoritative", "chain": chain}
+        return await self._run(_json, response)
+
+
+def _parse_head(head: bytes) -> tuple:
+    """
+    Parses an HTTP/1.x request line and headers.
+
+    :return: A (method, target, version, headers) tuple, with the headers as a
+        list of lowercased (name, value) byte pairs
+    :raises ValueError: If the request is malformed
+    """
+    request_line, *lines = head[:-4].split(b"\r\n")
+    method, target, version = request_line.decode("latin-1").split(" ")
+    if not version.startswith("HTTP/1."):
+        raise ValueError(f"Unsupported protocol {version}")
+    headers = []
+    for line in lines:
+        name, separator, value = line.partition(b":")
+        if not separator:
+            raise ValueError("Malformed header")
+        headers.append((name.strip().lower(), value.strip()))
+    return method, target, version, headers
+
+
+def _response_head(status: int, headers: list, keep_alive: bool) -> bytes:
+    lines = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}".encode()]
+    lines += [name + b": " + value for name, value in headers]
+    lines.append(b"Connection: keep-alive" if keep_alive else b"Connection: close")
+    return b"\r\n".join(lines) + b"\r\n\r\n"
+
+
+async def _handle_connection(app, reader, writer) -> None:
+    """Serves the requests of one (keep-alive) HTTP/1.1 connection."""
+    client = writer.get_extra_info("peername")
+    try:
+        while True:
+            try:
+                head = await asyncio.wait_for(
+                    reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_TIMEOUT
+                )
+            except (
+                asyncio.IncompleteReadError,
+                asyncio.LimitOverrunError,
+                asyncio.TimeoutError,
+                ConnectionError,
+            ):
+                return
+            try:
+                method, target, version, headers = _parse_head(head)
+            except ValueError:
+                writer.write(_response_head(400, [], keep_alive=False))
+                return
+
+            fields = dict(headers)
+            connection = fields.get(b"connection", b"").lower()
+            keep_alive = connection != b"close" and (
+                version == "HTTP/1.1" or connection == b"keep-alive"
+            )
+            if b"transfer-encoding" in fields:
+                writer.write(_response_head(501, [], keep_alive=False))
+                return
+            try:
+                length = int(fields.get(b"content-length", 0))
+            except ValueError:
+                length = -1
+            if length < 0:
+                writer.write(_response_head(400, [], keep_alive=False))
+                return
+            if length > MAX_BODY_BYTES:
+                writer.write(_response_head(413, [], keep_alive=False))
+                return
+            body = await reader.readexactly(length) if length else b""
+
+            path, _, query_string = target.partition("?")
+            scope = {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": version[5:],
+                "method": method,
+                "scheme": "http",
+                "path": path,
+                "raw_path": path.encode(),
+                "query_string": query_string.encode(),
+                "headers": headers,
+                "client": client,
+            }
+            request = {"type": "http.request", "body": body, "more_body": False}
+            response = {"status": 500, "headers": [], "body": []}
+
+            async def receive():
+                return request
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    response["status"] = message["status"]
+                    response["headers"] = list(message.get("headers", []))
+                else:
+                    response["body"].append(message.get("body", b""))
+
+            await app(scope, receive, send)
+            payload = b"".join(response["body"])
+            response_headers = [
+                (name, value)
+                for name, value in response["headers"]
+                if name.lower() != b"content-length"
+            ]
+            response_headers.append((b"content-length", str(len(payload)).encode()))
+            writer.write(
+                _response_head(response["status"], response_headers, keep_alive)
+                + payload
+            )
+            await writer.drain()
+            if not keep_alive:
+                return
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(app, host: str = "0.0.0.0", port: int = 5001):
+    """
+    Starts a minimal HTTP/1.1 server (keep-alive, Content-Length bodies)
+    for an ASGI application, so the node needs no ASGI server package.
+
+    :return: The asyncio Server, already accepting connections
+    """
+    return await asyncio.start_server(
+        partial(_handle_connection, app),
+        host,
+        port,
+        limit=MAX_HEAD_BYTES,
+        backlog=BACKLOG,
+    )
+
+
+def create_app() -> AsyncNode:
+    """
+    Application factory for ASGI servers (e.g. uvicorn --factory). Like the
+    Flask app, the node shares the chain, mempool and peers kept in
+    BLOCKCHAIN_DATA_DIR with other processes if it is set, and announces
+    BLOCKCHAIN_PORT to its peers.
+    """
+    port = int(os.environ.get("BLOCKCHAIN_PORT", 5001))
+    if os.environ.get("BLOCKCHAIN_DATA_DIR"):
+        store = BlockStore(os.environ["BLOCKCHAIN_DATA_DIR"], shared=True)
+        return AsyncNode(Blockchain(store=store), port=port)
+    return AsyncNode(Blockchain(), port=port)
+
+
+async def serve(app, host: str = "0.0.0.0", port: int = 5001) -> None:
+    """Serves an ASGI application until the task is cancelled."""
+    server = await start_server(app, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Run the node on the asyncio server.")
+    parser.add_argument(
+        "-p", "--port", default=5001, type=int, help="port to listen on"
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        default=1,
+        type=int,
+        help="number of proof-of-work processes (0 uses every CPU core)",
+    )
+    parser.add_argument(
+        "-d",
+        "--data-dir",
+        default=None,
+        type=str,
+        help="directory of the on-disk block store (in-memory chain if omitted)",
+    )
+    parser.add_argument(
+        "--shared",
+        action="store_true",
+        help="share --data-dir with other node processes running at the same time",
+    )
+    parser.add_argument(
+        "--verify-workers",
+        default=1,
+        type=int,
+        help="number of processes verifying transaction signatures",
+    )
+    parser.add_argument(
+        "--mempool-size",
+        default=DEFAULT_MAX_SIZE,
+        type=int,
+        help="maximum number of pending transactions",
+    )
+    parser.add_argument(
+        "--difficulty",
+        default=DIFFICULTY_BITS,
+        type=int,
+        help="leading zero bits required of the first block's proof-of-work hash",
+    )
+    parser.add_argument(
+        "--block-time",
+        default=TARGET_BLOCK_TIME,
+        type=float,
+        help="seconds between blocks the difficulty adapts to (0 keeps it fixed)",
+    )
+    parser.add_argument(
+        "--retarget-window",
+        default=RETARGET_WINDOW,
+        type=int,
+        help="number of blocks between difficulty adjustments",
+    )
+    parser.add_argument(
+        "--fanout",
+        default=FANOUT,
+        type=int,
+        help="number of peers each new block or transaction is announced to",
+    )
+    args = parser.parse_args()
+
+    node = AsyncNode(
+        Blockchain(
+            mining_workers=args.workers or None,
+            store=(
+                BlockStore(args.data_dir, shared=args.shared) if args.data_dir else None
+            ),
+            verify_workers=args.verify_workers,
+            mempool_size=args.mempool_size,
+            difficulty=args.difficulty,
+            target_block_time=args.block_time or None,
+            retarget_window=args.retarget_window,
+        ),
+        port=args.port,
+        fanout=args.fanout,
+    )
+    try:
+        asyncio.run(serve(node, port=args.port))
+    except KeyboardInterrupt:
+        pass
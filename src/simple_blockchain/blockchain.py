@@ -1,27 +1,436 @@
 import hashlib
 import json
-from time import time
+import math
+import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from contextlib import contextmanager
+from functools import wraps
+from itertools import accumulate
+from numbers import Real
+from statistics import median
+from time import perf_counter, time
 from urllib.parse import urlparse
 from uuid import uuid4
-from .wallet import Wallet
+from . import codec
+from .wallet import Wallet, is_canonical_hex
+from .storage import BlockStore, StoredChain
+from .blocktree import BlockTree
+from .ledger import (
+    COINBASE_SENDER,
+    INITIAL_BALANCE,
+    AddressIndex,
+    ConfirmedTransactions,
+    Ledger,
+)
+from .mempool import DEFAULT_MAX_SIZE, Mempool, transaction_id
+from .merkle import merkle_proof, merkle_root
+from .shared import SharedState
+from .gossip import BLOCK, FANOUT, Gossip
+from .client import NodeSession
+from .mining import (
+    CHUNK_SIZE,
+    DIFFICULTY_BITS,
+    MAX_DIFFICULTY_BITS,
+    MiningJob,
+    block_work,
+    check_proof,
+    parallel_proof_of_work,
+    search_proof,
+)
 import requests
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, make_response, request
 from pyvis.network import Network
 
+# Seconds to wait on a single peer before giving up on it during consensus
+PEER_TIMEOUT = 5.0
+
+# Times a failed request to a peer is retried
+PEER_RETRIES = 1
+
+# Seconds a whole consensus round may spend waiting for peer chains
+CONSENSUS_DEADLINE = 10.0
+
+# Accept header sent to peers: binary-encoded responses, or JSON
+PEER_ACCEPT = f"{codec.CONTENT_TYPE}, application/json;q=0.9"
+
+# Maximum number of peers fetched at the same time during consensus
+MAX_PEER_FETCHES = 32
+
+# Page sizes of the /headers and /blocks range endpoints
+MAX_HEADERS_PER_REQUEST = 2000
+MAX_BLOCKS_PER_REQUEST = 500
+
+# The block fields served by /headers and covered by the block hash: everything
+# except the transactions, which the header commits to through merkle_root
+HEADER_FIELDS = (
+    "index",
+    "timestamp",
+    "proof",
+    "previous_hash",
+    "merkle_root",
+    "difficulty",
+)
+
+# The fields every submitted transaction must carry
+TRANSACTION_FIELDS = ("sender", "recipient", "amount", "fee", "signature")
+
+# Fields a transaction may carry in addition: the sender's compressed public
+# key, required unless the sender is a legacy (PEM public key) address
+OPTIONAL_TRANSACTION_FIELDS = ("public_key",)
+
+# Batches smaller than this are verified inline rather than in the process pool
+MIN_PARALLEL_BATCH = 16
+
+# Upper bound on the transactions served by one /address/<addr>/transactions page
+MAX_HISTORY_PER_REQUEST = 100
+
+# Default seconds the difficulty retargeting aims for between blocks
+TARGET_BLOCK_TIME = 10.0
+
+# The difficulty is retargeted every this many blocks, over the last this many
+RETARGET_WINDOW = 10
+
+# How far (as a ratio) the observed block time may drift from the target
+# before the difficulty moves by one bit, i.e. a factor of two in work
+RETARGET_FACTOR = 2**0.5
+
+# Default space (in serialized bytes) for pending transactions in a mined block
+MAX_BLOCK_BYTES = 200_000
+
+# Coins minted by each block, paid to its miner along with the block's fees
+MINING_REWARD = 1
+
+# A block's timestamp must be later than the median timestamp of this many
+# blocks before it, so a miner cannot backdate blocks to lower the difficulty
+MEDIAN_TIME_SPAN = 11
+
+# Seconds a block's timestamp may run ahead of our clock
+MAX_FUTURE_DRIFT = 2 * 60 * 60
+
+
+def _synchronized(method):
+    """Runs a Blockchain method inside Blockchain.synchronized."""
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.synchronized():
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
 
 class Blockchain:
     """
     Manages the chain, storage, and new block creation for the blockchain.
+
+    The chain, balances and mempool are changed only inside `synchronized`,
+    which serializes the threads of a node. With a shared BlockStore it also
+    serializes the processes serving the same data directory (e.g. gunicorn
+    workers) and first catches up with what the others wrote.
     """
 
-    def __init__(self):
-        self.chain = []
-        self.current_transactions = []
+    def __init__(
+        self,
+        mining_workers: int = 1,
+        store: BlockStore = None,
+        trusted_restart: bool = False,
+        mmap_chain: bool = False,
+        verify_workers: int = 1,
+        mempool_size: int = DEFAULT_MAX_SIZE,
+        max_block_bytes: int = MAX_BLOCK_BYTES,
+        initial_balance: float = INITIAL_BALANCE,
+        difficulty: int = DIFFICULTY_BITS,
+        target_block_time: float = TARGET_BLOCK_TIME,
+        retarget_window: int = RETARGET_WINDOW,
+    ):
+        """
+        :param mining_workers: Number of processes used by proof_of_work.
+            1 searches in the calling thread, None uses every CPU core.
+        :param store: Optional BlockStore that every new block is appended to.
+            If it already holds blocks, the chain is replayed from it. If it
+            is shared, the mempool and peers are shared through its directory.
+        :param trusted_restart: Skip revalidating a replayed chain when its tip
+            matches the checkpoint written by a previous run
+        :param mmap_chain: Keep blocks in the (memory-mapped) store instead of
+            in memory; `chain` is then a StoredChain that decodes blocks on access
+        :param verify_workers: Number of processes used to verify the signatures
+            of transaction batches. 1 verifies in the calling thread.
+        :param mempool_size: Maximum number of pending transactions
+        :param max_block_bytes: Space for pending transactions in a mined block
+        :param initial_balance: Coins every address holds before its first
+            transaction
+        :param difficulty: Leading zero bits required of proofs, recorded in
+            the genesis block (0 accepts any proof, for test networks)
+        :param target_block_time: Seconds between blocks the difficulty is
+            retargeted towards; None or 0 keeps it fixed
+        :param retarget_window: Number of blocks between retargets
+        """
+        if mmap_chain and store is None:
+            raise ValueError("mmap_chain requires a block store")
+        if mmap_chain and store.shared:
+            raise ValueError("mmap_chain cannot be used with a shared block store")
+
+        self.chain = StoredChain(store) if mmap_chain else []
+        # block_hashes[i] is the hash of chain[i], computed once per block,
+        # and block_positions maps each of those hashes back to i
+        self.block_hashes = []
+        self.block_positions = {}
+        # chain_work[i] is the cumulative work of the chain ending at chain[i]
+        self.chain_work = []
+        # Valid blocks off the main chain, e.g. those removed by a reorganization
+        self.side_blocks = BlockTree()
+        # Ids of the transactions on the chain, which cannot be spent again
+        self.confirmed = ConfirmedTransactions()
+        self.mempool = Mempool(max_size=mempool_size, confirmed=self.confirmed)
+        self.max_block_bytes = max_block_bytes
+        # Confirmed balances, kept in step with the chain block by block
+        self.ledger = Ledger(initial_balance)
+        # Where each address's confirmed transactions are on the chain
+        self.address_index = AddressIndex()
         self.nodes = set()
+        self.mining_workers = mining_workers
+        self.difficulty = difficulty
+        self.target_block_time = target_block_time
+        self.retarget_window = retarget_window
+        self.store = store
+        # Serializes changes to the chain, balances and mempool (see synchronized)
+        self.lock = threading.RLock()
+        self._synchronized = False
+        # Pending transactions and peers of the other processes sharing the store
+        self.shared = (
+            SharedState(store.directory) if store is not None and store.shared else None
+        )
+        self.verify_workers = verify_workers
+        self._verify_executor = None
+
+        # Keep-alive HTTP connections to peers, shared by the consensus and
+        # gossip threads. A peer gets one retry: consensus has a deadline.
+        self.session = NodeSession(
+            timeout=PEER_TIMEOUT, retries=PEER_RETRIES, pool_size=MAX_PEER_FETCHES
+        )
+        self.peer_timeout = PEER_TIMEOUT
+        self.consensus_deadline = CONSENSUS_DEADLINE
+        # Seconds each peer took to serve its chain in the last consensus round
+        # (None if it failed or missed the deadline)
+        self.peer_latency = {}
+
+        with self.synchronized():
+            if store is not None and len(store):
+                self._replay(trusted_restart)
+            else:
+                # Create the genesis block
+                self.new_block(proof=100, previous_hash="1", transactions=[])
+
+    @contextmanager
+    def synchronized(self):
+        """
+        Holds the node's lock: every change to the chain, balances and mempool
+        (and any check-then-act sequence over them) runs inside it. Re-entrant.
+
+        With a shared store, the outermost section also holds the store's
+        file lock and starts by loading the blocks, pending transactions and
+        peers other processes wrote. If the section changes the chain, the
+        mempool journal is rewritten for them.
+        """
+        with self.lock:
+            if self.shared is None or self._synchronized:
+                yield
+                return
+            with self.store.locked():
+                self._synchronized = True
+                try:
+                    self._load_shared()
+                    tip = self.block_hashes[-1] if self.block_hashes else None
+                    yield
+                    if self.block_hashes and self.block_hashes[-1] != tip:
+                        self.shared.rewrite_pending(list(self.mempool))
+                finally:
+                    self._synchronized = False
+
+    def refresh(self) -> None:
+        """Catches up with other processes sharing the block store, if any."""
+        if self.shared is not None:
+            with self.synchronized():
+                pass
+
+    def _load_shared(self) -> None:
+        """
+        Applies what other processes wrote to the shared directory: blocks
+        past the point where the store and our chain diverge, then the
+        mempool journal, then the peers.
+        """
+        if self.store.refresh() and self.block_hashes:
+            stored = self.store.hashes()
+            fork = min(len(stored), len(self.block_hashes))
+            while fork and stored[fork - 1] != self.block_hashes[fork - 1]:
+                fork -= 1
+            blocks = [self.store.read(p) for p in range(fork, len(stored))]
+            self._splice_chain(fork, blocks, stored[fork:], stored=True)
+
+        reset, transactions = self.shared.read_pending()
+        if reset:
+            self.mempool.clear()
+        for transaction in transactions:
+            try:
+                self.mempool.add(transaction)
+            except ValueError:
+                pass
+
+        nodes = self.shared.read_nodes()
+        if nodes is not None:
+            self.nodes = nodes
+
+    def _replay(self, trusted: bool) -> None:
+        """
+        Loads the chain from the block store. Unless the restart is trusted and
+        the stored tip matches the checkpoint, the chain is fully revalidated.
+        """
+        if not isinstance(self.chain, StoredChain):
+            self.chain = self.store.read_all()
+        self.block_hashes = self.store.hashes()
+        self.block_positions = {h: i for i, h in enumerate(self.block_hashes)}
+        self.chain_work = list(
+            accumulate(block_work(block["difficulty"]) for block in self.chain)
+        )
+        self.ledger.rebuild(self.chain)
+        self.address_index.rebuild(self.chain)
+        self.confirmed.rebuild(self.chain)
+        tip_hash = self.hash(self.chain[-1])
+
+        if (
+            trusted
+            and tip_hash == self.block_hashes[-1]
+            and self.store.read_checkpoint() == (len(self.chain), tip_hash)
+        ):
+            return
+
+        hashes = [self.hash(block) for block in self.chain]
+        if hashes != self.block_hashes or not self.validate_chain(self.chain, hashes):
+            raise ValueError(f"Block store in {self.store.directory} is not valid")
+        self.store.write_checkpoint(len(self.chain), tip_hash)
+
+    @_synchronized
+    def _splice_chain(
+        self, fork: int, blocks: list, hashes: list, stored: bool = False
+    ) -> None:
+        """
+        Replaces every block from position `fork` onwards with validated blocks,
+        keeping the shared prefix (and its cached hashes) untouched. Only the
+        replaced blocks are rolled back: they move to the side branches and
+        their transactions that the new blocks do not confirm go back to the
+        mempool, so the cost depends on the fork depth, not the chain length.
+
+        :param fork: Number of leading blocks kept from our chain
+        :param blocks: The blocks that follow the shared prefix
+        :param hashes: The hash of every block in `blocks`
+        :param stored: The block store already holds exactly these blocks
+            (written by another process)
+        """
+        reverted = self.chain[fork:]
+        for block in reversed(reverted):
+            self.ledger.revert_block(block)
+            self.address_index.revert_block(block)
+            self.confirmed.revert_block(block)
+        for block in blocks:
+            self.ledger.apply_block(block)
+            self.address_index.apply_block(block)
+            self.confirmed.apply_block(block)
+
+        for block, block_hash, work in zip(
+            reverted, self.block_hashes[fork:], self.chain_work[fork:]
+        ):
+            self.side_blocks.add(block_hash, block, work)
+        for block_hash in hashes:
+            self.side_blocks.discard(block_hash)
+        del self.chain_work[fork:]
+        work = self.chain_work[-1] if self.chain_work else 0
+        for block in blocks:
+            work += block_work(block["difficulty"])
+            self.chain_work.append(work)
+
+        if self.store is not None and not stored:
+            self.store.truncate(fork)
+            for block, block_hash in zip(blocks, hashes):
+                self.store.append(block, block_hash)
+            self.store.write_checkpoint(len(self.store), hashes[-1])
+        if not isinstance(self.chain, StoredChain):
+            del self.chain[fork:]
+            self.chain.extend(blocks)
+        for block in blocks:
+            self.mempool.remove_confirmed(block["transactions"])
+        for block_hash in self.block_hashes[fork:]:
+            del self.block_positions[block_hash]
+        del self.block_hashes[fork:]
+        for position, block_hash in enumerate(hashes, start=fork):
+            self.block_positions[block_hash] = position
+        self.block_hashes.extend(hashes)
+        self._return_to_mempool(reverted, blocks)
+
+    def _return_to_mempool(self, reverted: list, blocks: list) -> None:
+        """
+        Puts the transactions of blocks removed by a reorganization back in
+        the mempool, unless the new blocks confirm them or the new balances
+        no longer cover them.
+
+        :param reverted: The blocks taken off the chain
+        :param blocks: The blocks that replaced them
+        """
+        confirmed = {
+            transaction_id(tx) for block in blocks for tx in block["transactions"]
+        }
+        for block in reverted:
+            for tx in block["transactions"]:
+                if tx["sender"] == COINBASE_SENDER or transaction_id(tx) in confirmed:
+                    continue
+                try:
+                    pending = self.mempool.pending_outflow(tx["sender"])
+                    self.ledger.check_spend(tx, pending)
+                    self.mempool.add(tx)
+                except ValueError:
+                    pass
+
+    @property
+    def total_work(self) -> int:
+        """The cumulative work of our chain, which consensus compares chains by."""
+        return self.chain_work[-1]
+
+    @_synchronized
+    def _reorg_to(self, tip_hash: str) -> bool:
+        """
+        Switches our chain to a side branch we already hold, if that branch
+        has more work.
+
+        :param tip_hash: Hash of the side block at the tip of the branch
+        :return: True if our chain was replaced, False if not
+        """
+        branch = self.side_blocks.branch(tip_hash)
+        if not branch or self.side_blocks.work(tip_hash) <= self.total_work:
+            return False
+        blocks = [self.side_blocks.get(block_hash) for block_hash in branch]
+        position = self.block_positions.get(blocks[0]["previous_hash"])
+        if position is None:
+            # The branch lost blocks to eviction and no longer reaches our chain
+            return False
+        self._splice_chain(position + 1, blocks, branch)
+        return True
 
-        # Create the genesis block
-        self.new_block(proof=100, previous_hash="1", transactions=[])
+    def cached_hash(self, block: dict) -> str:
+        """
+        Returns the hash of a block, reusing the cached hash if the block is
+        the one at its position in our chain.
 
+        :param block: Block
+        :return: The hash string
+        """
+        position = block["index"] - 1
+        if position == len(self.chain) - 1 and self.chain[position] is block:
+            return self.block_hashes[position]
+        return self.hash(block)
+
+    @_synchronized
     def register_node(self, address: str) -> None:
         """
         Add a new node to the list of nodes.
@@ -36,76 +445,663 @@ class Blockchain:
             self.nodes.add(parsed_url.path)
         else:
             raise ValueError("Invalid URL")
+        if self.shared is not None:
+            self.shared.write_nodes(self.nodes)
 
-    def validate_chain(self, chain: list) -> bool:
+    def validate_chain(self, chain: list, hashes: list = None) -> bool:
         """
         Determine if a given blockchain is valid.
 
         :param chain: A blockchain
+        :param hashes: The hash of every block in the chain, if already computed
+        :return: True if valid, False if not
+        """
+        if hashes is None:
+            hashes = [self.hash(block) for block in chain]
+        return self._validate_blocks(chain, 1, hashes[0], chain[1:], hashes[1:])
+
+    def _validate_genesis(self, header: dict) -> bool:
+        """
+        Checks the first block (or header) of a peer chain that shares no
+        block with ours. Nothing links it to an earlier block, so it must
+        look like our own genesis block: index 1, no transactions, a sane
+        timestamp, and the difficulty this node starts chains at, which makes
+        its work count the same as ours.
+        """
+        timestamp = header.get("timestamp")
+        return (
+            header.get("index") == 1
+            and self._is_timestamp(timestamp)
+            and timestamp <= time() + MAX_FUTURE_DRIFT
+            and header.get("difficulty") == self.expected_difficulty(0, None)
+            and header.get("merkle_root") == merkle_root([])
+            and not header.get("transactions")
+        )
+
+    def expected_difficulty(self, position: int, header_at) -> int:
+        """
+        Computes the difficulty required of the block at `position`.
+
+        Blocks inherit the difficulty of the block before them, except at
+        every `retarget_window`-th position: there the time the last window of
+        blocks took is compared with `target_block_time`, and the difficulty
+        goes up one bit (halving the expected block time) if blocks came more
+        than sqrt(2) times too fast, or down one bit if they came more than
+        sqrt(2) times too slow.
+
+        :param position: Position of the block (0 is the genesis block)
+        :param header_at: Callable returning the header (or block) at an
+            earlier position
+        :return: The number of leading zero bits its proof must have
+        """
+        if position == 0:
+            return self.difficulty
+        previous = header_at(position - 1)
+        difficulty = previous["difficulty"]
+        window = self.retarget_window
+        if not self.target_block_time or position < window or position % window:
+            return difficulty
+
+        elapsed = previous["timestamp"] - header_at(position - window)["timestamp"]
+        expected = self.target_block_time * (window - 1)
+        if elapsed * RETARGET_FACTOR < expected:
+            return min(difficulty + 1, MAX_DIFFICULTY_BITS)
+        if elapsed > expected * RETARGET_FACTOR:
+            return max(difficulty - 1, 0)
+        return difficulty
+
+    def next_difficulty(self) -> int:
+        """Returns the difficulty required of the next block on our chain."""
+        return self.expected_difficulty(len(self.chain), self.chain.__getitem__)
+
+    @staticmethod
+    def _is_timestamp(value) -> bool:
+        """Checks that a block timestamp is a finite number of seconds."""
+        return (
+            isinstance(value, Real)
+            and not isinstance(value, bool)
+            and math.isfinite(value)
+        )
+
+    def next_timestamp(self) -> float:
+        """
+        Returns the timestamp for a new block on our chain: the current time,
+        unless our clock is behind the median timestamp of the last
+        MEDIAN_TIME_SPAN blocks, in which case the earliest later time.
+        """
+        recent = [block["timestamp"] for block in self.chain[-MEDIAN_TIME_SPAN:]]
+        if not recent:
+            return time()
+        return max(time(), math.nextafter(median(recent), math.inf))
+
+    def _validate_headers(
+        self, base, fork: int, last_hash: str, headers: list, hashes: list
+    ) -> bool:
+        """
+        Checks that `headers` validly extend the first `fork` blocks of
+        `base`, one after the other: consecutive indexes, hash links,
+        timestamps, difficulties and proofs of work. This needs no transaction
+        bodies, so a peer's headers can be checked before its blocks are
+        downloaded.
+
+        Each timestamp must be later than the median of the MEDIAN_TIME_SPAN
+        timestamps before it, and at most MAX_FUTURE_DRIFT seconds ahead of
+        our clock.
+
+        :param base: The (already trusted) chain the headers build on; only
+            its last `retarget_window` and MEDIAN_TIME_SPAN blocks before
+            `fork` are read
+        :param fork: Number of leading blocks of `base` the headers follow
+        :param last_hash: Hash of base[fork - 1]
+        :param headers: The headers (or blocks) to check, in chain order
+        :param hashes: The hash of every header in `headers`
         :return: True if valid, False if not
         """
-        last_block = chain[0]
-        current_index = 1
 
-        while current_index < len(chain):
-            block = chain[current_index]
-            # Uncomment the print statements below for debugging consensus
-            # print(f'{last_block}')
-            # print(f'{block}')
-            # print("\n-----------\n")
+        def header_at(position: int) -> dict:
+            return base[position] if position < fork else headers[position - fork]
+
+        last_header = base[fork - 1]
+        recent = deque(
+            (
+                base[p]["timestamp"]
+                for p in range(max(0, fork - MEDIAN_TIME_SPAN), fork)
+            ),
+            maxlen=MEDIAN_TIME_SPAN,
+        )
+        latest = time() + MAX_FUTURE_DRIFT
+        for position, (header, header_hash) in enumerate(
+            zip(headers, hashes), start=fork
+        ):
+            if header["index"] != last_header["index"] + 1:
+                return False
 
             # Check that the hash of the block is correct
-            if block["previous_hash"] != self.hash(last_block):
+            if header["previous_hash"] != last_hash:
                 return False
 
-            # Check that the Proof of Work is correct
-            if not self.validate_proof(
-                last_block["proof"], block["proof"], block["previous_hash"]
+            # Check the timestamp before the retargeting rule reads it
+            timestamp = header.get("timestamp")
+            if not self._is_timestamp(timestamp) or not (
+                median(recent) < timestamp <= latest
+            ):
+                return False
+            recent.append(timestamp)
+
+            # Check that the block claims the difficulty the retargeting rule
+            # requires, and that its Proof of Work meets it
+            difficulty = self.expected_difficulty(position, header_at)
+            if header.get("difficulty") != difficulty or not check_proof(
+                last_header["proof"],
+                header["proof"],
+                header["previous_hash"],
+                difficulty,
             ):
                 return False
 
-            last_block = block
-            current_index += 1
+            last_header, last_hash = header, header_hash
+
+        return True
+
+    @staticmethod
+    def _validate_body(block: dict) -> bool:
+        """
+        Checks that a block's transactions match its header's merkle_root
+        and were each signed by their sender. Only the first transaction may
+        be a mining reward (sender "0"), paying MINING_REWARD plus the fees
+        of the other transactions.
+        """
+        transactions = block["transactions"]
+        if block.get("merkle_root") != merkle_root(transactions):
+            return False
+        if any(tx.get("sender") == COINBASE_SENDER for tx in transactions[1:]):
+            return False
+        if transactions and transactions[0].get("sender") == COINBASE_SENDER:
+            try:
+                reward = MINING_REWARD + sum(
+                    tx.get("fee", 0) for tx in transactions[1:]
+                )
+            except TypeError:
+                return False
+            if transactions[0].get("amount") != reward:
+                return False
+        return all(Blockchain.verify_transaction(tx) for tx in transactions)
+
+    def _validate_blocks(
+        self, base, fork: int, last_hash: str, blocks: list, hashes: list
+    ) -> bool:
+        """
+        Checks that `blocks` validly extend the first `fork` blocks of `base`,
+        one after the other.
+
+        :param base: The (already trusted) chain the blocks build on
+        :param fork: Number of leading blocks of `base` the blocks follow
+        :param last_hash: Hash of base[fork - 1]
+        :param blocks: The blocks to check, in chain order
+        :param hashes: The hash of every block in `blocks`
+        :return: True if valid, False if not
+        """
+        return (
+            self._validate_headers(base, fork, last_hash, blocks, hashes)
+            and all(Blockchain._validate_body(block) for block in blocks)
+            and self._confirms_new_transactions(
+                fork if base is self.chain else 0, blocks
+            )
+        )
 
+    def _confirms_new_transactions(self, fork: int, blocks: list) -> bool:
+        """
+        Checks that blocks following our first `fork` blocks replay no
+        transaction: none may be confirmed within those `fork` blocks or
+        appear twice in `blocks`. This complements _validate_body, which
+        checks each block on its own.
+
+        :param fork: Number of leading blocks of our chain the blocks follow
+        :param blocks: The blocks to check, in chain order
+        :return: True if every transaction is new, False if not
+        """
+        seen = set()
+        for block in blocks:
+            for tx_id in ConfirmedTransactions.ids(block):
+                index = self.confirmed.block_index(tx_id)
+                if tx_id in seen or (index is not None and index <= fork):
+                    return False
+                seen.add(tx_id)
         return True
 
-    def resolve_conflicts(self) -> bool:
+    def find_fork_point(self, chain: list) -> int:
+        """
+        Finds how many leading blocks a peer's chain shares with ours.
+
+        Scanning back from the tip, the first peer block whose previous_hash
+        matches our cached hash at the position before it marks the end of the
+        shared prefix, so the cost is proportional to the fork depth.
+
+        :param chain: A peer's blockchain
+        :return: Length of the shared prefix (0 if even the genesis differs)
+        """
+        for position in range(min(len(self.chain), len(chain) - 1), 0, -1):
+            if chain[position]["previous_hash"] == self.block_hashes[position - 1]:
+                return position
+        return 0
+
+    def validate_suffix(self, fork: int, blocks: list):
+        """
+        Validates blocks that would replace everything after our first `fork`
+        blocks. Each block is hashed exactly once.
+
+        :param fork: Number of leading blocks shared with our chain (0 means
+            `blocks` is a whole chain, validated from its own genesis)
+        :param blocks: The blocks following the shared prefix
+        :return: The hash of every block in `blocks`, or None if invalid
+        """
+        if not blocks:
+            return None
+        hashes = [self.hash(block) for block in blocks]
+
+        if fork == 0:
+            valid = self._validate_genesis(blocks[0]) and self.validate_chain(
+                blocks, hashes
+            )
+        else:
+            valid = self._validate_blocks(
+                self.chain, fork, self.block_hashes[fork - 1], blocks, hashes
+            )
+        return hashes if valid else None
+
+    def validate_candidate(self, chain: list, full: bool = False):
+        """
+        Validates a peer's chain as a replacement for ours.
+
+        By default only the blocks after the prefix shared with our chain are
+        hashed and checked; the shared prefix is kept from our own chain. With
+        `full` (or when not even the genesis block is shared) every block is
+        hashed and checked from genesis.
+
+        :param chain: A peer's blockchain
+        :param full: Validate the whole chain instead of the divergent suffix
+        :return: A (fork, blocks, hashes) tuple for _splice_chain, or None if
+            the chain is invalid
+        """
+        fork = 0 if full else self.find_fork_point(chain)
+        blocks = chain[fork:]
+        hashes = self.validate_suffix(fork, blocks)
+        return (fork, blocks, hashes) if hashes is not None else None
+
+    def _get_json(self, node: str, path: str, params: dict = None) -> dict:
+        """
+        Sends a GET request to a peer over the shared session. The binary
+        encoding is preferred, falling back to JSON for peers without it.
+
+        :param node: Peer address, e.g. '192.168.0.5:5000'
+        :param path: Endpoint path, e.g. '/chain'
+        :param params: Optional query parameters
+        :return: The decoded response
+        """
+        response = self.session.get(
+            f"http://{node}{path}",
+            params=params,
+            headers={"Accept": PEER_ACCEPT},
+            timeout=self.peer_timeout,
+        )
+        response.raise_for_status()
+        if response.headers.get("Content-Type", "").startswith(codec.CONTENT_TYPE):
+            return codec.decode(response.content)
+        return response.json()
+
+    def _fetch_timed(self, node: str, path: str) -> dict:
+        """Like _get_json, but records how long the peer took in peer_latency."""
+        start = perf_counter()
+        try:
+            data = self._get_json(node, path)
+        except (requests.exceptions.RequestException, ValueError):
+            self.peer_latency[node] = None
+            raise
+        self.peer_latency[node] = perf_counter() - start
+        return data
+
+    def fetch_from_peers(self, path: str):
+        """
+        Sends the same GET request to all registered peers concurrently.
+
+        Each peer gets `peer_timeout` seconds, and peers that have not answered
+        once `consensus_deadline` seconds have passed are skipped.
+
+        :param path: Endpoint path, e.g. '/chain'
+        :return: Generator of (node, JSON response) pairs, in completion order
+        """
+        nodes = list(self.nodes)
+        if not nodes:
+            return
+        executor = ThreadPoolExecutor(max_workers=min(MAX_PEER_FETCHES, len(nodes)))
+        futures = {
+            executor.submit(self._fetch_timed, node, path): node for node in nodes
+        }
+        try:
+            for future in as_completed(futures, timeout=self.consensus_deadline):
+                node = futures[future]
+                try:
+                    yield node, future.result()
+                except (requests.exceptions.RequestException, ValueError) as e:
+                    print(f"Could not fetch {path} from node {node}: {e}. Skipping.")
+        except FuturesTimeoutError:
+            for future, node in futures.items():
+                if not future.done():
+                    self.peer_latency[node] = None
+                    print(f"Node {node} missed the consensus deadline. Skipping.")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _find_peer_fork_point(self, node: str, length: int) -> int:
+        """
+        Like find_fork_point, but reads the peer's chain through /headers pages,
+        walking back from its tip until the shared prefix is found.
+
+        :param node: Peer address
+        :param length: Length of the peer's chain
+        :return: Length of the shared prefix
+        """
+        top = min(len(self.chain), length - 1)
+        while top > 0:
+            first = max(1, top - MAX_HEADERS_PER_REQUEST + 1)
+            # The block at position p has index p + 1
+            params = {"start": first + 1, "limit": top - first + 1}
+            headers = self._get_json(node, "/headers", params)["headers"]
+            if len(headers) != top - first + 1:
+                raise ValueError("Peer returned an incomplete page of headers")
+            for position in range(top, first - 1, -1):
+                previous_hash = headers[position - first]["previous_hash"]
+                if previous_hash == self.block_hashes[position - 1]:
+                    return position
+            top = first - 1
+        return 0
+
+    def _download_headers(self, node: str, fork: int, length: int) -> list:
+        """
+        Downloads the headers of a peer's chain that follow the shared prefix.
+
+        :param node: Peer address
+        :param fork: Length of the shared prefix
+        :param length: Length of the peer's chain
+        :return: The peer's headers from position `fork` to its tip
+        """
+        headers = []
+        while fork + len(headers) < length:
+            params = {
+                "start": fork + len(headers) + 1,
+                "limit": min(MAX_HEADERS_PER_REQUEST, length - fork - len(headers)),
+            }
+            page = self._get_json(node, "/headers", params)["headers"]
+            if not page:
+                raise ValueError("Peer returned no headers")
+            headers.extend(page)
+        return headers
+
+    def _download_blocks(self, node: str, fork: int, length: int) -> list:
+        """
+        Downloads the blocks of a peer's chain that follow the shared prefix.
+
+        :param node: Peer address
+        :param fork: Length of the shared prefix
+        :param length: Length of the peer's chain
+        :return: The peer's blocks from position `fork` to its tip
+        """
+        blocks = []
+        while fork + len(blocks) < length:
+            params = {
+                "start": fork + len(blocks) + 1,
+                "limit": min(MAX_BLOCKS_PER_REQUEST, length - fork - len(blocks)),
+            }
+            page = self._get_json(node, "/blocks", params)["blocks"]
+            if not page:
+                raise ValueError("Peer returned no blocks")
+            blocks.extend(page)
+        return blocks
+
+    def _sync_from_peer(self, node: str, length: int):
+        """
+        Header-first sync: finds the fork point from the peer's headers and
+        checks the headers after it (links, difficulties and proofs of work)
+        before downloading the blocks they describe, and only if they carry
+        more work than our chain. Blocks we already hold in a side branch are
+        not downloaded again. Each block must then hash to its header and
+        match its Merkle root.
+
+        A peer that does not even share our genesis block (e.g. a node started
+        separately) is synced whole: its headers are checked from its own
+        genesis, as validate_chain does for full chains.
+
+        :return: A (fork, blocks, hashes) tuple for _splice_chain, or None
+        """
+        try:
+            fork = self._find_peer_fork_point(node, length)
+            headers = self._download_headers(node, fork, length)
+            header_hashes = [self.hash(header) for header in headers]
+            if fork:
+                valid = self._validate_headers(
+                    self.chain,
+                    fork,
+                    self.block_hashes[fork - 1],
+                    headers,
+                    header_hashes,
+                )
+                work = self.chain_work[fork - 1]
+            else:
+                valid = (
+                    bool(headers)
+                    and self._validate_genesis(headers[0])
+                    and self._validate_headers(
+                        headers, 1, header_hashes[0], headers[1:], header_hashes[1:]
+                    )
+                )
+                work = 0
+            if not valid:
+                print(f"Node {node} sent an invalid header chain. Skipping.")
+                return None
+            work += sum(block_work(header["difficulty"]) for header in headers)
+            if work <= self.total_work:
+                print(f"Node {node} has less work than it reported. Skipping.")
+                return None
+            known = 0
+            while known < len(headers) and header_hashes[known] in self.side_blocks:
+                known += 1
+            blocks = [self.side_blocks.get(h) for h in header_hashes[:known]]
+            blocks += self._download_blocks(node, fork + known, length)
+            hashes = header_hashes[:known]
+            hashes += [self.hash(block) for block in blocks[known:]]
+            if hashes != header_hashes or not all(
+                map(self._validate_body, blocks[known:])
+            ):
+                print(f"Node {node} sent blocks that do not match. Skipping.")
+                return None
+        except (
+            requests.exceptions.RequestException,
+            ValueError,
+            KeyError,
+            IndexError,
+            TypeError,
+            AttributeError,
+        ) as e:
+            # IndexError: our chain was replaced while we compared against it.
+            # The others: the peer answered with something that is not a
+            # well-formed page of headers or blocks.
+            print(f"Could not sync from node {node}: {e}. Skipping.")
+            return None
+        if not self._confirms_new_transactions(fork, blocks):
+            print(f"Node {node} sent blocks replaying transactions. Skipping.")
+            return None
+        return fork, blocks, hashes
+
+    def resolve_conflicts(self, full: bool = False) -> bool:
         """
         This is our consensus algorithm. It resolves conflicts by replacing
-        our chain with the longest one in the network.
+        our chain with the valid one in the network that has the most
+        cumulative work (the sum of block_work over its blocks), which is not
+        necessarily the longest. On a tie we keep our own chain.
+
+        Peers are first asked only for their chain length, work and tip hash.
+        A tip we already hold in a side branch is switched to locally.
+        Otherwise, starting with the heaviest peer, we read its headers to
+        find where it diverges from us and download just the blocks after
+        that point.
+
+        :param full: Download whole peer chains and revalidate them from
+            genesis instead of syncing only the divergent suffix
+        :return: True if our chain was replaced, False if not
+        """
+        if full:
+            return self._resolve_from_full_chains()
+        return self.adopt_heaviest(self.fetch_from_peers("/chain/length"))
+
+    def adopt_heaviest(self, answers) -> bool:
+        """
+        The second half of resolve_conflicts, for callers that ask peers for
+        /chain/length themselves (e.g. asynchronously): syncs from the
+        heaviest peer whose chain turns out valid.
 
+        :param answers: (node, /chain/length response) pairs
         :return: True if our chain was replaced, False if not
         """
-        neighbors = self.nodes
-        new_chain = None
+        # We're only looking for chains with more work than ours
+        candidates = []
+        for node, data in answers:
+            if not self._is_length_answer(data):
+                print(f"Node {node} sent a malformed chain length. Skipping.")
+            elif data["work"] > self.total_work:
+                candidates.append(
+                    (data["work"], data["length"], data["tip_hash"], node)
+                )
+        candidates.sort(reverse=True)
+
+        # Replace our chain with the heaviest peer chain that turns out valid
+        for _, length, tip_hash, node in candidates:
+            if tip_hash in self.side_blocks and self._reorg_to(tip_hash):
+                return True
+            replacement = self._sync_from_peer(node, length)
+            if replacement and self._apply_replacement(*replacement):
+                return True
 
-        # We're only looking for chains longer than ours
-        max_length = len(self.chain)
+        return False
+
+    @staticmethod
+    def _is_length_answer(data) -> bool:
+        """
+        Checks the shape of a peer's /chain/length response, so that a
+        malformed one can be skipped rather than break consensus.
+
+        :param data: Decoded JSON response
+        :return: True if it holds an integer work and length and a tip hash
+        """
+        return (
+            isinstance(data, dict)
+            and all(
+                isinstance(data.get(key), int) and not isinstance(data[key], bool)
+                for key in ("work", "length")
+            )
+            and isinstance(data.get("tip_hash"), str)
+        )
+
+    def _resolve_from_full_chains(self) -> bool:
+        """Consensus over complete peer chains, each validated from genesis."""
+        replacement = None
+
+        # We're only looking for chains with more work than ours
+        max_work = self.total_work
 
         # Grab and verify the chains from all the nodes in our network
-        for node in neighbors:
+        for node, data in self.fetch_from_peers("/chain"):
             try:
-                response = requests.get(f"http://{node}/chain")
-
-                if response.status_code == 200:
-                    length = response.json()["length"]
-                    chain = response.json()["chain"]
-
-                    # Check if the length is longer and the chain is valid
-                    if length > max_length and self.validate_chain(chain):
-                        max_length = length
-                        new_chain = chain
-            except requests.exceptions.ConnectionError:
-                print(f"Could not connect to node {node}. Skipping.")
+                chain = data["chain"]
+                work = sum(block_work(block["difficulty"]) for block in chain)
+
+                # Check if the chain has more work and is valid (which
+                # includes every block claiming the difficulty it should)
+                candidate = None
+                if work > max_work:
+                    candidate = self.validate_candidate(chain, full=True)
+            except (KeyError, IndexError, TypeError, ValueError, AttributeError) as e:
+                # The peer answered with something that is not a chain of
+                # well-formed blocks
+                print(f"Node {node} sent a malformed chain: {e}. Skipping.")
                 continue
+            if candidate:
+                max_work = work
+                replacement = candidate
 
-        # Replace our chain if we discovered a new, valid chain longer than ours
-        if new_chain:
-            self.chain = new_chain
-            return True
+        # Replace our chain if we discovered a new, valid chain heavier than ours
+        return bool(replacement) and self._apply_replacement(*replacement)
 
-        return False
+    @_synchronized
+    def _apply_replacement(self, fork: int, blocks: list, hashes: list) -> bool:
+        """
+        Splices blocks validated outside the lock onto our chain, unless our
+        chain has changed since in a way that invalidates them: they must
+        still follow our first `fork` blocks and carry more work than ours.
+        Their transactions must also be affordable, which depends on the
+        balances at the fork point and so is checked here, under the lock.
+
+        :return: True if our chain was replaced, False if not
+        """
+        if fork > len(self.block_hashes) or (
+            fork and blocks[0]["previous_hash"] != self.block_hashes[fork - 1]
+        ):
+            return False
+        work = self.chain_work[fork - 1] if fork else 0
+        work += sum(block_work(block["difficulty"]) for block in blocks)
+        if work <= self.total_work:
+            return False
+        try:
+            self._check_spends(fork, blocks)
+        except ValueError as e:
+            print(f"Rejected blocks with an invalid transaction: {e}")
+            return False
+        self._splice_chain(fork, blocks, hashes)
+        return True
+
+    def _check_spends(self, fork: int, blocks: list) -> None:
+        """
+        Checks, on a scratch view of the balances, that `blocks` could follow
+        our first `fork` blocks: every transaction in them, in order, has a
+        valid amount and fee and is covered by its sender's balance.
+
+        :raises ValueError: If a transaction fails the check
+        """
+        if fork:
+            balances = self.ledger.scratch()
+            for block in reversed(self.chain[fork:]):
+                balances.revert_block(block)
+        else:
+            balances = Ledger(self.ledger.initial_balance)
+        for block in blocks:
+            balances.check_block(block)
 
+    def add_peer_block(self, block: dict, block_hash: str) -> bool:
+        """
+        Appends a single block a peer announced, if it extends our tip. The
+        block is validated outside the lock and appended only if our tip has
+        not changed meanwhile.
+
+        :param block: The block
+        :param block_hash: Its hash
+        :return: True if the block was appended, False if it does not extend
+            our tip or is invalid
+        """
+        fork = len(self.block_hashes)
+        try:
+            if block["previous_hash"] != self.block_hashes[fork - 1]:
+                return False
+            valid = self._validate_blocks(
+                self.chain, fork, block["previous_hash"], [block], [block_hash]
+            )
+        except (KeyError, TypeError, ValueError, IndexError):
+            # IndexError: our chain was replaced while we validated against it
+            return False
+        if not valid:
+            print(f"Received an invalid block {block_hash}. Ignoring it.")
+            return False
+        return self._apply_replacement(fork, [block], [block_hash])
+
+    @_synchronized
     def new_block(
         self, proof: int, transactions: list, previous_hash: str = None
     ) -> dict:
@@ -119,103 +1115,362 @@ class Blockchain:
         """
         block = {
             "index": len(self.chain) + 1,
-            "timestamp": time(),
+            "timestamp": self.next_timestamp(),
             "transactions": transactions,
             "proof": proof,
-            "previous_hash": previous_hash or self.hash(self.chain[-1]),
+            "previous_hash": previous_hash or self.block_hashes[-1],
+            "merkle_root": merkle_root(transactions),
+            "difficulty": self.next_difficulty(),
         }
+        block_hash = self.hash(block)
 
         # The mempool is now cleared by the caller (e.g., the /mine endpoint)
-        self.chain.append(block)
+        if self.store is not None:
+            self.store.append(block, block_hash)
+            self.store.write_checkpoint(len(self.store), block_hash)
+        if not isinstance(self.chain, StoredChain):
+            self.chain.append(block)
+        self.ledger.apply_block(block)
+        self.address_index.apply_block(block)
+        self.confirmed.apply_block(block)
+        self.block_positions[block_hash] = len(self.block_hashes)
+        self.block_hashes.append(block_hash)
+        work = self.chain_work[-1] if self.chain_work else 0
+        self.chain_work.append(work + block_work(block["difficulty"]))
         return block
 
         # In the Blockchain class
 
+    def forge(self, last_block: dict, proof: int, miner: str):
+        """
+        Appends a block holding the pending transactions and the mining
+        reward, once a proof for last_block has been found. Checking the tip,
+        taking the transactions and appending the block happen under the
+        lock, so transactions arriving meanwhile either make it into the
+        block or stay pending.
+
+        :param last_block: The block the proof was found for
+        :param proof: The proof
+        :param miner: Address the mining reward is paid to
+        :return: The /mine result, or None if last_block is no longer the tip
+        """
+        with self.synchronized():
+            previous_hash = self.cached_hash(last_block)
+            if self.block_hashes[-1] != previous_hash:
+                return None
+
+            # Take the most profitable pending transactions that fit in the block
+            transactions_for_block = self.select_transactions()
+
+            # Calculate the total fees from the transactions being mined
+            total_fees = sum(tx.get("fee", 0) for tx in transactions_for_block)
+            mining_reward = MINING_REWARD + total_fees
+
+            # We must receive a reward for finding the proof.
+            # The sender is "0" to signify that this node has mined a new coin.
+            # By convention, the reward is the first transaction in the block.
+            reward_transaction = {
+                "sender": COINBASE_SENDER,
+                "recipient": miner,
+                "amount": mining_reward,
+                "signature": "0",  # Coinbase transactions don't need a real signature
+                "fee": 0,  # The reward transaction itself has no fee
+            }
+            transactions_for_block.insert(0, reward_transaction)
+
+            # Forge the new Block by adding it to the chain
+            block = self.new_block(proof, transactions_for_block, previous_hash)
+
+        return {
+            "message": "New Block Forged",
+            "index": block["index"],
+            "transactions": block["transactions"],
+            "proof": block["proof"],
+            "previous_hash": block["previous_hash"],
+            "difficulty": block["difficulty"],
+        }
+
+    def verify_transactions(self, transactions: list) -> list:
+        """
+        Verifies the signatures of many transactions, spreading large batches
+        over a pool of `verify_workers` processes.
+
+        :param transactions: Transactions to verify
+        :return: One boolean per transaction, True if its signature is valid
+        """
+        if self.verify_workers <= 1 or len(transactions) < MIN_PARALLEL_BATCH:
+            return [self.verify_transaction(tx) for tx in transactions]
+
+        if self._verify_executor is None:
+            self._verify_executor = ProcessPoolExecutor(max_workers=self.verify_workers)
+        chunksize = max(1, len(transactions) // (self.verify_workers * 4))
+        return list(
+            self._verify_executor.map(
+                Blockchain.verify_transaction, transactions, chunksize=chunksize
+            )
+        )
+
+    def close(self) -> None:
+        """
+        Shuts down the signature verification processes, if any were started.
+        The node can still verify afterwards: a new pool is started on demand.
+        """
+        if self._verify_executor is not None:
+            self._verify_executor.shutdown(cancel_futures=True)
+            self._verify_executor = None
+
+    def new_transactions(self, transactions: list) -> list:
+        """
+        Verifies a batch of transactions in parallel and adds the valid ones
+        to the mempool for the next mined Block. A transaction is rejected if
+        its sender cannot afford it on top of their pending transactions.
+
+        :param transactions: Transactions with sender, recipient, amount, fee
+            and signature fields
+        :return: For each transaction, an (index, error) tuple: the index of
+            the Block that will hold it and None, or -1 and the reason it was
+            rejected
+        """
+        transactions = [self.normalize_transaction(tx) for tx in transactions]
+        # Signatures are checked without holding the lock; balances are
+        # checked and the mempool updated under it, one batch at a time
+        verified = self.verify_transactions(transactions)
+
+        results = []
+        accepted = []
+        with self.synchronized():
+            next_index = self.last_block["index"] + 1
+            for transaction, valid in zip(transactions, verified):
+                if transaction["sender"] == COINBASE_SENDER:
+                    # Only a miner mints coins, in the block it forges
+                    results.append((-1, "Mining rewards cannot be submitted"))
+                    continue
+                if not valid:
+                    print(f"Invalid signature from sender {transaction['sender']}")
+                    results.append((-1, "Invalid transaction signature"))
+                    continue
+                try:
+                    pending = self.mempool.pending_outflow(transaction["sender"])
+                    self.ledger.check_spend(transaction, pending)
+                    self.mempool.add(transaction)
+                except ValueError as e:
+                    results.append((-1, str(e)))
+                    continue
+                accepted.append(transaction)
+                results.append((next_index, None))
+            if self.shared is not None:
+                self.shared.append_pending(accepted)
+        return results
+
+    @staticmethod
+    def normalize_transaction(transaction: dict) -> dict:
+        """
+        Returns a transaction with only the fields a pending transaction
+        keeps, which is what its id (mempool.transaction_id) is computed over.
+        """
+        fields = TRANSACTION_FIELDS + OPTIONAL_TRANSACTION_FIELDS
+        return {field: transaction[field] for field in fields if field in transaction}
+
     def new_transaction(
-        self, sender: str, recipient: str, amount: float, fee: float, signature: str
+        self,
+        sender: str,
+        recipient: str,
+        amount: float,
+        fee: float,
+        signature: str,
+        public_key: str = None,
     ) -> int:
         """
         Creates a new transaction to go into the next mined Block.
         Now includes signature verification.
 
-        :param sender: Address of the Sender (public key)
+        :param sender: Address of the Sender
         :param recipient: Address of the Recipient
         :param amount: Amount
         :param fee: Transaction fee to reward the miner
         :param signature: The digital signature of the transaction
+        :param public_key: The sender's compressed public key (hex). May be
+            omitted for legacy senders whose address is their PEM public key.
         :return: The index of the Block that will hold this transaction
         """
-        transaction_data = {
+        transaction = {
             "sender": sender,
             "recipient": recipient,
             "amount": amount,
             "fee": fee,
+            "signature": signature,
         }
+        if public_key is not None:
+            transaction["public_key"] = public_key
+        index, _ = self.new_transactions([transaction])[0]
+        return index
 
-        # The data that was signed is the transaction itself, excluding the signature
-        # We sort the keys to ensure the hash is consistent
-        transaction_string = json.dumps(transaction_data, sort_keys=True)
+    @property
+    def current_transactions(self) -> list:
+        """The pending transactions in the mempool, in arrival order."""
+        return list(self.mempool)
 
-        # Verify the signature
-        if sender != "0" and not Wallet.verify_signature(
-            sender, signature, transaction_string
-        ):
-            # The sender address is the public key
-            print(f"Invalid signature from sender {sender}")
-            return -1  # Indicate failure
+    @_synchronized
+    def select_transactions(self) -> list:
+        """
+        Removes the highest fee rate pending transactions that fit in a block
+        from the mempool. The rest stay pending for later blocks.
+
+        :return: The transactions for the next block
+        """
+        return self.mempool.pop_best(self.max_block_bytes)
+
+    @staticmethod
+    def verify_transaction(transaction: dict) -> bool:
+        """
+        Checks a transaction's signature against its sender's public key.
+        Mining rewards (sender "0") carry no signature and always pass: they
+        are only accepted as the first transaction of a block (see
+        _validate_body), never submitted on their own.
+
+        The public key is the transaction's `public_key` field, which must
+        hash to the sender's address. Legacy senders, whose address is the
+        public key itself, may omit it.
 
-        self.current_transactions.append({**transaction_data, "signature": signature})
+        :param transaction: Transaction
+        :return: True if the signature is valid, False if not
+        """
+        sender = transaction.get("sender")
+        if sender == COINBASE_SENDER:
+            return True
 
-        if not self.chain:  # Handle case where chain is empty at startup
-            return 1
-        return self.last_block["index"] + 1
+        # The data that was signed is the transaction itself, excluding the signature
+        # We sort the keys to ensure the hash is consistent
+        transaction_data = {
+            "sender": sender,
+            "recipient": transaction.get("recipient"),
+            "amount": transaction.get("amount"),
+            "fee": transaction.get("fee"),
+        }
+        transaction_string = json.dumps(transaction_data, sort_keys=True)
+        public_key = transaction.get("public_key", sender)
+        # bytes.fromhex ignores case: only lowercase keys are accepted, so
+        # each transaction has a single spelling (and id)
+        if not isinstance(sender, str) or not is_canonical_hex(public_key):
+            return False
+        if public_key != sender:
+            try:
+                if Wallet.address_of(public_key) != sender:
+                    return False
+            except ValueError:
+                return False
+        return Wallet.verify_signature(
+            public_key, str(transaction.get("signature")), transaction_string
+        )
 
     @property
     def last_block(self) -> dict:
         """Returns the last block in the chain."""
         return self.chain[-1]
 
+    def chain_page(
+        self, start: int = None, limit: int = None, descending: bool = False
+    ) -> list:
+        """
+        Returns a page of the chain, as served by /chain.
+
+        :param start: Index of the first block of the page (default: genesis,
+            or the tip when descending)
+        :param limit: Maximum number of blocks (default: all of them)
+        :param descending: Run from `start` towards genesis instead of the tip
+        :return: The blocks of the page, in the requested order
+        """
+        length = len(self.chain)
+        if start is None:
+            start = length if descending else 1
+        limit = length if limit is None else max(limit, 0)
+        if descending:
+            end = min(max(start, 0), length)
+            return list(self.chain[max(end - limit, 0) : end][::-1])
+        first = max(start, 1) - 1
+        return list(self.chain[first : first + limit])
+
     @staticmethod
     def hash(block: dict) -> str:
         """
-        Creates a SHA-256 hash of a Block.
+        Creates a SHA-256 hash of a Block's header. The transactions are
+        covered through the header's merkle_root, so a header alone can be
+        hashed and its chain checked without the transaction bodies.
 
-        :param block: Block
+        :param block: Block, or just its header
         :return: The hash string
         """
-        # We must make sure that the Dictionary is Ordered, or we'll have inconsistent hashes
-        block_string = json.dumps(block, sort_keys=True).encode()
-        return hashlib.sha256(block_string).hexdigest()
+        # The canonical encoding sorts keys and fixes the width of every
+        # number, so equal headers always hash the same
+        return hashlib.sha256(codec.encode(Blockchain.header(block))).hexdigest()
 
-    def proof_of_work(self, last_block: dict) -> int:
+    @staticmethod
+    def header(block: dict) -> dict:
+        """Returns the header fields of a block."""
+        return {field: block[field] for field in HEADER_FIELDS if field in block}
+
+    def proof_of_work(
+        self, last_block: dict, progress=None, in_process: bool = False
+    ) -> int:
         """
         Simple Proof of Work Algorithm:
-         - Find a number 'p' such that hash(last_proof, p, last_hash) contains 4 leading zeroes.
+         - Find a number 'p' such that hash(last_proof, p, last_hash) has as
+           many leading zero bits as the next block's difficulty requires.
 
         :param last_block: The last Block dictionary
+        :param progress: Optional callable receiving the number of hashes tried
+            since its previous call, invoked periodically during the search
+        :param in_process: Search in worker processes even if `mining_workers`
+            is 1, which otherwise searches in the calling thread
         :return: The new proof
         """
         last_proof = last_block["proof"]
-        last_hash = self.hash(last_block)
-        proof = 0
-        while self.validate_proof(last_proof, proof, last_hash) is False:
-            proof += 1
+        last_hash = self.cached_hash(last_block)
+        # The block after last_block sits at position last_block["index"]
+        difficulty = self.expected_difficulty(
+            last_block["index"], self.chain.__getitem__
+        )
 
-        return proof
+        if self.mining_workers != 1 or in_process:
+            proof, _ = parallel_proof_of_work(
+                last_proof,
+                last_hash,
+                workers=self.mining_workers,
+                progress=progress,
+                difficulty=difficulty,
+            )
+            return proof
+
+        start = 0
+        while True:
+            proof = search_proof(
+                last_proof, last_hash, start, start + CHUNK_SIZE, difficulty
+            )
+            if proof is not None:
+                if progress:
+                    progress(proof - start + 1)
+                return proof
+            if progress:
+                progress(CHUNK_SIZE)
+            start += CHUNK_SIZE
 
     @staticmethod
-    def validate_proof(last_proof: int, proof: int, last_hash: str) -> bool:
+    def validate_proof(
+        last_proof: int, proof: int, last_hash: str, difficulty: int = DIFFICULTY_BITS
+    ) -> bool:
         """
-        Validates the proof: Does hash(last_proof, proof, last_hash) contain 4 leading zeroes?
+        Validates the proof: Does hash(last_proof, proof, last_hash) start with
+        `difficulty` zero bits? (The default of 16 is 4 leading zero hex digits.)
 
         :param last_proof: Previous Proof
         :param proof: Current Proof
         :param last_hash: Hash of the previous block
+        :param difficulty: Number of leading zero bits required
         :return: True if correct, False if not.
         """
         guess = f"{last_proof}{proof}{last_hash}".encode()
         guess_hash = hashlib.sha256(guess).hexdigest()
-        return guess_hash[:4] == "0000"
+        return int(guess_hash, 16) >> (256 - difficulty) == 0
 
 
 # --- API Section ---
@@ -226,48 +1481,86 @@ app = Flask(__name__)
 # Generate a globally unique address for this node
 node_identifier = str(uuid4()).replace("-", "")
 
-# Instantiate the Blockchain
-blockchain = Blockchain()
+# Instantiate the Blockchain (reconfigured from the command line in __main__).
+# Processes that import the app instead, such as gunicorn workers, share the
+# chain, mempool and peers kept in BLOCKCHAIN_DATA_DIR if it is set.
+if os.environ.get("BLOCKCHAIN_DATA_DIR"):
+    blockchain = Blockchain(
+        store=BlockStore(os.environ["BLOCKCHAIN_DATA_DIR"], shared=True)
+    )
+else:
+    blockchain = Blockchain()
+
+# Announces new blocks and transactions to peers. Announcements carry the
+# port peers fetch from: BLOCKCHAIN_PORT when served by e.g. gunicorn.
+gossip = Gossip(blockchain, port=int(os.environ.get("BLOCKCHAIN_PORT", 5001)))
+
+# Background mining jobs by id, oldest first. Only one job searches at a time.
+mining_jobs = OrderedDict()
+mining_jobs_lock = threading.Lock()
+
+# How many finished jobs are kept around for /mine/status lookups.
+MAX_MINING_JOBS = 100
+
+
+def forge_block(last_block: dict, proof: int):
+    """
+    Appends a block holding the pending transactions and this node's mining
+    reward. Called by a MiningJob once it has found a proof for last_block.
+
+    :return: The /mine result, or None if last_block is no longer the tip
+    """
+    result = blockchain.forge(last_block, proof, node_identifier)
+    if result is not None:
+        gossip.announce(BLOCK, [blockchain.block_hashes[result["index"] - 1]])
+    return result
+
+
+@app.before_request
+def refresh_shared_state():
+    """Loads what other worker processes wrote before serving a request."""
+    blockchain.refresh()
 
 
 @app.route("/mine", methods=["GET"])
 def mine():
-    # We run the proof of work algorithm to get the next proof...
-    last_block = blockchain.last_block
-    proof = blockchain.proof_of_work(last_block)
-
-    # Take a snapshot of the current pending transactions and clear the mempool
-    transactions_for_block = list(blockchain.current_transactions)
-    blockchain.current_transactions = []
-
-    # Calculate the total fees from the transactions being mined
-    total_fees = sum(tx.get("fee", 0) for tx in transactions_for_block)
-    mining_reward = 1 + total_fees
-
-    # We must receive a reward for finding the proof.
-    # The sender is "0" to signify that this node has mined a new coin.
-    # By convention, the reward is the first transaction in the block.
-    reward_transaction = {
-        "sender": "0",
-        "recipient": node_identifier,
-        "amount": mining_reward,
-        "signature": "0",  # Coinbase transactions don't need a real signature
-        "fee": 0,  # The reward transaction itself has no fee
-    }
-    transactions_for_block.insert(0, reward_transaction)
-
-    # Forge the new Block by adding it to the chain
-    previous_hash = blockchain.hash(last_block)
-    block = blockchain.new_block(proof, transactions_for_block, previous_hash)
+    """
+    Starts mining the next block in the background and returns a job id.
+    If a job is already searching, its id is returned instead of starting
+    another one. Pass ?wait=true to block until the block is forged.
+    """
+    with mining_jobs_lock:
+        running = [job for job in mining_jobs.values() if job.is_alive()]
+        if running:
+            job = running[0]
+        else:
+            job = MiningJob(blockchain, forge_block)
+            mining_jobs[job.id] = job
+            while len(mining_jobs) > MAX_MINING_JOBS:
+                mining_jobs.popitem(last=False)
+            job.start()
+
+    if request.args.get("wait", "").lower() in ("1", "true", "yes"):
+        job.join()
+        if job.status != "done":
+            return jsonify(job.to_dict()), 500
+        return jsonify(job.result), 200
 
     response = {
-        "message": "New Block Forged",
-        "index": block["index"],
-        "transactions": block["transactions"],
-        "proof": block["proof"],
-        "previous_hash": block["previous_hash"],
+        "message": "Mining started",
+        "job_id": job.id,
+        "status_url": f"/mine/status/{job.id}",
     }
-    return jsonify(response), 200
+    return jsonify(response), 202
+
+
+@app.route("/mine/status/<job_id>", methods=["GET"])
+def mine_status(job_id):
+    """Reports hashes tried, hash rate and, once found, the forged block."""
+    job = mining_jobs.get(job_id)
+    if job is None:
+        return "Unknown mining job", 404
+    return jsonify(job.to_dict()), 200
 
 
 @app.route("/transactions/new", methods=["POST"])
@@ -275,7 +1568,7 @@ def new_transaction():
     values = request.get_json()
 
     # Check that the required fields are in the POST'ed data
-    required = ["sender", "recipient", "amount", "fee", "signature"]
+    required = TRANSACTION_FIELDS
     if not all(k in values for k in required):
         return (
             "Missing values (sender, recipient, amount, fee, signature are required)",
@@ -283,30 +1576,222 @@ def new_transaction():
         )
 
     # Create a new Transaction
-    index = blockchain.new_transaction(
-        values["sender"],
-        values["recipient"],
-        values["amount"],
-        values["fee"],
-        values["signature"],
-    )
+    index, error = blockchain.new_transactions([values])[0]
 
     if index == -1:
-        return "Invalid transaction signature", 400
+        return error, 400
+    gossip.announce_transactions([values])
 
     response = {"message": f"Transaction will be added to Block {index}"}
     return jsonify(response), 201
 
 
+@app.route("/transactions/batch", methods=["POST"])
+def new_transactions_batch():
+    """
+    Accepts many signed transactions in one request. Signatures are verified
+    in parallel and each transaction is accepted or rejected on its own.
+    """
+    values = request.get_json()
+    transactions = values.get("transactions") if isinstance(values, dict) else None
+    if not isinstance(transactions, list):
+        return "Error: Please supply a list of transactions", 400
+
+    # Malformed entries are rejected up front; the rest are verified together
+    results = [None] * len(transactions)
+    well_formed = []
+    for position, tx in enumerate(transactions):
+        if isinstance(tx, dict) and all(k in tx for k in TRANSACTION_FIELDS):
+            well_formed.append(position)
+        else:
+            results[position] = {
+                "accepted": False,
+                "error": "Missing values (sender, recipient, amount, fee, signature are required)",
+            }
+
+    outcomes = blockchain.new_transactions([transactions[p] for p in well_formed])
+    for position, (index, error) in zip(well_formed, outcomes):
+        if index == -1:
+            results[position] = {"accepted": False, "error": error}
+        else:
+            results[position] = {"accepted": True, "index": index}
+    gossip.announce_transactions(
+        [transactions[p] for p in well_formed if results[p]["accepted"]]
+    )
+
+    accepted = sum(result["accepted"] for result in results)
+    response = {
+        "accepted": accepted,
+        "rejected": len(results) - accepted,
+        "results": results,
+    }
+    return jsonify(response), 200
+
+
+def _wants_binary() -> bool:
+    """Whether the client's Accept header prefers the binary encoding to JSON."""
+    best = request.accept_mimetypes.best_match(["application/json", codec.CONTENT_TYPE])
+    return best == codec.CONTENT_TYPE
+
+
+def _encoded(data) -> Response:
+    """
+    Returns `data` in the binary encoding if the client's Accept header
+    prefers it, and as JSON otherwise. The response varies on Accept, so
+    caches keep the two representations apart.
+    """
+    if _wants_binary():
+        response = Response(codec.encode(data), mimetype=codec.CONTENT_TYPE)
+    else:
+        response = jsonify(data)
+    response.vary.add("Accept")
+    return response
+
+
+def _conditional(tag: str, build):
+    """
+    Answers 304 Not Modified if the client already holds the representation
+    its Accept header selects; otherwise calls `build` for the body. Either
+    way the response carries that representation's ETag: `tag` for JSON, and
+    `tag` with a -bin suffix for the binary encoding.
+
+    :param tag: Opaque tag of the current resource state, e.g. the tip hash
+    :param build: Callable returning the response data
+    """
+    etag = f"{tag}-bin" if _wants_binary() else tag
+    if etag in request.if_none_match or request.if_none_match.star_tag:
+        response = make_response("", 304)
+        response.vary.add("Accept")
+    else:
+        response = _encoded(build())
+    response.set_etag(etag)
+    return response
+
+
 @app.route("/chain", methods=["GET"])
 def full_chain():
+    """
+    Returns the chain, or a page of it with ?start=<index>&limit=<n>.
+    With ?order=desc the page runs from `start` (default: the tip) towards
+    genesis. Responses carry the tip hash as ETag, so clients sending
+    If-None-Match get a 304 while the chain is unchanged. Clients sending
+    `Accept: application/octet-stream` get the compact binary encoding.
+    """
+    length = len(blockchain.chain)
+    start = request.args.get("start", type=int)
+    limit = request.args.get("limit", type=int)
+    descending = request.args.get("order", "asc").lower() == "desc"
+
+    def page():
+        blocks = blockchain.chain_page(start, limit, descending)
+        return {"chain": blocks, "length": length}
+
+    return _conditional(blockchain.block_hashes[-1], page)
+
+
+@app.route("/chain/length", methods=["GET"])
+def chain_length():
+    """Returns the chain height, work and tip hash, so peers can skip fetching it."""
+    response = {
+        "length": len(blockchain.chain),
+        "work": blockchain.total_work,
+        "tip_hash": blockchain.block_hashes[-1],
+    }
+    return jsonify(response), 200
+
+
+def _range_args(max_limit: int) -> tuple:
+    """Reads the 1-based `start` index and the `limit` of a range request."""
+    start = max(request.args.get("start", 1, type=int), 1)
+    limit = min(max(request.args.get("limit", max_limit, type=int), 0), max_limit)
+    return start, limit
+
+
+@app.route("/headers", methods=["GET"])
+def headers():
+    """Returns the headers (blocks without transactions) of a range of blocks."""
+    start, limit = _range_args(MAX_HEADERS_PER_REQUEST)
+    blocks = blockchain.chain[start - 1 : start - 1 + limit]
     response = {
-        "chain": blockchain.chain,
+        "headers": [Blockchain.header(block) for block in blocks],
         "length": len(blockchain.chain),
     }
+    return _encoded(response)
+
+
+@app.route("/blocks", methods=["GET"])
+def blocks_range():
+    """Returns a range of full blocks, for syncing only the blocks a peer lacks."""
+    start, limit = _range_args(MAX_BLOCKS_PER_REQUEST)
+    response = {
+        "blocks": blockchain.chain[start - 1 : start - 1 + limit],
+        "length": len(blockchain.chain),
+    }
+    return _encoded(response)
+
+
+@app.route("/block/<int:index>", methods=["GET"])
+def block_by_index(index):
+    """Returns the block with the given (1-based) index and its hash."""
+    if not 1 <= index <= len(blockchain.chain):
+        return "Block not found", 404
+    block_hash = blockchain.block_hashes[index - 1]
+    return _conditional(
+        block_hash, lambda: {"block": blockchain.chain[index - 1], "hash": block_hash}
+    )
+
+
+@app.route("/block/hash/<block_hash>", methods=["GET"])
+def block_by_hash(block_hash):
+    """Returns the block with the given hash, if it is on our chain."""
+    position = blockchain.block_positions.get(block_hash)
+    if position is None:
+        return "Block not found", 404
+    return _conditional(
+        block_hash, lambda: {"block": blockchain.chain[position], "hash": block_hash}
+    )
+
+
+@app.route("/block/<int:index>/hash", methods=["GET"])
+def block_hash(index):
+    """Returns the cached hash of the block with the given (1-based) index."""
+    if not 1 <= index <= len(blockchain.block_hashes):
+        return "Block not found", 404
+    response = {"index": index, "hash": blockchain.block_hashes[index - 1]}
     return jsonify(response), 200
 
 
+@app.route("/block/<int:index>/proof/<tx>", methods=["GET"])
+def transaction_proof(index, tx):
+    """
+    Returns a Merkle inclusion proof for a transaction of the block with the
+    given (1-based) index. `tx` is either the transaction's position in the
+    block or its id. Together with the block header, the proof lets a light
+    client check that the transaction is on the chain.
+    """
+    if not 1 <= index <= len(blockchain.chain):
+        return "Block not found", 404
+    block = blockchain.chain[index - 1]
+    transactions = block["transactions"]
+    if tx.isdigit():
+        position = int(tx)
+    else:
+        ids = [transaction_id(transaction) for transaction in transactions]
+        position = ids.index(tx) if tx in ids else -1
+    if not 0 <= position < len(transactions):
+        return "Transaction not found", 404
+
+    response = {
+        "index": index,
+        "hash": blockchain.block_hashes[index - 1],
+        "header": Blockchain.header(block),
+        "position": position,
+        "transaction": transactions[position],
+        "proof": merkle_proof(transactions, position),
+    }
+    return _conditional(response["hash"], lambda: response)
+
+
 @app.route("/nodes/register", methods=["POST"])
 def register_nodes():
     values = request.get_json()
@@ -327,12 +1812,20 @@ def register_nodes():
 
 @app.route("/nodes/resolve", methods=["GET"])
 def consensus():
-    replaced = blockchain.resolve_conflicts()
+    full = request.args.get("full", "").lower() in ("1", "true", "yes")
+    replaced = blockchain.resolve_conflicts(full=full)
 
     if replaced:
-        response = {"message": "Our chain was replaced", "new_chain": blockchain.chain}
+        gossip.announce(BLOCK, [blockchain.block_hashes[-1]])
+        response = {
+            "message": "Our chain was replaced",
+            "new_chain": list(blockchain.chain),
+        }
     else:
-        response = {"message": "Our chain is authoritative", "chain": blockchain.chain}
+        response = {
+            "message": "Our chain is authoritative",
+            "chain": list(blockchain.chain),
+        }
 
     return jsonify(response), 200
 
@@ -344,6 +1837,126 @@ def get_pending_transactions():
     return jsonify(response), 200
 
 
+@app.route("/transactions/pending/<tx_id>", methods=["GET"])
+def get_pending_transaction(tx_id):
+    """Returns one pending transaction by id, for peers fetching announcements."""
+    transaction = blockchain.mempool.get(tx_id)
+    if transaction is None:
+        return "Transaction not found", 404
+    return jsonify({"transaction": transaction}), 200
+
+
+@app.route("/inv", methods=["POST"])
+def inventory():
+    """
+    Receives a peer's announcement of new blocks or transactions (their
+    hashes) and fetches the ones we lack from it in the background.
+    """
+    values = request.get_json()
+    if not isinstance(values, dict) or not isinstance(values.get("port"), int):
+        return "Error: Please supply the inventory type, hashes and port", 400
+    peer = f"{request.remote_addr}:{values['port']}"
+    try:
+        wanted = gossip.receive(values.get("type"), values.get("hashes"), peer)
+    except ValueError as e:
+        return f"Error: {e}", 400
+    return jsonify({"wanted": wanted}), 202
+
+
+def _account(address: str) -> dict:
+    """Builds the balance summary of an address."""
+    balance = blockchain.ledger.balance(address)
+    pending = blockchain.mempool.pending_outflow(address)
+    return {
+        "address": address,
+        "balance": balance,
+        "pending": pending,
+        "available": balance - pending,
+    }
+
+
+@app.route("/balance/<address>", methods=["GET"])
+def get_balance(address):
+    """
+    Returns the confirmed balance of an address, the coins its pending
+    transactions spend and what is left available to spend.
+    """
+    return jsonify(_account(address)), 200
+
+
+@app.route("/balances", methods=["GET"])
+def get_balances():
+    """
+    Returns the balance summary of every address given as a repeated
+    `address` query parameter, or of every address seen on the chain when
+    none is given.
+    """
+    addresses = request.args.getlist("address") or blockchain.ledger.balances()
+    response = {"balances": {address: _account(address) for address in addresses}}
+    return jsonify(response), 200
+
+
+@app.route("/address/<address>/transactions", methods=["GET"])
+def address_transactions(address):
+    """
+    Returns a page of the confirmed transactions sent or received by an
+    address, newest first, with ?start=<n>&limit=<n> (1-based, at most
+    MAX_HISTORY_PER_REQUEST). ?order=asc runs from the oldest instead. Only
+    the blocks holding the page's transactions are read.
+    """
+    start, limit = _range_args(MAX_HISTORY_PER_REQUEST)
+    descending = request.args.get("order", "desc").lower() == "desc"
+    total = blockchain.address_index.count(address)
+
+    def page():
+        if descending:
+            stop = max(total - start + 1, 0)
+            locations = blockchain.address_index.locations(
+                address, max(stop - limit, 0), stop
+            )[::-1]
+        else:
+            locations = blockchain.address_index.locations(
+                address, start - 1, start - 1 + limit
+            )
+        transactions = []
+        for block_index, position in locations:
+            block = blockchain.chain[block_index - 1]
+            transactions.append(
+                {
+                    "block_index": block_index,
+                    "timestamp": block["timestamp"],
+                    "transaction": block["transactions"][position],
+                }
+            )
+        return {"address": address, "total": total, "transactions": transactions}
+
+    return _conditional(blockchain.block_hashes[-1], page)
+
+
+@app.route("/stats", methods=["GET"])
+def stats():
+    """Returns node performance metrics."""
+    response = {
+        "peer_latency": blockchain.peer_latency,
+        "gossip": gossip.stats(),
+        "public_key_cache": Wallet.public_key_cache_info(),
+        "mempool": {
+            "transactions": len(blockchain.mempool),
+            "bytes": blockchain.mempool.size_bytes,
+            "max_size": blockchain.mempool.max_size,
+        },
+        "block_tree": {
+            "work": blockchain.total_work,
+            "side_blocks": len(blockchain.side_blocks),
+            "tips": [
+                {"hash": block_hash, "work": work}
+                for work, block_hash in blockchain.side_blocks.tips()
+            ],
+        },
+    }
+    return jsonify(response), 200
+
+
 @app.route("/network/graph", methods=["GET"])
 def network_graph():
     """
@@ -383,11 +1996,97 @@ def network_graph():
 if __name__ == "__main__":
     from argparse import ArgumentParser
 
+    from werkzeug.serving import WSGIRequestHandler
+
     parser = ArgumentParser()
     parser.add_argument(
         "-p", "--port", default=5001, type=int, help="port to listen on"
     )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        default=1,
+        type=int,
+        help="number of proof-of-work processes (0 uses every CPU core)",
+    )
+    parser.add_argument(
+        "-d",
+        "--data-dir",
+        default=None,
+        type=str,
+        help="directory of the on-disk block store (in-memory chain if omitted)",
+    )
+    parser.add_argument(
+        "--shared",
+        action="store_true",
+        help="share --data-dir with other node processes running at the same time",
+    )
+    parser.add_argument(
+        "--trusted-restart",
+        action="store_true",
+        help="skip revalidating the stored chain if its tip matches the checkpoint",
+    )
+    parser.add_argument(
+        "--verify-workers",
+        default=1,
+        type=int,
+        help="number of processes verifying /transactions/batch signatures",
+    )
+    parser.add_argument(
+        "--mempool-size",
+        default=DEFAULT_MAX_SIZE,
+        type=int,
+        help="maximum number of pending transactions",
+    )
+    parser.add_argument(
+        "--difficulty",
+        default=DIFFICULTY_BITS,
+        type=int,
+        help="leading zero bits required of the first block's proof-of-work hash",
+    )
+    parser.add_argument(
+        "--block-time",
+        default=TARGET_BLOCK_TIME,
+        type=float,
+        help="seconds between blocks the difficulty adapts to (0 keeps it fixed)",
+    )
+    parser.add_argument(
+        "--retarget-window",
+        default=RETARGET_WINDOW,
+        type=int,
+        help="number of blocks between difficulty adjustments",
+    )
+    parser.add_argument(
+        "--mmap",
+        action="store_true",
+        help="read blocks from the memory-mapped store on demand (needs --data-dir)",
+    )
+    parser.add_argument(
+        "--fanout",
+        default=FANOUT,
+        type=int,
+        help="number of peers each new block or transaction is announced to",
+    )
     args = parser.parse_args()
     port = args.port
 
-    app.run(host="0.0.0.0", port=port)
+    blockchain = Blockchain(
+        mining_workers=args.workers or None,
+        store=BlockStore(args.data_dir, shared=args.shared) if args.data_dir else None,
+        trusted_restart=args.trusted_restart,
+        mmap_chain=args.mmap,
+        verify_workers=args.verify_workers,
+        mempool_size=args.mempool_size,
+        difficulty=args.difficulty,
+        target_block_time=args.block_time or None,
+        retarget_window=args.retarget_window,
+    )
+    gossip = Gossip(blockchain, port=port, fanout=args.fanout)
+
+    # The development server speaks HTTP/1.0 by default, closing the connection
+    # after every response; HTTP/1.1 keeps it open for pooled clients and peers
+    WSGIRequestHandler.protocol_version = "HTTP/1.1"
+    try:
+        app.run(host="0.0.0.0", port=port)
+    finally:
+        blockchain.close()
@@ -0,0 +1,90 @@
+from collections import OrderedDict
+
+# Default number of side-branch blocks a BlockTree keeps before evicting the oldest
+DEFAULT_MAX_BLOCKS = 1_000
+
+
+class BlockTree:
+    """
+    The side branches of the block tree: valid blocks that are not (or no
+    longer) on the main chain, keyed by hash with the cumulative work of the
+    chain they end. The main chain itself lives in Blockchain.chain.
+
+    Blocks are added when a reorganization takes them off the main chain, so
+    switching back to their branch only needs the blocks the branch is
+    missing. A block's parent is either another side block or a block of the
+    main chain, where its branch forks off.
+    """
+
+    def __init__(self, max_blocks: int = DEFAULT_MAX_BLOCKS):
+        """
+        :param max_blocks: Maximum number of side blocks kept
+        """
+        self.max_blocks = max_blocks
+        self._blocks = OrderedDict()  # hash -> (block, cumulative work), oldest first
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def __contains__(self, block_hash: str) -> bool:
+        return block_hash in self._blocks
+
+    def get(self, block_hash: str):
+        """Returns the side block with the given hash, or None."""
+        entry = self._blocks.get(block_hash)
+        return entry[0] if entry else None
+
+    def work(self, block_hash: str):
+        """Returns the cumulative work of the chain ending at a side block, or None."""
+        entry = self._blocks.get(block_hash)
+        return entry[1] if entry else None
+
+    def add(self, block_hash: str, block: dict, work: int) -> None:
+        """
+        Adds a validated block, evicting the oldest side block if the tree is
+        full. A branch that loses a block this way can no longer be switched
+        back to without downloading it again.
+
+        :param block_hash: Hash of the block
+        :param block: The block
+        :param work: Cumulative work of the chain ending at the block
+        """
+        self._blocks[block_hash] = (block, work)
+        self._blocks.move_to_end(block_hash)
+        while len(self._blocks) > self.max_blocks:
+            self._blocks.popitem(last=False)
+
+    def discard(self, block_hash: str) -> None:
+        """Removes a block, e.g. because it joined the main chain."""
+        self._blocks.pop(block_hash, None)
+
+    def branch(self, block_hash: str) -> list:
+        """
+        Walks back from a side block to the first block of its branch.
+
+        :param block_hash: Hash of a side block
+        :return: The hashes of the branch's side blocks, oldest first (empty
+            if `block_hash` is not a side block). The parent of the first one
+            is where the branch forks off.
+        """
+        hashes = []
+        while block_hash in self._blocks:
+            hashes.append(block_hash)
+            block_hash = self._blocks[block_hash][0]["previous_hash"]
+        hashes.reverse()
+        return hashes
+
+    def tips(self) -> list:
+        """
+        Returns the (cumulative work, hash) of every branch tip, i.e. every
+        side block that no other side block builds on, heaviest first.
+        """
+        parents = {block["previous_hash"] for block, _ in self._blocks.values()}
+        return sorted(
+            (
+                (work, block_hash)
+                for block_hash, (_, work) in self._blocks.items()
+                if block_hash not in parents
+            ),
+            reverse=True,
+        )
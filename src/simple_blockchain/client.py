@@ -0,0 +1,62 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Seconds to wait for a node to connect and to answer, unless a call says otherwise
+DEFAULT_TIMEOUT = 5.0
+
+# Times a failed idempotent request (GET, HEAD, ...) is retried
+DEFAULT_RETRIES = 3
+
+# Retries wait backoff_factor * 2 ** (retry - 1) seconds: 0.1s, 0.2s, 0.4s, ...
+BACKOFF_FACTOR = 0.1
+
+# Keep-alive connections kept open per host
+POOL_SIZE = 32
+
+# Responses that mean the node is briefly unavailable and worth retrying
+RETRY_STATUSES = (502, 503, 504)
+
+
+class NodeSession(requests.Session):
+    """
+    The HTTP client used to talk to nodes, by nodes themselves (consensus,
+    gossip) and by the client scripts. It is a requests.Session that:
+
+    - keeps a pool of keep-alive connections per host, so repeated calls
+      skip TCP connection setup;
+    - applies a default timeout to every request that does not pass one;
+    - retries idempotent requests that fail to connect, time out reading or
+      get a 502/503/504 answer, with exponential backoff. POST requests are
+      not retried, since the node may have acted on them.
+    """
+
+    def __init__(
+        self,
+        timeout: float = DEFAULT_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+        backoff_factor: float = BACKOFF_FACTOR,
+        pool_size: int = POOL_SIZE,
+    ):
+        """
+        :param timeout: Default timeout in seconds (None waits forever)
+        :param retries: Retries per failed idempotent request (0 disables them)
+        :param backoff_factor: Base delay in seconds between retries
+        :param pool_size: Keep-alive connections kept per host
+        """
+        super().__init__()
+        self.timeout = timeout
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            # Hand the last response back instead of raising once retries run out
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_maxsize=pool_size, max_retries=retry)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
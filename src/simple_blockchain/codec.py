@@ -0,0 +1,174 @@
+import re
+import struct
+from functools import lru_cache
+
+# Content type of binary-encoded API responses
+CONTENT_TYPE = "application/octet-stream"
+
+# Every value starts with a one-byte tag, followed by:
+#   N, T, F            nothing (None, True, False)
+#   i                  a signed 8-byte big-endian integer
+#   I                  a 4-byte length and a signed big-endian integer (bigger ints)
+#   f                  an 8-byte IEEE 754 double
+#   x                  a 4-byte length and raw bytes, for lowercase hex strings
+#   s                  a 4-byte length and UTF-8 bytes, for any other string
+#   l                  a 4-byte item count and the items
+#   d                  a 4-byte item count and the (key, value) pairs, keys sorted
+_NONE, _TRUE, _FALSE = b"N", b"T", b"F"
+_INT, _BIG_INT, _FLOAT = b"i", b"I", b"f"
+_HEX, _STR, _LIST, _DICT = b"x", b"s", b"l", b"d"
+
+_TAGGED_LENGTH = struct.Struct(">cI")
+_TAGGED_INT64 = struct.Struct(">cq")
+_TAGGED_FLOAT64 = struct.Struct(">cd")
+_LENGTH = struct.Struct(">I")
+_INT64 = struct.Struct(">q")
+_FLOAT64 = struct.Struct(">d")
+_INT64_RANGE = range(-(1 << 63), 1 << 63)
+
+# Hashes, signatures, public keys and addresses are lowercase hex; they are
+# stored as the raw bytes they spell, which halves their size and round-trips
+# exactly because bytes.hex() is lowercase too.
+_is_hex = re.compile(r"(?:[0-9a-f]{2})+").fullmatch
+
+# Number of encoded strings kept by _encode_string. Field names, addresses and
+# public keys repeat across transactions, so most of them hit the cache.
+STRING_CACHE_SIZE = 8192
+
+
+@lru_cache(maxsize=STRING_CACHE_SIZE)
+def _encode_string(value: str) -> bytes:
+    if _is_hex(value):
+        return _TAGGED_LENGTH.pack(_HEX, len(value) >> 1) + bytes.fromhex(value)
+    raw = value.encode("utf-8")
+    return _TAGGED_LENGTH.pack(_STR, len(raw)) + raw
+
+
+def _encode(value, out: bytearray) -> None:
+    kind = type(value)
+    if kind is str:
+        out += _encode_string(value)
+    elif kind is float:
+        out += _TAGGED_FLOAT64.pack(_FLOAT, value)
+    elif kind is bool:
+        out += _TRUE if value else _FALSE
+    elif kind is int:
+        if value in _INT64_RANGE:
+            out += _TAGGED_INT64.pack(_INT, value)
+        else:
+            raw = value.to_bytes((value.bit_length() + 8) // 8, "big", signed=True)
+            out += _TAGGED_LENGTH.pack(_BIG_INT, len(raw))
+            out += raw
+    elif kind is dict:
+        out += _TAGGED_LENGTH.pack(_DICT, len(value))
+        for key in sorted(value):
+            if type(key) is not str:
+                raise TypeError(f"Keys must be strings, not {type(key).__name__}")
+            out += _encode_string(key)
+            _encode(value[key], out)
+    elif kind is list or kind is tuple:
+        out += _TAGGED_LENGTH.pack(_LIST, len(value))
+        for item in value:
+            _encode(item, out)
+    elif value is None:
+        out += _NONE
+    else:
+        raise TypeError(f"Cannot encode values of type {kind.__name__}")
+
+
+def encode(value) -> bytes:
+    """
+    Encodes a JSON-compatible value (such as a block) into its canonical
+    binary form. Equal values always encode to the same bytes: dict keys are
+    sorted and every number has a fixed-width representation.
+
+    :param value: None, bool, int, float, str, list, tuple or dict with
+        string keys, nested arbitrarily
+    :return: The encoded bytes
+    :raises TypeError: If the value holds anything else
+    """
+    out = bytearray()
+    _encode(value, out)
+    return bytes(out)
+
+
+# Tags as byte values, for comparing against indexed bytes
+_HEX_TAG, _STR_TAG, _INT_TAG, _FLOAT_TAG = b"xsif"
+_DICT_TAG, _LIST_TAG, _BIG_INT_TAG = b"dlI"
+_NONE_TAG, _TRUE_TAG, _FALSE_TAG = b"NTF"
+
+
+def _decode(data: bytes, offset: int) -> tuple:
+    tag = data[offset]
+    if tag == _HEX_TAG or tag == _STR_TAG:
+        (length,) = _LENGTH.unpack_from(data, offset + 1)
+        offset += 5
+        end = offset + length
+        if end > len(data):
+            raise ValueError("Truncated string")
+        if tag == _HEX_TAG:
+            return data[offset:end].hex(), end
+        return data[offset:end].decode(), end
+    offset += 1
+    if tag == _FLOAT_TAG:
+        return _FLOAT64.unpack_from(data, offset)[0], offset + 8
+    if tag == _INT_TAG:
+        return _INT64.unpack_from(data, offset)[0], offset + 8
+    if tag == _DICT_TAG:
+        (count,) = _LENGTH.unpack_from(data, offset)
+        offset += 4
+        value = {}
+        for _ in range(count):
+            # Keys are always strings, decoded inline as the hottest path
+            key_tag = data[offset]
+            (length,) = _LENGTH.unpack_from(data, offset + 1)
+            offset += 5
+            if key_tag == _STR_TAG:
+                key = data[offset : offset + length].decode()
+            elif key_tag == _HEX_TAG:
+                key = data[offset : offset + length].hex()
+            else:
+                raise ValueError(f"Dict key is not a string at offset {offset - 5}")
+            offset += length
+            value[key], offset = _decode(data, offset)
+        return value, offset
+    if tag == _LIST_TAG:
+        (count,) = _LENGTH.unpack_from(data, offset)
+        offset += 4
+        value = []
+        for _ in range(count):
+            item, offset = _decode(data, offset)
+            value.append(item)
+        return value, offset
+    if tag == _BIG_INT_TAG:
+        (length,) = _LENGTH.unpack_from(data, offset)
+        offset += 4
+        raw = data[offset : offset + length]
+        if len(raw) != length:
+            raise ValueError("Truncated integer")
+        return int.from_bytes(raw, "big", signed=True), offset + length
+    if tag == _NONE_TAG:
+        return None, offset
+    if tag == _TRUE_TAG:
+        return True, offset
+    if tag == _FALSE_TAG:
+        return False, offset
+    raise ValueError(f"Unknown tag {bytes([tag])!r} at offset {offset - 1}")
+
+
+def decode(data: bytes):
+    """
+    Decodes bytes produced by `encode`.
+
+    :param data: The encoded bytes
+    :return: The decoded value (tuples come back as lists)
+    :raises ValueError: If the data is malformed, truncated or followed by
+        trailing bytes
+    """
+    try:
+        value, offset = _decode(data, 0)
+    except (IndexError, struct.error, UnicodeDecodeError, RecursionError) as e:
+        raise ValueError(f"Malformed encoding: {e}") from e
+    if offset != len(data):
+        raise ValueError("Trailing bytes after encoded value")
+    return value
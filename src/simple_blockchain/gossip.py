@@ -0,0 +1,263 @@
+import queue
+import random
+import threading
+from collections import OrderedDict
+
+import requests
+
+from .mempool import transaction_id
+
+# Inventory types carried by /inv announcements
+BLOCK = "block"
+TRANSACTION = "tx"
+
+# Peers each announcement is sent to, chosen at random among registered nodes
+FANOUT = 8
+
+# Threads sending announcements and fetching announced items
+SENDER_THREADS = 4
+
+# Announcements and fetches waiting for a sender thread; more are dropped
+MAX_QUEUE = 10_000
+
+# Hashes accepted in one /inv request
+MAX_INVENTORY = 500
+
+# Block and transaction hashes remembered as already seen
+MAX_SEEN = 100_000
+
+
+class Gossip:
+    """
+    Pushes new blocks and transactions to peers, inventory style: a node
+    announces only their hashes (POST /inv), and a peer that does not know a
+    hash fetches the item from the announcer (/block/hash/<hash> or
+    /transactions/pending/<id>), adds it and announces it to its own peers
+    in turn, except the one it came from.
+
+    Every hash is handled once: it is remembered as seen when first
+    announced or received, so the flood stops at nodes that already have
+    it. Each announcement goes to at most `fanout` random peers. Sending and
+    fetching happen on background threads fed by a bounded queue, so request
+    handlers never wait on peers; when the queue is full, work is dropped
+    and left to consensus (/nodes/resolve) to catch up on.
+    """
+
+    def __init__(
+        self,
+        blockchain,
+        port: int = 5001,
+        fanout: int = FANOUT,
+        threads: int = SENDER_THREADS,
+    ):
+        """
+        :param blockchain: The Blockchain whose peers (`nodes`) are gossiped
+            with and which announced items are added to
+        :param port: Port this node serves on, sent with announcements so
+            peers can fetch from it
+        :param fanout: Maximum number of peers each announcement is sent to
+        :param threads: Number of background sender threads
+        """
+        self.blockchain = blockchain
+        self.port = port
+        self.fanout = fanout
+        self.threads = threads
+        self.queue = queue.Queue(maxsize=MAX_QUEUE)
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+        self._workers = []
+        self.counters = {"announced": 0, "received": 0, "fetched": 0, "dropped": 0}
+
+    def _mark_seen(self, kind: str, item_hash: str) -> bool:
+        """:return: True if the hash had not been seen before"""
+        key = (kind, item_hash)
+        with self._lock:
+            if key in self._seen:
+                self._seen.move_to_end(key)
+                return False
+            self._seen[key] = None
+            while len(self._seen) > MAX_SEEN:
+                self._seen.popitem(last=False)
+            return True
+
+    def _forget(self, kind: str, item_hash: str) -> None:
+        """Lets a later announcement of an item we failed to fetch retry it."""
+        with self._lock:
+            self._seen.pop((kind, item_hash), None)
+
+    def _known(self, kind: str, item_hash: str) -> bool:
+        if kind == BLOCK:
+            return (
+                item_hash in self.blockchain.block_positions
+                or item_hash in self.blockchain.side_blocks
+            )
+        return item_hash in self.blockchain.mempool
+
+    def _enqueue(self, task: tuple) -> None:
+        """Hands a task to the sender threads, starting them on first use."""
+        with self._lock:
+            self._workers = [worker for worker in self._workers if worker.is_alive()]
+            while len(self._workers) < self.threads:
+                worker = threading.Thread(target=self._work, daemon=True)
+                worker.start()
+                self._workers.append(worker)
+        try:
+            self.queue.put_nowait(task)
+        except queue.Full:
+            self.counters["dropped"] += 1
+            action, kind, hashes, _ = task
+            print(f"Gossip queue is full. Dropping {action} of {len(hashes)} {kind}s.")
+
+    def announce(self, kind: str, hashes: list, exclude: str = None) -> None:
+        """
+        Announces new blocks or transactions to our peers in the background.
+
+        :param kind: BLOCK or TRANSACTION
+        :param hashes: Block hashes or transaction ids
+        :param exclude: Peer the items came from, which is not told about them
+        """
+        for item_hash in hashes:
+            self._mark_seen(kind, item_hash)
+        if hashes and self.blockchain.nodes:
+            self._enqueue(("send", kind, list(hashes), exclude))
+
+    def announce_transactions(self, transactions: list) -> None:
+        """Announces transactions just accepted into the mempool."""
+        self.announce(
+            TRANSACTION,
+            [
+                transaction_id(self.blockchain.normalize_transaction(tx))
+                for tx in transactions
+            ],
+        )
+
+    def receive(self, kind: str, hashes: list, peer: str) -> int:
+        """
+        Handles an announcement from a peer: the hashes we have neither seen
+        nor hold are fetched from it in the background.
+
+        :param kind: BLOCK or TRANSACTION
+        :param hashes: Announced block hashes or transaction ids
+        :param peer: Address of the announcing node, e.g. '192.168.0.5:5000'
+        :return: The number of items that will be fetched
+        :raises ValueError: If the announcement is malformed
+        """
+        if kind not in (BLOCK, TRANSACTION):
+            raise ValueError("Unknown inventory type")
+        if not isinstance(hashes, list) or len(hashes) > MAX_INVENTORY:
+            raise ValueError(f"Please supply a list of up to {MAX_INVENTORY} hashes")
+        self.counters["received"] += len(hashes)
+        wanted = [
+            item_hash
+            for item_hash in hashes
+            if isinstance(item_hash, str)
+            and not self._known(kind, item_hash)
+            and self._mark_seen(kind, item_hash)
+        ]
+        if wanted:
+            self._enqueue(("fetch", kind, wanted, peer))
+        return len(wanted)
+
+    def _work(self) -> None:
+        while True:
+            action, kind, hashes, peer = self.queue.get()
+            try:
+                if action == "send":
+                    self._send(kind, hashes, peer)
+                elif kind == BLOCK:
+                    self._fetch_blocks(hashes, peer)
+                else:
+                    self._fetch_transactions(hashes, peer)
+            except Exception as e:
+                print(f"Gossip {action} of {kind} items failed: {e!r}")
+            finally:
+                self.queue.task_done()
+
+    def _send(self, kind: str, hashes: list, exclude: str) -> None:
+        peers = [node for node in self.blockchain.nodes if node != exclude]
+        for node in random.sample(peers, min(self.fanout, len(peers))):
+            for start in range(0, len(hashes), MAX_INVENTORY):
+                inventory = {
+                    "type": kind,
+                    "hashes": hashes[start : start + MAX_INVENTORY],
+                    "port": self.port,
+                }
+                try:
+                    response = self.blockchain.session.post(
+                        f"http://{node}/inv",
+                        json=inventory,
+                        timeout=self.blockchain.peer_timeout,
+                    )
+                    response.raise_for_status()
+                except requests.exceptions.RequestException as e:
+                    print(f"Could not announce to node {node}: {e}. Skipping.")
+                    break
+                self.counters["announced"] += len(inventory["hashes"])
+
+    def _fetch_blocks(self, hashes: list, peer: str) -> None:
+        blockchain = self.blockchain
+        for block_hash in hashes:
+            try:
+                block = blockchain._get_json(peer, f"/block/hash/{block_hash}")["block"]
+                if blockchain.hash(block) != block_hash:
+                    raise ValueError("Block does not match the announced hash")
+            except (
+                requests.exceptions.RequestException,
+                ValueError,
+                KeyError,
+                TypeError,
+            ) as e:
+                print(f"Could not fetch block {block_hash} from {peer}: {e}.")
+                self._forget(BLOCK, block_hash)
+                continue
+            self.counters["fetched"] += 1
+
+            accepted = blockchain.add_peer_block(block, block_hash)
+            if not accepted and block["previous_hash"] != blockchain.block_hashes[-1]:
+                # It does not extend our tip: we are behind or on another
+                # branch, so sync from the announcer if it has more work
+                try:
+                    length = blockchain._get_json(peer, "/chain/length")
+                except (requests.exceptions.RequestException, ValueError) as e:
+                    print(f"Could not fetch /chain/length from {peer}: {e}.")
+                    self._forget(BLOCK, block_hash)
+                    continue
+                accepted = blockchain.adopt_heaviest([(peer, length)])
+            if accepted:
+                self.announce(BLOCK, [block_hash], exclude=peer)
+
+    def _fetch_transactions(self, tx_ids: list, peer: str) -> None:
+        transactions = []
+        for tx_id in tx_ids:
+            try:
+                path = f"/transactions/pending/{tx_id}"
+                transaction = self.blockchain._get_json(peer, path)["transaction"]
+                normalized = self.blockchain.normalize_transaction(transaction)
+                if transaction_id(normalized) != tx_id:
+                    raise ValueError("Transaction does not match the announced id")
+            except (
+                requests.exceptions.RequestException,
+                ValueError,
+                KeyError,
+                TypeError,
+            ) as e:
+                # It may have been mined meanwhile; the block will follow
+                print(f"Could not fetch transaction {tx_id} from {peer}: {e}.")
+                self._forget(TRANSACTION, tx_id)
+                continue
+            transactions.append((tx_id, normalized))
+        if not transactions:
+            return
+        self.counters["fetched"] += len(transactions)
+
+        results = self.blockchain.new_transactions([tx for _, tx in transactions])
+        accepted = [
+            tx_id
+            for (tx_id, _), (index, _) in zip(transactions, results)
+            if index != -1
+        ]
+        self.announce(TRANSACTION, accepted, exclude=peer)
+
+    def stats(self) -> dict:
+        """Counters for /stats: items announced, received, fetched and dropped."""
+        return {**self.counters, "queued": self.queue.qsize()}
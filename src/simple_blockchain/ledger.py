@@ -0,0 +1,233 @@
+import math
+from collections import ChainMap
+from numbers import Real
+
+from .mempool import transaction_id
+
+# Coins every address starts with, matching the airdrop shown by the dashboard
+INITIAL_BALANCE = 100.0
+
+# Sender of mining rewards, which mint coins rather than spend them
+COINBASE_SENDER = "0"
+
+
+class Ledger:
+    """
+    Confirmed balance of every account, updated block by block.
+
+    Applying a block debits each sender by amount + fee and credits each
+    recipient by amount (the fees come back to the miner through the reward
+    transaction). Reverting a block undoes exactly that, so a chain
+    reorganization only touches the blocks past the fork point. Addresses
+    that have never appeared in a block hold the initial balance.
+    """
+
+    def __init__(self, initial_balance: float = INITIAL_BALANCE):
+        """
+        :param initial_balance: Balance of an address before its first transaction
+        """
+        self.initial_balance = initial_balance
+        self._balances = {}  # address -> balance, for every address seen in a block
+
+    def __len__(self) -> int:
+        return len(self._balances)
+
+    def balance(self, address: str) -> float:
+        """Returns the confirmed balance of an address."""
+        return self._balances.get(address, self.initial_balance)
+
+    def balances(self) -> dict:
+        """Returns the confirmed balance of every address seen in a block."""
+        return dict(self._balances)
+
+    def _credit(self, address: str, amount: float) -> None:
+        self._balances[address] = self.balance(address) + amount
+
+    def _apply_transaction(self, tx: dict) -> None:
+        if tx["sender"] != COINBASE_SENDER:
+            self._credit(tx["sender"], -(tx["amount"] + tx.get("fee", 0)))
+        self._credit(tx["recipient"], tx["amount"])
+
+    def apply_block(self, block: dict) -> None:
+        """Applies the transactions of a block appended to the chain."""
+        for tx in block["transactions"]:
+            self._apply_transaction(tx)
+
+    def revert_block(self, block: dict) -> None:
+        """Undoes the transactions of a block removed from the tip of the chain."""
+        for tx in reversed(block["transactions"]):
+            self._credit(tx["recipient"], -tx["amount"])
+            if tx["sender"] != COINBASE_SENDER:
+                self._credit(tx["sender"], tx["amount"] + tx.get("fee", 0))
+
+    def rebuild(self, chain) -> None:
+        """Recomputes every balance from the blocks of a chain."""
+        self._balances.clear()
+        for block in chain:
+            self.apply_block(block)
+
+    def scratch(self) -> "Ledger":
+        """
+        Returns a copy-on-write view of the balances: blocks can be applied,
+        reverted and checked on it without changing this ledger.
+        """
+        view = Ledger(self.initial_balance)
+        view._balances = ChainMap({}, self._balances)
+        return view
+
+    def check_block(self, block: dict) -> None:
+        """
+        Checks a block received from a peer and applies it: every transaction
+        but the mining reward must pass check_spend against the balances the
+        transactions before it leave. Use on a scratch() view, since a
+        rejected block is left partly applied.
+
+        :raises ValueError: If a transaction is invalid or unaffordable
+        """
+        for tx in block["transactions"]:
+            if tx.get("sender") != COINBASE_SENDER:
+                self.check_spend(tx)
+            elif not isinstance(tx.get("recipient"), str):
+                raise ValueError("Invalid transaction recipient")
+            self._apply_transaction(tx)
+
+    def check_spend(self, transaction: dict, pending: float = 0) -> None:
+        """
+        Checks that a sender can afford a transaction on top of the coins its
+        pending transactions already spend.
+
+        :param transaction: Transaction with sender, recipient, amount and
+            fee fields
+        :param pending: Amount + fee of the sender's pending transactions
+        :raises ValueError: If the amount, fee or recipient is invalid or the
+            balance is too low
+        """
+        if not isinstance(transaction.get("recipient"), str):
+            raise ValueError("Invalid transaction recipient")
+        amount, fee = transaction.get("amount"), transaction.get("fee", 0)
+        # NaN fails every comparison, so non-finite values are ruled out first
+        if (
+            isinstance(amount, bool)
+            or not isinstance(amount, Real)
+            or not math.isfinite(amount)
+            or amount <= 0
+        ):
+            raise ValueError("Invalid transaction amount")
+        if (
+            isinstance(fee, bool)
+            or not isinstance(fee, Real)
+            or not math.isfinite(fee)
+            or fee < 0
+        ):
+            raise ValueError("Invalid transaction fee")
+        cost = amount + fee
+        available = self.balance(transaction["sender"]) - pending
+        if cost > available:
+            raise ValueError(
+                f"Insufficient funds: {available:,.4f} available, {cost:,.4f} needed"
+            )
+
+
+class AddressIndex:
+    """
+    Location of every confirmed transaction touching an address, so the
+    history of an address can be read without scanning the chain.
+
+    Each address maps to a list of (block index, position in the block)
+    pairs in chain order. Blocks are only ever added or removed at the tip,
+    so reverting a block just pops the trailing entries it added.
+    """
+
+    def __init__(self):
+        self._locations = {}  # address -> [(block index, position), ...]
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    @staticmethod
+    def _addresses(transaction: dict) -> set:
+        return {transaction["sender"], transaction["recipient"]} - {COINBASE_SENDER}
+
+    def count(self, address: str) -> int:
+        """Returns the number of confirmed transactions touching an address."""
+        return len(self._locations.get(address, ()))
+
+    def locations(self, address: str, start: int = 0, stop: int = None) -> list:
+        """
+        Returns the (block index, position) of the transactions of an address,
+        oldest first, sliced to [start, stop).
+        """
+        return self._locations.get(address, [])[start:stop]
+
+    def apply_block(self, block: dict) -> None:
+        """Indexes the transactions of a block appended to the chain."""
+        for position, tx in enumerate(block["transactions"]):
+            for address in self._addresses(tx):
+                self._locations.setdefault(address, []).append(
+                    (block["index"], position)
+                )
+
+    def revert_block(self, block: dict) -> None:
+        """Drops the entries of a block removed from the tip of the chain."""
+        for tx in block["transactions"]:
+            for address in self._addresses(tx):
+                locations = self._locations.get(address, [])
+                while locations and locations[-1][0] == block["index"]:
+                    locations.pop()
+                if not locations:
+                    self._locations.pop(address, None)
+
+    def rebuild(self, chain) -> None:
+        """Reindexes every transaction of a chain."""
+        self._locations.clear()
+        for block in chain:
+            self.apply_block(block)
+
+
+class ConfirmedTransactions:
+    """
+    Ids of every transaction confirmed on the chain (mining rewards aside),
+    so a signed transaction is only ever spent once: resubmitting it, or a
+    block replaying it, is rejected.
+
+    Each id maps to the index of the block holding it, which tells whether
+    it was confirmed before a given fork point.
+    """
+
+    def __init__(self):
+        self._blocks = {}  # transaction id -> index of the block holding it
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def __contains__(self, tx_id: str) -> bool:
+        return tx_id in self._blocks
+
+    def block_index(self, tx_id: str):
+        """Returns the index of the block confirming a transaction, or None."""
+        return self._blocks.get(tx_id)
+
+    @staticmethod
+    def ids(block: dict) -> list:
+        """Returns the ids of a block's transactions, mining rewards excluded."""
+        return [
+            transaction_id(tx)
+            for tx in block["transactions"]
+            if tx["sender"] != COINBASE_SENDER
+        ]
+
+    def apply_block(self, block: dict) -> None:
+        """Records the transactions of a block appended to the chain."""
+        for tx_id in self.ids(block):
+            self._blocks[tx_id] = block["index"]
+
+    def revert_block(self, block: dict) -> None:
+        """Forgets the transactions of a block removed from the tip of the chain."""
+        for tx_id in self.ids(block):
+            self._blocks.pop(tx_id, None)
+
+    def rebuild(self, chain) -> None:
+        """Records every transaction of a chain."""
+        self._blocks.clear()
+        for block in chain:
+            self.apply_block(block)
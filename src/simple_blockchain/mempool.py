@@ -0,0 +1,193 @@
+import hashlib
+import heapq
+import json
+import math
+from itertools import count
+
+# Default number of transactions a Mempool holds before evicting the cheapest
+DEFAULT_MAX_SIZE = 50_000
+
+
+def transaction_id(transaction: dict) -> str:
+    """
+    Creates the id of a transaction: the SHA-256 hash of its canonical JSON.
+
+    :param transaction: Transaction, including its signature
+    :return: The id as a hex string
+    """
+    return hashlib.sha256(json.dumps(transaction, sort_keys=True).encode()).hexdigest()
+
+
+def transaction_size(transaction: dict) -> int:
+    """Returns the size of a transaction in bytes, as serialized into a block."""
+    return len(json.dumps(transaction, sort_keys=True))
+
+
+class Mempool:
+    """
+    The pool of signed transactions waiting to be mined.
+
+    Transactions are indexed by id for O(1) lookup and kept in two heaps
+    keyed by fee rate (fee per serialized byte): a max-heap to pick the most
+    profitable transactions for the next block and a min-heap to evict the
+    least profitable one when the pool is full. Heap entries of transactions
+    that have left the pool are skipped lazily and compacted away from time
+    to time.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE, confirmed=()):
+        """
+        :param max_size: Maximum number of pending transactions
+        :param confirmed: Ids of transactions already confirmed on the chain
+            (e.g. a ledger.ConfirmedTransactions), which are rejected
+        """
+        self.max_size = max_size
+        self.confirmed = confirmed
+        self._transactions = {}  # id -> transaction, in arrival order
+        self._entries = {}  # id -> (fee rate, sequence number, size)
+        self._signatures = {}  # signature -> id, to reject replays
+        self._best = []  # (-fee rate, sequence, id): highest fee rate first
+        self._worst = []  # (fee rate, -sequence, id): lowest fee rate first
+        self._sequence = count()
+        # sender -> (amount + fee of its pending transactions, their count)
+        self._outflows = {}
+        self.size_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._transactions)
+
+    def __iter__(self):
+        return iter(list(self._transactions.values()))
+
+    def __contains__(self, tx_id: str) -> bool:
+        return tx_id in self._transactions
+
+    def get(self, tx_id: str):
+        """Returns the pending transaction with the given id, or None."""
+        return self._transactions.get(tx_id)
+
+    def pending_outflow(self, sender: str) -> float:
+        """Returns the coins (amount + fee) a sender's pending transactions spend."""
+        return self._outflows.get(sender, (0, 0))[0]
+
+    def _track_outflow(self, transaction: dict, sign: int) -> None:
+        """Adds (sign=1) or removes (sign=-1) a transaction's cost from its sender."""
+        sender = transaction["sender"]
+        total, pending = self._outflows.get(sender, (0, 0))
+        pending += sign
+        if pending:
+            cost = transaction["amount"] + transaction.get("fee", 0)
+            self._outflows[sender] = (total + sign * cost, pending)
+        else:
+            # Drop the entry rather than keep float rounding residue around
+            del self._outflows[sender]
+
+    def add(self, transaction: dict) -> str:
+        """
+        Adds a transaction to the pool, evicting the lowest fee rate
+        transaction if the pool is full.
+
+        :param transaction: A verified transaction
+        :return: The transaction id
+        :raises ValueError: If the fee is invalid, the transaction (or its
+            signature) is already pending or confirmed, or the pool is full of
+            transactions paying a higher fee rate
+        """
+        tx_id = transaction_id(transaction)
+        if tx_id in self._transactions or transaction["signature"] in self._signatures:
+            raise ValueError("Duplicate transaction")
+        if tx_id in self.confirmed:
+            raise ValueError("Transaction already confirmed")
+
+        fee = transaction.get("fee", 0)
+        if (
+            isinstance(fee, bool)
+            or not isinstance(fee, (int, float))
+            or not math.isfinite(fee)
+            or fee < 0
+        ):
+            raise ValueError("Invalid transaction fee")
+
+        size = transaction_size(transaction)
+        fee_rate = fee / size
+        if len(self._transactions) >= self.max_size:
+            lowest = self._peek(self._worst)
+            if lowest is None or fee_rate <= self._entries[lowest][0]:
+                raise ValueError("Mempool is full and the fee rate is too low")
+            self.remove(lowest)
+
+        sequence = next(self._sequence)
+        self._transactions[tx_id] = transaction
+        self._entries[tx_id] = (fee_rate, sequence, size)
+        self._signatures[transaction["signature"]] = tx_id
+        heapq.heappush(self._best, (-fee_rate, sequence, tx_id))
+        heapq.heappush(self._worst, (fee_rate, -sequence, tx_id))
+        self.size_bytes += size
+        self._track_outflow(transaction, 1)
+        return tx_id
+
+    def remove(self, tx_id: str):
+        """
+        Removes a transaction from the pool, if present.
+
+        :return: The removed transaction, or None
+        """
+        transaction = self._transactions.pop(tx_id, None)
+        if transaction is None:
+            return None
+        _, _, size = self._entries.pop(tx_id)
+        del self._signatures[transaction["signature"]]
+        self.size_bytes -= size
+        self._track_outflow(transaction, -1)
+        self._compact()
+        return transaction
+
+    def remove_confirmed(self, transactions: list) -> None:
+        """Drops every transaction that has been included in a block."""
+        for transaction in transactions:
+            self.remove(transaction_id(transaction))
+
+    def pop_best(self, max_bytes: int) -> list:
+        """
+        Removes and returns the highest fee rate transactions whose combined
+        size fits in `max_bytes`. Selection stops at the first transaction that
+        does not fit, which stays in the pool with everything after it.
+
+        :param max_bytes: Space available in the block
+        :return: The selected transactions, highest fee rate first
+        """
+        selected = []
+        while True:
+            tx_id = self._peek(self._best)
+            if tx_id is None:
+                break
+            size = self._entries[tx_id][2]
+            if size > max_bytes:
+                break
+            max_bytes -= size
+            selected.append(self.remove(tx_id))
+        return selected
+
+    def clear(self) -> None:
+        """Drops every pending transaction."""
+        self._transactions.clear()
+        self._entries.clear()
+        self._signatures.clear()
+        self._best.clear()
+        self._worst.clear()
+        self._outflows.clear()
+        self.size_bytes = 0
+
+    def _peek(self, heap: list):
+        """Returns the id at the top of a heap, dropping entries no longer pooled."""
+        while heap and heap[0][2] not in self._entries:
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+    def _compact(self) -> None:
+        """Rebuilds the heaps once stale entries outnumber live ones."""
+        if len(self._best) > 2 * len(self._entries) + 64:
+            self._best = [e for e in self._best if e[2] in self._entries]
+            self._worst = [e for e in self._worst if e[2] in self._entries]
+            heapq.heapify(self._best)
+            heapq.heapify(self._worst)
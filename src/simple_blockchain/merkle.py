@@ -0,0 +1,93 @@
+import hashlib
+
+from . import codec
+
+# Leaves and interior nodes are hashed with different prefixes, so a pair of
+# transaction hashes can never be passed off as a single transaction.
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+
+def leaf_hash(transaction: dict) -> str:
+    """Returns the Merkle leaf hash of a transaction (hex)."""
+    return hashlib.sha256(LEAF_PREFIX + codec.encode(transaction)).hexdigest()
+
+
+def _node_hash(left: str, right: str) -> str:
+    data = NODE_PREFIX + bytes.fromhex(left) + bytes.fromhex(right)
+    return hashlib.sha256(data).hexdigest()
+
+
+def _levels(leaves: list) -> list:
+    """
+    Builds every level of the tree, from the leaves up to the root. A node
+    without a sibling is promoted to the next level unchanged rather than
+    paired with a copy of itself, so no two transaction lists share a root.
+    """
+    levels = [leaves]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [
+            _node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)
+        ]
+        if len(level) % 2:
+            parents.append(level[-1])
+        levels.append(parents)
+    return levels
+
+
+def merkle_root(transactions: list) -> str:
+    """
+    Computes the Merkle root of a block's transactions.
+
+    :param transactions: The transactions, in block order
+    :return: The root hash (hex); the hash of no data for an empty block
+    """
+    if not transactions:
+        return hashlib.sha256(b"").hexdigest()
+    return _levels([leaf_hash(tx) for tx in transactions])[-1][0]
+
+
+def merkle_proof(transactions: list, position: int) -> list:
+    """
+    Builds the inclusion proof of one transaction: the sibling hashes on the
+    path from its leaf to the root.
+
+    :param transactions: The transactions, in block order
+    :param position: Position of the transaction in the block
+    :return: A list of {"hash", "side"} steps, "side" telling whether the
+        sibling goes on the "left" or the "right"
+    :raises IndexError: If there is no transaction at `position`
+    """
+    if not 0 <= position < len(transactions):
+        raise IndexError("transaction position out of range")
+    proof = []
+    for level in _levels([leaf_hash(tx) for tx in transactions])[:-1]:
+        sibling = position ^ 1
+        if sibling < len(level):
+            side = "left" if sibling < position else "right"
+            proof.append({"hash": level[sibling], "side": side})
+        position //= 2
+    return proof
+
+
+def verify_proof(transaction: dict, proof: list, root: str) -> bool:
+    """
+    Checks a Merkle inclusion proof, e.g. on a light client that only holds
+    block headers.
+
+    :param transaction: The transaction claimed to be in the block
+    :param proof: Steps returned by merkle_proof
+    :param root: The block's merkle_root
+    :return: True if the proof links the transaction to the root
+    """
+    current = leaf_hash(transaction)
+    try:
+        for step in proof:
+            if step["side"] == "left":
+                current = _node_hash(step["hash"], current)
+            else:
+                current = _node_hash(current, step["hash"])
+    except (KeyError, TypeError, ValueError):
+        return False
+    return current == root
@@ -0,0 +1,253 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+from functools import lru_cache
+from time import time
+from uuid import uuid4
+
+# Number of consecutive nonces a worker scans before checking whether another
+# worker has already found a proof.
+CHUNK_SIZE = 20_000
+
+# How often (in seconds) the parent process wakes up while workers search.
+POLL_INTERVAL = 0.1
+
+# Default difficulty: the number of leading zero bits a proof's hash must
+# have. 16 bits are the original four leading zero hex digits.
+DIFFICULTY_BITS = 16
+
+# Highest difficulty a digest can satisfy (with 256 bits only one digest would)
+MAX_DIFFICULTY_BITS = 255
+
+
+@lru_cache(maxsize=None)
+def target(difficulty: int) -> bytes:
+    """
+    A digest has `difficulty` leading zero bits exactly when it sorts below
+    the returned value, so the raw 32-byte digest can be compared without
+    hex encoding.
+    """
+    if difficulty <= 0:
+        # Sorts above every 32-byte digest: any proof is accepted
+        return b"\xff" * 33
+    return (1 << (256 - difficulty)).to_bytes(32, "big")
+
+
+# Target of the default difficulty
+TARGET = target(DIFFICULTY_BITS)
+
+
+def block_work(difficulty: int) -> int:
+    """
+    Returns the work a block of the given difficulty proves: the number of
+    hashes expected to find its proof. Chains are compared by the sum.
+    """
+    return 1 << max(difficulty, 0)
+
+
+def check_proof(
+    last_proof: int, proof: int, last_hash: str, difficulty: int = DIFFICULTY_BITS
+) -> bool:
+    """
+    Fast equivalent of Blockchain.validate_proof: compares the raw digest
+    against the difficulty's target instead of formatting a hex string.
+    """
+    guess = b"%d%d%b" % (last_proof, proof, last_hash.encode())
+    return hashlib.sha256(guess).digest() < target(difficulty)
+
+
+def search_proof(
+    last_proof: int,
+    last_hash: str,
+    start: int,
+    stop: int,
+    difficulty: int = DIFFICULTY_BITS,
+):
+    """
+    Scans the nonces in [start, stop) for a proof accepted by validate_proof.
+
+    The hash state after absorbing the constant last_proof prefix is computed
+    once and copied per nonce, and the last_hash suffix is encoded up front,
+    so each iteration only formats the nonce itself.
+
+    :return: The first valid proof in the range, or None
+    """
+    copy_prefix = hashlib.sha256(b"%d" % last_proof).copy
+    suffix = last_hash.encode()
+    limit = target(difficulty)
+    for proof in range(start, stop):
+        sha = copy_prefix()
+        sha.update(b"%d%b" % (proof, suffix))
+        if sha.digest() < limit:
+            return proof
+    return None
+
+
+def _search_worker(
+    last_proof,
+    last_hash,
+    difficulty,
+    worker_id,
+    workers,
+    chunk_size,
+    found,
+    result,
+    hashes,
+):
+    """
+    Scans the chunks worker_id, worker_id + workers, worker_id + 2 * workers, ...
+    of the nonce space until this or any other worker finds a valid proof.
+    """
+    chunk = worker_id
+    while not found.is_set():
+        start = chunk * chunk_size
+        proof = search_proof(
+            last_proof, last_hash, start, start + chunk_size, difficulty
+        )
+        if proof is not None:
+            with result.get_lock():
+                if result.value < 0 or proof < result.value:
+                    result.value = proof
+            with hashes.get_lock():
+                hashes.value += proof - start + 1
+            found.set()
+            return
+        with hashes.get_lock():
+            hashes.value += chunk_size
+        chunk += workers
+
+
+def parallel_proof_of_work(
+    last_proof: int,
+    last_hash: str,
+    workers: int = None,
+    chunk_size: int = CHUNK_SIZE,
+    progress=None,
+    difficulty: int = DIFFICULTY_BITS,
+) -> tuple:
+    """
+    Finds a proof accepted by Blockchain.validate_proof using a pool of processes.
+
+    The nonce space is split into fixed-size chunks that are dealt out to the
+    workers round-robin. All workers stop as soon as one of them finds a proof.
+
+    :param last_proof: Proof of the last block
+    :param last_hash: Hash of the last block
+    :param workers: Number of worker processes (defaults to the CPU count)
+    :param chunk_size: Number of nonces a worker scans between stop checks
+    :param progress: Optional callable receiving the number of hashes tried
+        since its previous call, invoked while the workers search
+    :param difficulty: Leading zero bits the proof's hash must have
+    :return: A tuple of (proof, number of hashes tried by all workers)
+    """
+    workers = workers or os.cpu_count() or 1
+    ctx = multiprocessing.get_context()
+    found = ctx.Event()
+    result = ctx.Value("q", -1)
+    hashes = ctx.Value("Q", 0)
+
+    processes = [
+        ctx.Process(
+            target=_search_worker,
+            args=(
+                last_proof,
+                last_hash,
+                difficulty,
+                worker_id,
+                workers,
+                chunk_size,
+                found,
+                result,
+                hashes,
+            ),
+            daemon=True,
+        )
+        for worker_id in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    reported = 0
+    try:
+        while not found.wait(POLL_INTERVAL):
+            if not any(process.is_alive() for process in processes):
+                raise RuntimeError("All proof-of-work workers exited without a proof")
+            if progress:
+                total = hashes.value
+                progress(total - reported)
+                reported = total
+    finally:
+        found.set()
+        for process in processes:
+            process.join()
+
+    if progress:
+        progress(hashes.value - reported)
+    return result.value, hashes.value
+
+
+class MiningJob(threading.Thread):
+    """
+    Runs proof_of_work for the current tip in a background thread so the
+    caller can return immediately and poll the job for progress.
+
+    The proof only depends on the last block, so new transactions can keep
+    arriving while the search runs; they are picked up by `forge` once a
+    proof is found. If the tip changed in the meantime (e.g. the chain was
+    replaced by consensus), `forge` returns None and the search restarts.
+    """
+
+    def __init__(self, blockchain, forge, in_process: bool = False):
+        """
+        :param blockchain: The Blockchain to mine on
+        :param forge: Callable(last_block, proof) that appends the new block and
+            returns a result dict, or None if last_block is no longer the tip
+        :param in_process: Search in worker processes even with a single
+            mining worker, so the search never competes with this process
+            for the GIL
+        """
+        super().__init__(daemon=True)
+        self.id = uuid4().hex
+        self.blockchain = blockchain
+        self.forge = forge
+        self.in_process = in_process
+        self.status = "running"
+        self.hashes = 0
+        self.started = time()
+        self.finished = None
+        self.result = None
+        self.error = None
+
+    def _add_hashes(self, count: int) -> None:
+        self.hashes += count
+
+    def run(self) -> None:
+        try:
+            while self.result is None:
+                # Catches up with blocks mined by other processes, if shared
+                self.blockchain.refresh()
+                last_block = self.blockchain.last_block
+                proof = self.blockchain.proof_of_work(
+                    last_block, progress=self._add_hashes, in_process=self.in_process
+                )
+                self.result = self.forge(last_block, proof)
+            self.status = "done"
+        except Exception as e:
+            self.error = str(e)
+            self.status = "failed"
+        finally:
+            self.finished = time()
+
+    def to_dict(self) -> dict:
+        """Returns the job's progress in a JSON-serializable form."""
+        elapsed = (self.finished or time()) - self.started
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "hashes": self.hashes,
+            "hash_rate": self.hashes / elapsed if elapsed > 0 else 0.0,
+            "elapsed": elapsed,
+            "result": self.result,
+            "error": self.error,
+        }
@@ -0,0 +1,110 @@
+import json
+import os
+from uuid import uuid4
+
+# Starts the first line of every rewritten journal, followed by an id unique
+# to the rewrite
+JOURNAL_HEADER = b"#"
+
+
+class SharedState:
+    """
+    The node state that worker processes serving the same data directory
+    share besides the blocks themselves: the pending transactions and the
+    registered peers. Every method must be called while holding the lock of
+    the directory's shared BlockStore.
+
+    Pending transactions are kept in a journal, mempool.jsonl, with one
+    transaction per line. Accepted transactions are appended to it, and
+    whenever a worker changes the chain it rewrites the journal with its
+    mempool, which the other workers then reload. A rewritten journal
+    starts with a header line unique to the rewrite, which is how workers
+    tell it apart from the one they last read (the new file may reuse the
+    old one's inode). Peers are kept in nodes.json.
+    """
+
+    def __init__(self, directory: str):
+        """
+        :param directory: The data directory of the shared BlockStore
+        """
+        self.journal_path = os.path.join(directory, "mempool.jsonl")
+        self.nodes_path = os.path.join(directory, "nodes.json")
+        # (device, inode, first line) of the journal last read
+        self._journal_id = None
+        self._journal_offset = 0  # Bytes of it read so far
+        self._nodes_mtime = None
+
+    def read_pending(self) -> tuple:
+        """
+        Reads the transactions journaled since the last call.
+
+        :return: A (reset, transactions) tuple. If `reset` is True the journal
+            was rewritten and `transactions` is the whole pending set, which
+            replaces the caller's mempool; otherwise they are new additions.
+        """
+        try:
+            with open(self.journal_path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                journal_id = (stat.st_dev, stat.st_ino, f.readline())
+                reset = journal_id != self._journal_id
+                if reset or stat.st_size < self._journal_offset:
+                    reset, self._journal_offset = True, 0
+                f.seek(self._journal_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return False, []
+        # Only whole lines: a writer that crashed mid-append leaves a fragment
+        data = data[: data.rfind(b"\n") + 1]
+        self._journal_id = journal_id
+        self._journal_offset += len(data)
+        return reset, [
+            json.loads(line)
+            for line in data.splitlines()
+            if line and not line.startswith(JOURNAL_HEADER)
+        ]
+
+    def append_pending(self, transactions: list) -> None:
+        """Journals newly accepted transactions."""
+        if not transactions:
+            return
+        lines = "".join(json.dumps(tx, sort_keys=True) + "\n" for tx in transactions)
+        with open(self.journal_path, "ab") as f:
+            f.write(lines.encode())
+            self._journal_offset = f.tell()
+
+    def rewrite_pending(self, transactions: list) -> None:
+        """Atomically replaces the journal with the given pending transactions."""
+        tmp_path = self.journal_path + ".tmp"
+        header = JOURNAL_HEADER + uuid4().hex.encode() + b"\n"
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            for tx in transactions:
+                f.write((json.dumps(tx, sort_keys=True) + "\n").encode())
+        os.replace(tmp_path, self.journal_path)
+        stat = os.stat(self.journal_path)
+        self._journal_id = (stat.st_dev, stat.st_ino, header)
+        self._journal_offset = stat.st_size
+
+    def read_nodes(self):
+        """
+        :return: The registered peers if nodes.json changed since the last
+            call, or None
+        """
+        try:
+            mtime = os.stat(self.nodes_path).st_mtime_ns
+            if mtime == self._nodes_mtime:
+                return None
+            with open(self.nodes_path) as f:
+                nodes = set(json.load(f))
+        except (OSError, ValueError):
+            return None
+        self._nodes_mtime = mtime
+        return nodes
+
+    def write_nodes(self, nodes: set) -> None:
+        """Atomically records the registered peers."""
+        tmp_path = self.nodes_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(sorted(nodes), f)
+        os.replace(tmp_path, self.nodes_path)
+        self._nodes_mtime = os.stat(self.nodes_path).st_mtime_ns
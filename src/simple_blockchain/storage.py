@@ -0,0 +1,258 @@
+import json
+import mmap
+import os
+import struct
+from collections.abc import Sequence
+from contextlib import contextmanager
+
+from . import codec
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory file locks, so no shared stores
+    fcntl = None
+
+# Each record in the data file is a 4-byte big-endian length followed by the
+# block in its canonical binary encoding (see codec.py), the bytes it is hashed over.
+RECORD_HEADER = struct.Struct(">I")
+
+# Each entry in the index file is the 8-byte big-endian offset of a record
+# followed by the raw 32-byte SHA-256 hash of the block it holds.
+INDEX_ENTRY = struct.Struct(">Q32s")
+
+
+class BlockStore:
+    """
+    Append-only on-disk log of blocks.
+
+    The store is a directory with three files:
+     - blocks.dat: one length-prefixed binary record per block, in chain order
+     - blocks.idx: the offset and hash of every record in blocks.dat
+     - checkpoint.json: height and hash of the last tip known to be valid
+
+    The index is written after the record it points to, so it is the source of
+    truth: a record that was only partially written before a crash is dropped
+    the next time the store is opened.
+
+    A shared store may be opened by several processes at once (e.g. gunicorn
+    workers). They serialize their access with an exclusive lock on a
+    store.lock file (see `locked`) and pick up each other's writes with
+    `refresh`.
+    """
+
+    def __init__(self, directory: str, shared: bool = False):
+        """
+        :param directory: Directory holding the store files (created if missing)
+        :param shared: Whether other processes use the store at the same time
+        """
+        if shared and fcntl is None:
+            raise ValueError("Shared block stores need POSIX file locks")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.shared = shared
+        self.data_path = os.path.join(directory, "blocks.dat")
+        self.index_path = os.path.join(directory, "blocks.idx")
+        self.checkpoint_path = os.path.join(directory, "checkpoint.json")
+        self.lock_path = os.path.join(directory, "store.lock")
+
+        self._lock = open(self.lock_path, "a+b") if shared else None
+        self._data = open(self.data_path, "a+b")
+        self._index = open(self.index_path, "a+b")
+        self._map = None
+        # Bumped whenever blocks are dropped, so cached reads can be invalidated
+        self.truncations = 0
+        # Another process may be halfway through an append: wait for it
+        with self.locked():
+            self._offsets, self._hashes = self._load_index()
+
+    @contextmanager
+    def locked(self):
+        """
+        Holds the store's exclusive lock, so that no other process reads or
+        writes it meanwhile. Does nothing unless the store is shared. The lock
+        belongs to this BlockStore, not to a thread: threads sharing it must
+        serialize their use of it themselves.
+        """
+        if self._lock is None:
+            yield
+            return
+        fcntl.flock(self._lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock, fcntl.LOCK_UN)
+
+    def refresh(self) -> bool:
+        """
+        Picks up blocks appended or truncated by other processes since the
+        index was last read. Call it while holding `locked`.
+
+        :return: True if the stored blocks changed
+        """
+        size = os.fstat(self._index.fileno()).st_size
+        count = size // INDEX_ENTRY.size
+        if count == len(self._offsets):
+            if not count:
+                return False
+            # Same length: unchanged unless the tip was replaced
+            last = os.pread(
+                self._index.fileno(), INDEX_ENTRY.size, (count - 1) * INDEX_ENTRY.size
+            )
+            if INDEX_ENTRY.unpack(last) == (self._offsets[-1], self._hashes[-1]):
+                return False
+        self._unmap()
+        self.truncations += 1
+        self._offsets, self._hashes = self._load_index()
+        return True
+
+    def _load_index(self) -> tuple:
+        """
+        Reads the index and discards any trailing, partially written data.
+
+        :return: A tuple of (record offsets, raw block hashes)
+        """
+        self._index.seek(0)
+        raw = self._index.read()
+        complete = len(raw) - len(raw) % INDEX_ENTRY.size
+        entries = list(INDEX_ENTRY.iter_unpack(raw[:complete]))
+        offsets = [offset for offset, _ in entries]
+        hashes = [block_hash for _, block_hash in entries]
+        if complete != len(raw):
+            self._index.truncate(complete)
+
+        end = 0
+        if offsets:
+            self._data.seek(offsets[-1])
+            (length,) = RECORD_HEADER.unpack(self._data.read(RECORD_HEADER.size))
+            end = offsets[-1] + RECORD_HEADER.size + length
+        self._data.truncate(end)
+        return offsets, hashes
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def append(self, block: dict, block_hash: str, payload: bytes = None) -> None:
+        """
+        Appends a block record and its index entry.
+
+        :param block: Block
+        :param block_hash: The block's hash (as returned by Blockchain.hash)
+        :param payload: The block's encoding, if the caller already has it
+        """
+        if payload is None:
+            payload = codec.encode(block)
+        raw_hash = bytes.fromhex(block_hash)
+        self._data.seek(0, os.SEEK_END)
+        offset = self._data.tell()
+        self._data.write(RECORD_HEADER.pack(len(payload)) + payload)
+        self._data.flush()
+        self._index.write(INDEX_ENTRY.pack(offset, raw_hash))
+        self._index.flush()
+        self._offsets.append(offset)
+        self._hashes.append(raw_hash)
+
+    def hashes(self) -> list:
+        """Returns the hex hash of every stored block, in chain order."""
+        return [block_hash.hex() for block_hash in self._hashes]
+
+    def _mapped(self, end: int) -> mmap.mmap:
+        """
+        Returns a read-only memory map of the data file covering at least `end`
+        bytes, remapping when appends have grown the file past the old map.
+        """
+        if self._map is None or len(self._map) < end:
+            self._unmap()
+            self._map = mmap.mmap(self._data.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def _unmap(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def read_raw(self, position: int) -> bytes:
+        """Reads the encoded record of the block at the given position."""
+        offset = self._offsets[position]
+        data = self._mapped(offset + RECORD_HEADER.size)
+        (length,) = RECORD_HEADER.unpack_from(data, offset)
+        start = offset + RECORD_HEADER.size
+        return self._mapped(start + length)[start : start + length]
+
+    def read(self, position: int) -> dict:
+        """Reads the block stored at the given position (0 is the genesis block)."""
+        return codec.decode(self.read_raw(position))
+
+    def read_all(self) -> list:
+        """Reads every stored block in chain order."""
+        return [self.read(position) for position in range(len(self._offsets))]
+
+    def truncate(self, length: int) -> None:
+        """Drops every block from the given position onwards."""
+        if length >= len(self._offsets):
+            return
+        # Pages past the new end of file must not stay mapped
+        self._unmap()
+        end = self._offsets[length]
+        self.truncations += 1
+        del self._offsets[length:]
+        del self._hashes[length:]
+        self._index.truncate(length * INDEX_ENTRY.size)
+        self._data.truncate(end)
+
+    def read_checkpoint(self):
+        """
+        :return: A (height, hash) tuple for the last validated tip, or None
+        """
+        try:
+            with open(self.checkpoint_path) as f:
+                checkpoint = json.load(f)
+            return checkpoint["height"], checkpoint["hash"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def write_checkpoint(self, height: int, block_hash: str) -> None:
+        """Atomically records the height and hash of a validated tip."""
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"height": height, "hash": block_hash}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def close(self) -> None:
+        self._unmap()
+        self._data.close()
+        self._index.close()
+        if self._lock is not None:
+            self._lock.close()
+
+
+class StoredChain(Sequence):
+    """
+    A read-through, list-like view of the blocks in a BlockStore.
+
+    Blocks stay on disk (memory-mapped) and are only decoded into dicts when
+    they are accessed, so chains much larger than memory can be indexed,
+    sliced, iterated and validated. Blocks appended to the store show up in
+    the view immediately.
+    """
+
+    def __init__(self, store: BlockStore):
+        self.store = store
+        self._tip = None  # (position, truncations, block) of the last tip read
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.store.read(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("chain index out of range")
+        if index == len(self) - 1:
+            # last_block is read far more often than any other block
+            key = (index, self.store.truncations)
+            if self._tip is None or self._tip[:2] != key:
+                self._tip = (*key, self.store.read(index))
+            return self._tip[2]
+        return self.store.read(index)
@@ -1,5 +1,36 @@
+import hashlib
+from functools import lru_cache
+
 from cryptography.hazmat.primitives import serialization, hashes
 from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric.utils import (
+    decode_dss_signature,
+    encode_dss_signature,
+)
+
+# Number of parsed public keys kept by Wallet.load_public_key
+PUBLIC_KEY_CACHE_SIZE = 4096
+
+# Length in bytes of an address: a truncated SHA-256 of the compressed public key
+ADDRESS_SIZE = 20
+
+# Hex of "-----", the start of a PEM public key used as a legacy address
+PEM_PREFIX = b"-----".hex()
+
+# Order of the SECP256R1 group. A signature (r, s) is also valid as
+# (r, ORDER - s), so only the one with the lower s is accepted.
+CURVE_ORDER = 0xFFFFFFFF00000000FFFFFFFFFFFFFFFFBCE6FAADA7179E84F3B9CAC2FC632551
+
+
+def is_canonical_hex(value) -> bool:
+    """Tells whether a value is a lowercase hex string, the only accepted spelling."""
+    if not isinstance(value, str) or value != value.lower():
+        return False
+    try:
+        bytes.fromhex(value)
+    except ValueError:
+        return False
+    return value == bytes.fromhex(value).hex()
 
 
 class Wallet:
@@ -11,11 +42,27 @@ class Wallet:
         """Generates a new private/public key pair."""
         self.private_key = ec.generate_private_key(ec.SECP256R1())
         self.public_key = self.private_key.public_key()
-        # The public key is serialized to be used as the wallet's address
-        self.address = self.public_key.public_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        # The compressed point (33 bytes) is sent along with each transaction,
+        # while the much shorter address identifies the wallet on the chain
+        self.public_key_hex = self.public_key.public_bytes(
+            encoding=serialization.Encoding.X962,
+            format=serialization.PublicFormat.CompressedPoint,
         ).hex()
+        self.address = self.address_of(self.public_key_hex)
+
+    @staticmethod
+    def address_of(public_key_hex: str) -> str:
+        """
+        Derives the address of a hex-encoded compressed public key: the first
+        ADDRESS_SIZE bytes of its SHA-256 hash, hex-encoded.
+        """
+        digest = hashlib.sha256(bytes.fromhex(public_key_hex)).digest()
+        return digest[:ADDRESS_SIZE].hex()
+
+    @staticmethod
+    def is_legacy_address(address: str) -> bool:
+        """Tells whether an address is a hex-encoded PEM public key."""
+        return address.startswith(PEM_PREFIX)
 
     def get_private_key_hex(self) -> str:
         """Returns the private key serialized as PEM and then hex-encoded."""
@@ -27,23 +74,70 @@ class Wallet:
 
     def sign(self, data: str) -> str:
         """
-        Generates a signature for the given data using the private key.
+        Generates a signature for the given data using the private key, in
+        the canonical form verify_signature accepts (DER, low s, lowercase hex).
         """
         signature = self.private_key.sign(
             data.encode("utf-8"), ec.ECDSA(hashes.SHA256())
         )
-        return signature.hex()
+        r, s = decode_dss_signature(signature)
+        return encode_dss_signature(r, min(s, CURVE_ORDER - s)).hex()
+
+    @staticmethod
+    def is_canonical_signature(signature_hex: str) -> bool:
+        """
+        Tells whether a signature is in its one canonical encoding: lowercase
+        hex of a strict DER (r, s) pair with s in the lower half of the curve
+        order. Any valid signature has other encodings that verify just as
+        well; accepting only this one means a transaction cannot be replayed
+        under a different signature (and so a different id).
+        """
+        if not is_canonical_hex(signature_hex):
+            return False
+        signature = bytes.fromhex(signature_hex)
+        try:
+            r, s = decode_dss_signature(signature)
+        except ValueError:
+            return False
+        return s <= CURVE_ORDER // 2 and encode_dss_signature(r, s) == signature
+
+    @staticmethod
+    @lru_cache(maxsize=PUBLIC_KEY_CACHE_SIZE)
+    def load_public_key(public_key_hex: str):
+        """
+        Parses a hex-encoded compressed public key, or a hex-encoded PEM
+        public key (a legacy address).
+        Parsed keys are kept in a bounded LRU cache, since the same senders
+        sign many transactions and key parsing dominates verification time.
+        """
+        if Wallet.is_legacy_address(public_key_hex):
+            return serialization.load_pem_public_key(bytes.fromhex(public_key_hex))
+        return ec.EllipticCurvePublicKey.from_encoded_point(
+            ec.SECP256R1(), bytes.fromhex(public_key_hex)
+        )
+
+    @staticmethod
+    def public_key_cache_info() -> dict:
+        """Returns the hit/miss counters and size of the public key cache."""
+        info = Wallet.load_public_key.cache_info()
+        return {
+            "hits": info.hits,
+            "misses": info.misses,
+            "size": info.currsize,
+            "max_size": info.maxsize,
+        }
 
     @staticmethod
     def verify_signature(public_key_hex: str, signature_hex: str, data: str) -> bool:
         """
         Verifies a signature against the data using the public key.
         Static method so anyone can verify a transaction without needing a private key.
+        Signatures not in their canonical encoding are rejected.
         """
+        if not Wallet.is_canonical_signature(signature_hex):
+            return False
         try:
-            public_key = serialization.load_pem_public_key(
-                bytes.fromhex(public_key_hex)
-            )
+            public_key = Wallet.load_public_key(public_key_hex)
             public_key.verify(
                 bytes.fromhex(signature_hex),
                 data.encode("utf-8"),
@@ -1,14 +1,26 @@
 # simulation.py
-import requests
 import json
-import time
+import math
+import queue
 import random
+import threading
+import time
 from argparse import ArgumentParser
+from collections import Counter
 from typing import List
 
+import requests
+
 # Assuming wallet is in the simple_blockchain package
+from simple_blockchain.client import NodeSession
 from simple_blockchain.wallet import Wallet
 
+# Transactions signed up front when no rate is set (as fast as possible)
+DEFAULT_POOL_SIZE = 10_000
+
+# Largest number of transactions pre-signed for a run
+MAX_POOL_SIZE = 1_000_000
+
 
 def create_wallets(count: int) -> List[Wallet]:
     """Creates a specified number of wallets."""
@@ -29,65 +41,264 @@ def create_transaction_payload(
     # The string must be identical to the one the server will verify
     transaction_string = json.dumps(transaction_data, sort_keys=True)
     signature = sender.sign(transaction_string)
-    return {**transaction_data, "signature": signature}
+    return {
+        **transaction_data,
+        "signature": signature,
+        "public_key": sender.public_key_hex,
+    }
+
+
+def presign_transactions(wallets: List[Wallet], count: int) -> list:
+    """
+    Signs `count` random transactions between the wallets before the run, so
+    signing does not limit the send rate. Amounts are small enough that each
+    wallet's starting balance covers thousands of them.
+    """
+    print(f"Pre-signing {count:,} transactions...")
+    transactions = []
+    for _ in range(count):
+        sender, recipient = random.sample(wallets, 2)
+        amount = round(random.uniform(0.0001, 0.01), 6)
+        fee = round(random.uniform(0.0001, 0.001), 6)
+        transactions.append(create_transaction_payload(sender, recipient, amount, fee))
+    return transactions
+
+
+class LoadStats:
+    """Outcomes and latencies of the requests of a load run, shared by senders."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []  # Seconds from scheduled send time to response
+        self.accepted = 0
+        self.rejected = Counter()  # Rejected transactions by reason
+        self.errors = Counter()  # Failed requests by error
+
+    def record(self, latency: float, accepted: int, rejections: list) -> None:
+        with self.lock:
+            self.latencies.append(latency)
+            self.accepted += accepted
+            self.rejected.update(rejections)
+
+    def record_error(self, error: str, transactions: int) -> None:
+        with self.lock:
+            self.errors[error] += transactions
+
+    def report(self, elapsed: float, offered: int, tps: float) -> dict:
+        """
+        :return: Achieved TPS, counts and latency percentiles (milliseconds)
+        """
+        latencies = sorted(self.latencies)
+
+        def percentile(fraction: float):
+            if not latencies:
+                return None
+            return (
+                latencies[min(len(latencies) - 1, int(len(latencies) * fraction))]
+                * 1000
+            )
+
+        return {
+            "target_tps": tps or None,
+            "offered": offered,
+            "accepted": self.accepted,
+            "rejected": sum(self.rejected.values()),
+            "errors": sum(self.errors.values()),
+            "elapsed": elapsed,
+            "achieved_tps": self.accepted / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "rejection_reasons": dict(self.rejected.most_common(5)),
+            "error_reasons": dict(self.errors.most_common(5)),
+        }
+
+
+def send(session: NodeSession, node_url: str, transactions: list) -> tuple:
+    """
+    Submits one request: a single transaction to /transactions/new, or several
+    to /transactions/batch.
+
+    :return: (accepted count, rejection reasons)
+    :raises requests.exceptions.RequestException: If the request failed
+    """
+    if len(transactions) == 1:
+        response = session.post(f"{node_url}/transactions/new", json=transactions[0])
+        if response.status_code == 201:
+            return 1, []
+        if response.status_code == 400:
+            return 0, [response.text]
+        raise requests.exceptions.HTTPError(
+            f"Unexpected {response.status_code}", response=response
+        )
+
+    response = session.post(
+        f"{node_url}/transactions/batch", json={"transactions": transactions}
+    )
+    response.raise_for_status()
+    results = response.json()["results"]
+    rejections = [result["error"] for result in results if not result["accepted"]]
+    return len(results) - len(rejections), rejections
 
 
-def main(node_url: str, num_wallets: int, tps: float):
+def sender(node_url: str, work: queue.Queue, stats: LoadStats) -> None:
+    """Sends scheduled requests until it takes None off the queue."""
+    session = NodeSession(retries=0)
+    while True:
+        item = work.get()
+        if item is None:
+            return
+        scheduled, transactions = item
+        try:
+            accepted, rejections = send(session, node_url, transactions)
+        except requests.exceptions.HTTPError as e:
+            status = e.response.status_code if e.response is not None else "error"
+            stats.record_error(f"HTTP {status}", len(transactions))
+            continue
+        except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+            stats.record_error(type(e).__name__, len(transactions))
+            continue
+        stats.record(time.perf_counter() - scheduled, accepted, rejections)
+
+
+def run_load(
+    node_url: str,
+    transactions: list,
+    tps: float,
+    senders: int,
+    batch_size: int = 1,
+    stop: threading.Event = None,
+) -> dict:
     """
-    Runs a continuous simulation of random transactions.
+    Open-loop load generator: requests are released on a fixed schedule
+    (one every batch_size / tps seconds) whether or not earlier ones have
+    been answered, and picked up by `senders` threads. Latency is measured
+    from the scheduled send time, so a saturated node shows up as growing
+    latency instead of silently lowering the offered rate.
+
+    :param node_url: The URL of the node to load
+    :param transactions: Pre-signed transactions, each sent once
+    :param tps: Target transactions per second (0 sends as fast as possible)
+    :param senders: Number of concurrent sender threads
+    :param batch_size: Transactions per request; above 1 uses /transactions/batch
+    :param stop: Optional event that ends the run early
+    :return: The LoadStats report
+    """
+    stats = LoadStats()
+    stop = stop or threading.Event()
+    # Unbounded at a fixed rate (open loop); bounded when sending flat out so
+    # the scheduler only stays a little ahead of the senders
+    work = queue.Queue(maxsize=0 if tps else senders * 2)
+    threads = [
+        threading.Thread(target=sender, args=(node_url, work, stats), daemon=True)
+        for _ in range(senders)
+    ]
+    for thread in threads:
+        thread.start()
+
+    batches = [
+        transactions[i : i + batch_size]
+        for i in range(0, len(transactions), batch_size)
+    ]
+    interval = batch_size / tps if tps else 0.0
+    offered = 0
+    start = time.perf_counter()
+    for number, batch in enumerate(batches):
+        scheduled = start + number * interval
+        delay = scheduled - time.perf_counter()
+        if delay > 0 and stop.wait(delay):
+            break
+        if stop.is_set():
+            break
+        work.put((scheduled if tps else time.perf_counter(), batch))
+        offered += len(batch)
+
+    for _ in threads:
+        work.put(None)
+    for thread in threads:
+        thread.join()
+    return stats.report(time.perf_counter() - start, offered, tps)
+
+
+def print_report(report: dict) -> None:
+    """Prints a run's report."""
+
+    def ms(value):
+        return "-" if value is None else f"{value:.1f}ms"
+
+    print("\n--- 📊 Load Report ---")
+    target = f"{report['target_tps']:,.0f}" if report["target_tps"] else "max"
+    print(f"Target TPS:   {target}")
+    print(f"Achieved TPS: {report['achieved_tps']:,.1f}")
+    print(
+        f"Offered: {report['offered']:,}  Accepted: {report['accepted']:,}  "
+        f"Rejected: {report['rejected']:,}  Errors: {report['errors']:,}  "
+        f"in {report['elapsed']:.1f}s"
+    )
+    print(
+        f"Latency p50: {ms(report['p50_ms'])}  p95: {ms(report['p95_ms'])}  "
+        f"p99: {ms(report['p99_ms'])}"
+    )
+    for reason, count in report["rejection_reasons"].items():
+        print(f"  rejected {count:,}: {reason}")
+    for reason, count in report["error_reasons"].items():
+        print(f"  failed {count:,}: {reason}")
+
+
+def main(
+    node_url: str,
+    num_wallets: int,
+    tps: float,
+    duration: float = 10.0,
+    senders: int = 8,
+    batch_size: int = 1,
+    pool_size: int = None,
+):
+    """
+    Runs a load test of random transactions against a node and reports
+    what it sustained.
 
     :param node_url: The URL of the blockchain node to send transactions to.
     :param num_wallets: The number of wallets to simulate.
-    :param tps: The target number of transactions per second.
+    :param tps: The target number of transactions per second (0 for as many
+        as the node accepts).
+    :param duration: Seconds to run for at the target rate.
+    :param senders: Number of concurrent sender threads.
+    :param batch_size: Transactions per request (above 1 uses the batch endpoint).
+    :param pool_size: Transactions to pre-sign (tps * duration by default).
     """
-    print("--- 🎬 Starting Blockchain Transaction Simulator ---")
+    print("--- 🎬 Starting Blockchain Load Generator ---")
     print(f"Node URL: {node_url}")
-    print(f"Simulating with {num_wallets} wallets.")
-    print(f"Targeting ~{tps} transactions per second.")
+    print(f"Simulating with {num_wallets} wallets and {senders} senders.")
+    print(f"Targeting {f'~{tps}' if tps else 'as many'} transactions per second.")
 
     wallets = create_wallets(num_wallets)
-    headers = {"Content-Type": "application/json"}
-    delay = 1.0 / tps
+    if pool_size is None:
+        pool_size = math.ceil(tps * duration) if tps else DEFAULT_POOL_SIZE
+    transactions = presign_transactions(wallets, min(pool_size, MAX_POOL_SIZE))
 
-    print("\n--- 🚀 Simulation running. Press CTRL+C to stop. ---")
+    print("\n--- 🚀 Load running. Press CTRL+C to stop early. ---")
+    stop = threading.Event()
+    result = {}
+    runner = threading.Thread(
+        target=lambda: result.update(
+            run_load(node_url, transactions, tps, senders, batch_size, stop)
+        )
+    )
+    runner.start()
     try:
-        while True:
-            # 1. Select a random sender and recipient
-            sender, recipient = random.sample(wallets, 2)
-
-            # 2. Generate a random amount and fee
-            amount = round(random.uniform(0.1, 10.0), 4)
-            fee = round(random.uniform(0.001, 0.1), 4)
-
-            # 3. Create and sign the transaction
-            payload = create_transaction_payload(sender, recipient, amount, fee)
-
-            # 4. Broadcast the transaction
-            try:
-                response = requests.post(
-                    f"{node_url}/transactions/new", json=payload, headers=headers
-                )
-                if response.status_code == 201:
-                    print(
-                        f"✅ Success: {amount} coins from {sender.address[:10]}... to {recipient.address[:10]}..."
-                    )
-                else:
-                    print(f"🔥 Error: {response.status_code} - {response.text}")
-            except requests.exceptions.ConnectionError:
-                print(
-                    f"🔌 Connection Error: Could not connect to node at {node_url}. Is it running?"
-                )
-
-            # 5. Wait to maintain the target TPS
-            time.sleep(delay)
-
+        while runner.is_alive():
+            runner.join(0.2)
     except KeyboardInterrupt:
-        print("\n--- 🛑 Simulation stopped by user. ---")
+        print("\n--- 🛑 Stopping: waiting for requests in flight. ---")
+        stop.set()
+        runner.join()
+    print_report(result)
 
 
 if __name__ == "__main__":
     parser = ArgumentParser(
-        description="Run an automated transaction simulation against a blockchain node."
+        description="Run an open-loop transaction load test against a blockchain node."
     )
     parser.add_argument(
         "--node-url",
@@ -99,8 +310,40 @@ if __name__ == "__main__":
         "-w", "--wallets", default=10, type=int, help="Number of wallets to create."
     )
     parser.add_argument(
-        "-t", "--tps", default=0.5, type=float, help="Target transactions per second."
+        "-t",
+        "--tps",
+        default=0.5,
+        type=float,
+        help="Target transactions per second (0 for as fast as possible).",
+    )
+    parser.add_argument(
+        "-d", "--duration", default=10.0, type=float, help="Seconds to run for."
+    )
+    parser.add_argument(
+        "-c", "--senders", default=8, type=int, help="Concurrent sender threads."
+    )
+    parser.add_argument(
+        "-b",
+        "--batch",
+        default=1,
+        type=int,
+        help="Transactions per request; above 1 uses /transactions/batch.",
+    )
+    parser.add_argument(
+        "-n",
+        "--pool",
+        default=None,
+        type=int,
+        help="Transactions to pre-sign (default: tps * duration).",
     )
     args = parser.parse_args()
 
-    main(args.node_url, args.wallets, args.tps)
+    main(
+        args.node_url,
+        args.wallets,
+        args.tps,
+        args.duration,
+        args.senders,
+        args.batch,
+        args.pool,
+    )
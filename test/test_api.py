@@ -1,6 +1,15 @@
 # tests/test_api.py
+import json
+import threading
+import time
+
 import pytest
-from src.simple_blockchain.blockchain import app
+from src.simple_blockchain import blockchain as node
+from src.simple_blockchain import codec
+from src.simple_blockchain.blockchain import Blockchain, app
+from src.simple_blockchain.mempool import transaction_id
+from src.simple_blockchain.merkle import verify_proof
+from src.simple_blockchain.wallet import Wallet
 
 
 @pytest.fixture
@@ -22,8 +31,8 @@ def test_get_chain(client):
 
 
 def test_mine_block(client):
-    """Tests the /mine endpoint."""
-    response = client.get("/mine")
+    """Tests the /mine endpoint when waiting for the block to be forged."""
+    response = client.get("/mine?wait=true")
     assert response.status_code == 200
     data = response.get_json()
     assert data["message"] == "New Block Forged"
@@ -31,3 +40,357 @@ def test_mine_block(client):
     # After mining, the chain length should increase
     chain_response = client.get("/chain")
     assert chain_response.get_json()["length"] == data["index"]
+
+
+def test_mine_returns_job_handle(client):
+    """Tests that /mine starts a background job whose progress can be polled."""
+    response = client.get("/mine")
+    assert response.status_code == 202
+    job_id = response.get_json()["job_id"]
+
+    deadline = time.time() + 30
+    while True:
+        status = client.get(f"/mine/status/{job_id}").get_json()
+        if status["status"] != "running" or time.time() > deadline:
+            break
+        time.sleep(0.05)
+
+    assert status["status"] == "done"
+    assert status["hashes"] >= 1
+    assert status["result"]["message"] == "New Block Forged"
+
+
+def test_unknown_mining_job(client):
+    """Tests that polling an unknown job id returns 404."""
+    assert client.get("/mine/status/does-not-exist").status_code == 404
+
+
+def test_block_hash(client):
+    """Tests that /block/<index>/hash serves the cached hash of a block."""
+    chain = client.get("/chain").get_json()["chain"]
+    response = client.get(f"/block/{len(chain)}/hash")
+    assert response.status_code == 200
+    assert response.get_json()["hash"] == Blockchain.hash(chain[-1])
+    assert client.get(f"/block/{len(chain) + 1}/hash").status_code == 404
+
+
+def test_chain_length_and_ranges(client):
+    """Tests the lightweight sync endpoints: length, headers and block ranges."""
+    chain = client.get("/chain").get_json()["chain"]
+
+    data = client.get("/chain/length").get_json()
+    assert data["length"] == len(chain)
+    assert data["tip_hash"] == Blockchain.hash(chain[-1])
+    assert data["work"] == sum(1 << block["difficulty"] for block in chain)
+
+    headers = client.get("/headers?start=1&limit=2").get_json()["headers"]
+    assert headers[0] == {k: v for k, v in chain[0].items() if k != "transactions"}
+    assert len(headers) == min(2, len(chain))
+
+    blocks = client.get(f"/blocks?start={len(chain)}").get_json()["blocks"]
+    assert blocks == chain[-1:]
+
+
+def test_chain_pagination(client):
+    """Tests /chain paging from genesis and from the tip."""
+    client.get("/mine?wait=true")
+    chain = client.get("/chain").get_json()["chain"]
+
+    page = client.get("/chain?start=2&limit=1").get_json()
+    assert page["chain"] == chain[1:2]
+    assert page["length"] == len(chain)
+
+    newest = client.get("/chain?order=desc&limit=2").get_json()["chain"]
+    assert newest == chain[::-1][:2]
+
+
+def test_chain_etag(client):
+    """Tests that an unchanged chain answers If-None-Match with 304."""
+    response = client.get("/chain")
+    etag = response.headers["ETag"]
+
+    cached = client.get("/chain", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.data == b""
+
+    client.get("/mine?wait=true")
+    changed = client.get("/chain", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_etags_differ_per_representation(client):
+    """Tests that the JSON and binary encodings never share an ETag."""
+    block_hash = client.get("/block/1").get_json()["hash"]
+    binary = {"Accept": codec.CONTENT_TYPE}
+
+    for path in ("/chain", "/block/1", f"/block/hash/{block_hash}"):
+        as_json = client.get(path)
+        as_binary = client.get(path, headers=binary)
+        assert as_binary.headers["ETag"] != as_json.headers["ETag"], path
+        assert "Accept" in as_json.headers["Vary"], path
+        assert "Accept" in as_binary.headers["Vary"], path
+
+        stale = {**binary, "If-None-Match": as_json.headers["ETag"]}
+        assert client.get(path, headers=stale).status_code == 200, path
+        fresh = {**binary, "If-None-Match": as_binary.headers["ETag"]}
+        cached = client.get(path, headers=fresh)
+        assert cached.status_code == 304, path
+        assert "Accept" in cached.headers["Vary"], path
+
+
+def test_block_lookup(client):
+    """Tests looking a block up by index and by hash."""
+    chain = client.get("/chain").get_json()["chain"]
+    block_hash = Blockchain.hash(chain[0])
+
+    by_index = client.get("/block/1").get_json()
+    assert by_index == {"block": chain[0], "hash": block_hash}
+    assert client.get(f"/block/hash/{block_hash}").get_json() == by_index
+    assert client.get("/block/hash/unknown").status_code == 404
+    assert client.get(f"/block/{len(chain) + 1}").status_code == 404
+
+
+def signed_transaction(sender: Wallet, recipient: Wallet, amount: float) -> dict:
+    """Builds a transaction payload signed by `sender`."""
+    transaction_data = {
+        "sender": sender.address,
+        "recipient": recipient.address,
+        "amount": amount,
+        "fee": 0.01,
+    }
+    signature = sender.sign(json.dumps(transaction_data, sort_keys=True))
+    return {
+        **transaction_data,
+        "signature": signature,
+        "public_key": sender.public_key_hex,
+    }
+
+
+def test_transaction_batch(client):
+    """Tests that a batch reports acceptance or rejection per transaction."""
+    alice, bob = Wallet(), Wallet()
+    valid = signed_transaction(alice, bob, 2.5)
+    forged = {**signed_transaction(alice, bob, 1.0), "amount": 100.0}
+    malformed = {"sender": alice.address}
+
+    response = client.post(
+        "/transactions/batch", json={"transactions": [valid, forged, malformed]}
+    )
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["accepted"] == 1
+    assert data["rejected"] == 2
+    assert [r["accepted"] for r in data["results"]] == [True, False, False]
+
+    pending = client.get("/transactions/pending").get_json()["transactions"]
+    assert valid in pending
+    assert forged not in pending
+
+
+def test_duplicate_transaction_rejected(client):
+    """Tests that resubmitting a pending or mined transaction is rejected."""
+    alice, bob = Wallet(), Wallet()
+    transaction = signed_transaction(alice, bob, 1.5)
+
+    assert client.post("/transactions/new", json=transaction).status_code == 201
+    response = client.post("/transactions/new", json=transaction)
+    assert response.status_code == 400
+    assert b"Duplicate" in response.data
+
+    # Once mined, it cannot be spent a second time either
+    client.get("/mine?wait=true")
+    balance = client.get(f"/balance/{alice.address}").get_json()["balance"]
+    response = client.post("/transactions/new", json=transaction)
+    assert response.status_code == 400
+    assert b"already confirmed" in response.data
+    assert client.get(f"/balance/{alice.address}").get_json()["balance"] == balance
+
+
+def test_balance_endpoints(client):
+    """Tests that balances account for pending transactions."""
+    alice, bob = Wallet(), Wallet()
+    transaction = signed_transaction(alice, bob, 30)
+    assert client.post("/transactions/new", json=transaction).status_code == 201
+
+    account = client.get(f"/balance/{alice.address}").get_json()
+    assert account["pending"] == pytest.approx(30.01)
+    assert account["available"] == pytest.approx(account["balance"] - 30.01)
+
+    response = client.get(
+        "/balances", query_string=[("address", alice.address), ("address", bob.address)]
+    )
+    balances = response.get_json()["balances"]
+    assert balances[alice.address] == account
+    assert balances[bob.address]["pending"] == 0
+
+    overspend = signed_transaction(alice, bob, account["available"])
+    response = client.post("/transactions/new", json=overspend)
+    assert response.status_code == 400
+    assert b"Insufficient funds" in response.data
+
+
+def test_minting_transactions_rejected(client):
+    """Tests that transactions posing as mining rewards are rejected."""
+    minted = {
+        "sender": "0",
+        "recipient": Wallet().address,
+        "amount": 1e9,
+        "fee": 0,
+        "signature": "junk",
+    }
+
+    response = client.post("/transactions/new", json=minted)
+    assert response.status_code == 400
+    assert b"Mining rewards" in response.data
+    response = client.post("/transactions/batch", json={"transactions": [minted]})
+    assert response.get_json()["accepted"] == 0
+
+
+def test_non_finite_amount_rejected(client):
+    """Tests that a signed NaN amount neither enters the mempool nor the balances."""
+    alice, bob = Wallet(), Wallet()
+    transaction = signed_transaction(alice, bob, float("nan"))
+
+    response = client.post("/transactions/new", json=transaction)
+    assert response.status_code == 400
+    assert b"Invalid transaction amount" in response.data
+    account = client.get(f"/balance/{alice.address}").get_json()
+    assert account["pending"] == 0
+
+
+def test_address_history(client):
+    """Tests that an address's confirmed transactions are served in pages."""
+    alice, bob = Wallet(), Wallet()
+    for amount in (1, 2, 3):
+        payment = signed_transaction(alice, bob, amount)
+        assert client.post("/transactions/new", json=payment).status_code == 201
+    mined = client.get("/mine?wait=true").get_json()
+
+    response = client.get(f"/address/{bob.address}/transactions?limit=2")
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["total"] == 3
+    assert len(data["transactions"]) == 2
+    assert all(item["block_index"] == mined["index"] for item in data["transactions"])
+
+    oldest_first = client.get(
+        f"/address/{bob.address}/transactions?order=asc&start=3"
+    ).get_json()
+    assert oldest_first["transactions"] == data["transactions"][:1]
+
+    empty = client.get(f"/address/{Wallet().address}/transactions").get_json()
+    assert empty == {"address": empty["address"], "total": 0, "transactions": []}
+
+
+def test_binary_chain(client):
+    """Tests that /chain serves the binary encoding when the client asks for it."""
+    client.get("/mine?wait=true")
+    as_json = client.get("/chain").get_json()
+
+    response = client.get("/chain", headers={"Accept": codec.CONTENT_TYPE})
+    assert response.status_code == 200
+    assert response.mimetype == codec.CONTENT_TYPE
+    assert codec.decode(response.data) == as_json
+    assert len(response.data) < len(json.dumps(as_json))
+
+
+def test_transaction_inclusion_proof(client):
+    """Tests that a proof links a mined transaction to its block header."""
+    alice, bob = Wallet(), Wallet()
+    payment = signed_transaction(alice, bob, 4)
+    client.post("/transactions/new", json=payment)
+    index = client.get("/mine?wait=true").get_json()["index"]
+    block = client.get(f"/block/{index}").get_json()["block"]
+    position = block["transactions"].index(payment)
+
+    by_position = client.get(f"/block/{index}/proof/{position}").get_json()
+    by_id = client.get(f"/block/{index}/proof/{transaction_id(payment)}").get_json()
+    assert by_position == by_id
+    assert by_position["transaction"] == payment
+    assert verify_proof(
+        payment, by_position["proof"], by_position["header"]["merkle_root"]
+    )
+    assert client.get(f"/block/{index}/proof/999").status_code == 404
+
+
+def test_concurrent_transactions_and_mining_lose_nothing(monkeypatch):
+    """
+    Fires /transactions/new and /mine from many threads at once and checks
+    that every accepted transaction ends up in exactly one block.
+    """
+    monkeypatch.setattr(
+        node, "blockchain", Blockchain(difficulty=4, target_block_time=None)
+    )
+    app.config["TESTING"] = True
+    wallets = [Wallet() for _ in range(8)]
+    batches = [
+        [signed_transaction(sender, wallets[0], 1 + i / 100) for i in range(15)]
+        for sender in wallets[1:5]
+    ]
+    accepted, errors = [], []
+    submitting = threading.Event()
+    submitting.set()
+
+    def submit(batch: list) -> None:
+        with app.test_client() as client:
+            for transaction in batch:
+                response = client.post("/transactions/new", json=transaction)
+                if response.status_code == 201:
+                    accepted.append(transaction["signature"])
+                else:
+                    errors.append(response.get_data(as_text=True))
+
+    def keep_mining() -> None:
+        with app.test_client() as client:
+            while submitting.is_set():
+                assert client.get("/mine?wait=true").status_code == 200
+
+    submitters = [threading.Thread(target=submit, args=(b,)) for b in batches]
+    miners = [threading.Thread(target=keep_mining) for _ in range(2)]
+    for thread in submitters + miners:
+        thread.start()
+    for thread in submitters:
+        thread.join()
+    submitting.clear()
+    for thread in miners:
+        thread.join()
+
+    with app.test_client() as client:
+        assert client.get("/mine?wait=true").status_code == 200
+        chain = client.get("/chain").get_json()["chain"]
+        pending = client.get("/transactions/pending").get_json()["transactions"]
+
+    assert errors == []
+    assert len(accepted) == 60
+    mined = [
+        tx["signature"]
+        for block in chain
+        for tx in block["transactions"]
+        if tx["sender"] != "0"
+    ]
+    assert sorted(mined) == sorted(accepted)
+    assert pending == []
+
+
+def test_gossip_endpoints(client):
+    """Tests serving announced transactions and receiving announcements."""
+    alice, bob = Wallet(), Wallet()
+    transaction = signed_transaction(alice, bob, 5)
+    assert client.post("/transactions/new", json=transaction).status_code == 201
+
+    tx_id = transaction_id(transaction)
+    response = client.get(f"/transactions/pending/{tx_id}")
+    assert response.get_json()["transaction"] == transaction
+    assert client.get(f"/transactions/pending/{'0' * 64}").status_code == 404
+
+    # Blocks and transactions we already hold are not fetched again
+    tip = node.blockchain.block_hashes[-1]
+    for kind, item_hash in (("block", tip), ("tx", tx_id)):
+        inventory = {"type": kind, "hashes": [item_hash], "port": 5001}
+        response = client.post("/inv", json=inventory)
+        assert response.status_code == 202
+        assert response.get_json()["wanted"] == 0
+    response = client.post("/inv", json={"type": "block", "hashes": "x", "port": 1})
+    assert response.status_code == 400
+    assert "gossip" in client.get("/stats").get_json()
@@ -0,0 +1,273 @@
+# tests/test_async_node.py
+import asyncio
+import json
+import socketserver
+import threading
+
+import pytest
+import requests
+
+from simple_blockchain import codec
+from simple_blockchain.async_node import AsyncNode, fetch_json, start_server
+from simple_blockchain.blockchain import Blockchain
+from simple_blockchain.wallet import Wallet
+
+
+class RunningNode:
+    """An AsyncNode served on a free local port by an event loop in a thread."""
+
+    def __init__(self, blockchain: Blockchain):
+        self.node = AsyncNode(blockchain)
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        self.server = self.call(start_server(self.node, "127.0.0.1", 0))
+        self.address = "127.0.0.1:%d" % self.server.sockets[0].getsockname()[1]
+        self.url = f"http://{self.address}"
+
+    def call(self, coroutine):
+        """Runs a coroutine on the node's loop and returns its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(30)
+
+    def close(self) -> None:
+        self.call(self._shutdown())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    async def _shutdown(self) -> None:
+        """Stops listening and cancels the connections still being served."""
+        self.server.close()
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@pytest.fixture
+def running():
+    nodes = []
+
+    def start(**kwargs) -> RunningNode:
+        settings = {"difficulty": 8, "target_block_time": None, **kwargs}
+        nodes.append(RunningNode(Blockchain(**settings)))
+        return nodes[-1]
+
+    yield start
+    for node in nodes:
+        node.close()
+
+
+def signed_transaction(sender: Wallet, recipient: Wallet, amount: float) -> dict:
+    """Builds a transaction payload signed by `sender`."""
+    transaction_data = {
+        "sender": sender.address,
+        "recipient": recipient.address,
+        "amount": amount,
+        "fee": 0.01,
+    }
+    signature = sender.sign(json.dumps(transaction_data, sort_keys=True))
+    return {
+        **transaction_data,
+        "signature": signature,
+        "public_key": sender.public_key_hex,
+    }
+
+
+def test_transactions_and_mining(running):
+    """Tests submitting a transaction and mining it over keep-alive connections."""
+    node = running()
+    alice, bob = Wallet(), Wallet()
+    transaction = signed_transaction(alice, bob, 5)
+
+    with requests.Session() as session:
+        response = session.post(f"{node.url}/transactions/new", json=transaction)
+        assert response.status_code == 201
+        assert response.json()["message"] == "Transaction will be added to Block 2"
+        response = session.post(f"{node.url}/transactions/new", json=transaction)
+        assert response.status_code == 400
+        assert response.text == "Duplicate transaction"
+        incomplete = session.post(f"{node.url}/transactions/new", json={"amount": 1})
+        assert incomplete.status_code == 400
+        minted = {**transaction, "sender": "0", "signature": "junk"}
+        response = session.post(f"{node.url}/transactions/new", json=minted)
+        assert response.status_code == 400
+        assert response.text == "Mining rewards cannot be submitted"
+
+        pending = session.get(f"{node.url}/transactions/pending").json()
+        assert pending["transactions"] == [transaction]
+
+        mined = session.get(f"{node.url}/mine?wait=true").json()
+        assert mined["message"] == "New Block Forged"
+        assert mined["transactions"][1:] == [transaction]
+
+        started = session.get(f"{node.url}/mine")
+        assert started.status_code == 202
+        status_url = node.url + started.json()["status_url"]
+        assert session.get(status_url).json()["job_id"] == started.json()["job_id"]
+
+        chain = session.get(f"{node.url}/chain").json()
+        assert chain["length"] >= 2
+        assert session.get(f"{node.url}/missing").status_code == 404
+        assert session.post(f"{node.url}/chain").status_code == 405
+
+
+def test_chain_paging_and_etag(running):
+    """Tests that /chain pages and revalidates like the Flask app."""
+    node = running()
+    requests.get(f"{node.url}/mine?wait=true")
+    response = requests.get(f"{node.url}/chain")
+    chain, etag = response.json()["chain"], response.headers["ETag"]
+    assert len(chain) == 2
+
+    page = requests.get(f"{node.url}/chain?start=2&limit=1").json()
+    assert page == {"chain": chain[1:2], "length": 2}
+    newest = requests.get(f"{node.url}/chain?order=desc&limit=1").json()
+    assert newest["chain"] == chain[::-1][:1]
+
+    cached = requests.get(f"{node.url}/chain", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    requests.get(f"{node.url}/mine?wait=true")
+    changed = requests.get(f"{node.url}/chain", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_etags_differ_per_representation(running):
+    """Tests that the JSON and binary encodings never share an ETag."""
+    node = running()
+    block_hash = node.node.blockchain.block_hashes[0]
+    binary = {"Accept": codec.CONTENT_TYPE}
+
+    for path in ("/chain", f"/block/hash/{block_hash}"):
+        as_json = requests.get(f"{node.url}{path}")
+        as_binary = requests.get(f"{node.url}{path}", headers=binary)
+        assert as_binary.headers["ETag"] != as_json.headers["ETag"], path
+        assert as_json.headers["Vary"] == as_binary.headers["Vary"] == "Accept"
+
+        stale = {**binary, "If-None-Match": as_json.headers["ETag"]}
+        assert requests.get(f"{node.url}{path}", headers=stale).status_code == 200
+        fresh = {**binary, "If-None-Match": as_binary.headers["ETag"]}
+        cached = requests.get(f"{node.url}{path}", headers=fresh)
+        assert cached.status_code == 304, path
+        assert cached.headers["Vary"] == "Accept"
+
+
+def test_consensus_between_async_nodes(running):
+    """
+    Tests that a node registers a peer and adopts its heavier chain. Both
+    nodes are started separately, so not even their genesis blocks match.
+    """
+    first, second = running(), running()
+    for _ in range(2):
+        requests.get(f"{second.url}/mine?wait=true")
+
+    response = requests.post(
+        f"{first.url}/nodes/register", json={"nodes": [second.address]}
+    )
+    assert response.status_code == 201
+    assert response.json()["total_nodes"] == [second.address]
+
+    data = requests.get(f"{first.url}/nodes/resolve").json()
+    assert data["message"] == "Our chain was replaced"
+    assert first.node.blockchain.block_hashes == second.node.blockchain.block_hashes
+    assert first.node.blockchain.peer_latency[second.address] is not None
+
+
+def test_consensus_skips_peers_with_malformed_responses(running):
+    """Tests that a peer answering garbage is skipped rather than failing consensus."""
+
+    class Garbage(socketserver.BaseRequestHandler):
+        def handle(self):
+            self.request.recv(65536)
+            self.request.sendall(self.server.answer)
+
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Garbage)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    peer = "127.0.0.1:%d" % server.server_address[1]
+    node = running()
+    node.node.blockchain.register_node(peer)
+
+    try:
+        for answer in (b"", b"garbage\r\n\r\n", b"HTTP/1.1 OK\r\n\r\n"):
+            server.answer = answer
+            with pytest.raises(ValueError):
+                asyncio.run(fetch_json(peer, "/chain/length"))
+            response = requests.get(f"{node.url}/nodes/resolve")
+            assert response.status_code == 200
+            assert node.node.blockchain.peer_latency[peer] is None
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_many_concurrent_connections(running):
+    """Tests that one event loop serves hundreds of simultaneous connections."""
+    node = running()
+    port = int(node.address.split(":")[1])
+
+    async def client() -> bytes:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            for _ in range(2):
+                writer.write(b"GET /chain/length HTTP/1.1\r\nHost: node\r\n\r\n")
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = int(head.split(b"content-length: ")[1].split(b"\r\n")[0])
+                body = await reader.readexactly(length)
+            return head.split(b"\r\n")[0], json.loads(body)
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    async def clients(count: int) -> list:
+        return await asyncio.gather(*(client() for _ in range(count)))
+
+    results = asyncio.run(clients(300))
+
+    assert all(status == b"HTTP/1.1 200 OK" for status, _ in results)
+    assert all(data["length"] == 1 for _, data in results)
+
+
+def test_malformed_content_length(running):
+    """Tests that a non-numeric or negative Content-Length is answered with 400."""
+    node = running()
+    port = int(node.address.split(":")[1])
+
+    async def status_of(length: bytes) -> bytes:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            writer.write(
+                b"POST /transactions/new HTTP/1.1\r\nHost: node\r\n"
+                b"Content-Length: " + length + b"\r\n\r\n{}"
+            )
+            head = await reader.readuntil(b"\r\n\r\n")
+            return head.split(b"\r\n")[0]
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    for length in (b"abc", b"-1"):
+        assert asyncio.run(status_of(length)) == b"HTTP/1.1 400 Bad Request"
+
+
+def test_asgi_interface():
+    """Tests the application directly through the ASGI calling convention."""
+    node = AsyncNode(Blockchain(difficulty=8, target_block_time=None))
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/chain/length",
+        "query_string": b"",
+        "headers": [],
+    }
+    asyncio.run(node(scope, receive, send))
+
+    assert sent[0]["status"] == 200
+    assert json.loads(sent[1]["body"])["length"] == 1
@@ -0,0 +1,830 @@
+# tests/test_blockchain.py
+import copy
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from cryptography.hazmat.primitives.asymmetric.utils import (
+    decode_dss_signature,
+    encode_dss_signature,
+)
+
+from simple_blockchain.blockchain import Blockchain
+from simple_blockchain.merkle import merkle_root
+from simple_blockchain.mining import block_work
+from simple_blockchain.storage import BlockStore
+from simple_blockchain.wallet import CURVE_ORDER, Wallet
+
+
+def mine(blockchain: Blockchain, count: int, transactions: list = None) -> None:
+    """Appends `count` blocks with valid proofs."""
+    for _ in range(count):
+        last_block = blockchain.last_block
+        blockchain.new_block(
+            blockchain.proof_of_work(last_block), list(transactions or [])
+        )
+
+
+def test_block_hashes_are_cached():
+    """Tests that every appended block has its hash cached by position."""
+    blockchain = Blockchain()
+    mine(blockchain, 1)
+
+    assert blockchain.block_hashes == [Blockchain.hash(b) for b in blockchain.chain]
+    assert blockchain.chain[1]["previous_hash"] == blockchain.block_hashes[0]
+    assert blockchain.cached_hash(blockchain.last_block) == blockchain.block_hashes[-1]
+
+
+def fork_of(blockchain: Blockchain, **kwargs) -> Blockchain:
+    """Returns a new node (built with `kwargs`) holding a copy of the given node's chain."""
+    peer = Blockchain(**kwargs)
+    peer._splice_chain(
+        0, copy.deepcopy(list(blockchain.chain)), list(blockchain.block_hashes)
+    )
+    return peer
+
+
+def test_incremental_validation_checks_only_the_new_suffix():
+    """Tests that a peer chain extending ours is validated from the fork point."""
+    blockchain = Blockchain()
+    mine(blockchain, 2)
+    peer = fork_of(blockchain)
+    mine(peer, 2)
+
+    assert blockchain.find_fork_point(peer.chain) == 3
+    fork, blocks, hashes = blockchain.validate_candidate(peer.chain)
+    assert fork == 3
+    assert blocks == peer.chain[3:]
+
+    blockchain._splice_chain(fork, blocks, hashes)
+    assert blockchain.chain == peer.chain
+    assert blockchain.block_hashes == peer.block_hashes
+    assert blockchain.block_positions == peer.block_positions
+
+
+def test_incremental_validation_rejects_invalid_suffix():
+    """Tests that a bad block after the fork point is still rejected."""
+    blockchain = Blockchain()
+    mine(blockchain, 1)
+    peer = fork_of(blockchain)
+    mine(peer, 2)
+    peer.chain[-1]["proof"] += 1
+
+    assert blockchain.validate_candidate(peer.chain) is None
+
+
+def test_validation_rejects_forged_transactions():
+    """Tests that a block carrying a transaction with a bad signature is rejected."""
+    alice, bob = Wallet(), Wallet()
+    blockchain = Blockchain()
+    peer = fork_of(blockchain)
+    forged = {
+        "sender": alice.address,
+        "recipient": bob.address,
+        "amount": 5,
+        "fee": 0.1,
+        "signature": bob.sign("not what alice signed"),
+        "public_key": alice.public_key_hex,
+    }
+    mine(peer, 1, [forged])
+
+    assert blockchain.validate_candidate(peer.chain) is None
+
+
+def test_full_validation_mode_checks_every_block():
+    """Tests that full mode also catches tampering in the shared prefix."""
+    blockchain = Blockchain()
+    mine(blockchain, 2)
+    peer = fork_of(blockchain)
+    mine(peer, 1)
+    peer.chain[1]["transactions"].append({"amount": 1000})
+
+    # The incremental check trusts our own copy of the shared prefix...
+    assert blockchain.validate_candidate(peer.chain) is not None
+    # ...while full validation notices the transactions no longer match the
+    # block's Merkle root.
+    assert blockchain.validate_candidate(peer.chain, full=True) is None
+
+
+def serve_chain(chain: list, delay: float = 0, work: int = None) -> ThreadingHTTPServer:
+    """
+    Starts a fake peer on a free local port that serves `chain` through the
+    consensus endpoints, and records the paths (and queries) it was asked for.
+    The peer reports the chain's work, or `work` if given.
+    """
+    hashes = [Blockchain.hash(block) for block in chain]
+    if work is None:
+        work = sum(block_work(block["difficulty"]) for block in chain)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            url = urlparse(self.path)
+            query = {k: int(v[0]) for k, v in parse_qs(url.query).items()}
+            start = query.get("start", 1) - 1
+            selected = chain[start : start + query.get("limit", len(chain))]
+            server.requested.append(url.path)
+            server.queries.append(query)
+
+            if url.path == "/chain":
+                data = {"chain": chain, "length": len(chain)}
+            elif url.path == "/chain/length":
+                data = {"length": len(chain), "work": work, "tip_hash": hashes[-1]}
+            elif url.path == "/headers":
+                headers = [
+                    {k: v for k, v in block.items() if k != "transactions"}
+                    for block in selected
+                ]
+                data = {"headers": headers, "length": len(chain)}
+            else:
+                data = {"blocks": selected, "length": len(chain)}
+
+            body = json.dumps(data).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.requested = []
+    server.queries = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_resolve_conflicts_fetches_peers_concurrently():
+    """Tests that a slow peer is skipped at the deadline without stalling consensus."""
+    blockchain = Blockchain()
+    peer = fork_of(blockchain)
+    mine(peer, 2)
+    fast = serve_chain(list(peer.chain))
+    slow = serve_chain(list(peer.chain), delay=3)
+    fast_node = f"127.0.0.1:{fast.server_port}"
+    slow_node = f"127.0.0.1:{slow.server_port}"
+    blockchain.register_node(fast_node)
+    blockchain.register_node(slow_node)
+    blockchain.consensus_deadline = 1
+
+    start = time.perf_counter()
+    try:
+        assert blockchain.resolve_conflicts() is True
+    finally:
+        fast.shutdown()
+        slow.shutdown()
+
+    assert time.perf_counter() - start < 2.5
+    assert blockchain.chain == peer.chain
+    assert blockchain.peer_latency[fast_node] < 1
+    assert blockchain.peer_latency[slow_node] is None
+
+
+def test_header_first_sync_downloads_only_missing_blocks():
+    """Tests that consensus reads headers and fetches only the blocks we lack."""
+    blockchain = Blockchain()
+    mine(blockchain, 3)
+    peer = fork_of(blockchain)
+    mine(peer, 2)
+    server = serve_chain(list(peer.chain))
+    blockchain.register_node(f"127.0.0.1:{server.server_port}")
+
+    try:
+        assert blockchain.resolve_conflicts() is True
+    finally:
+        server.shutdown()
+
+    assert blockchain.chain == peer.chain
+    assert blockchain.block_hashes == peer.block_hashes
+    assert "/chain" not in server.requested
+    # One page of headers to find the fork point, one to check the new headers
+    assert server.requested == ["/chain/length", "/headers", "/headers", "/blocks"]
+
+
+def test_header_first_sync_from_a_separately_started_node():
+    """Tests that a heavier chain with a different genesis block is synced whole."""
+    blockchain = Blockchain()
+    mine(blockchain, 1)
+    time.sleep(0.01)  # Genesis blocks are timestamped
+    peer = Blockchain()
+    mine(peer, 3)
+    assert peer.block_hashes[0] != blockchain.block_hashes[0]
+    server = serve_chain(list(peer.chain))
+    blockchain.register_node(f"127.0.0.1:{server.server_port}")
+
+    try:
+        assert blockchain.resolve_conflicts() is True
+    finally:
+        server.shutdown()
+
+    assert blockchain.chain == peer.chain
+    assert blockchain.block_hashes == peer.block_hashes
+    assert blockchain.ledger.balances() == peer.ledger.balances()
+
+
+def test_foreign_genesis_must_claim_our_difficulty():
+    """Tests that a peer cannot outweigh us with a genesis block claiming more work."""
+    blockchain = Blockchain()
+    mine(blockchain, 3)
+    genesis = {**Blockchain().chain[0], "difficulty": 255}
+    server = serve_chain([genesis])
+    blockchain.register_node(f"127.0.0.1:{server.server_port}")
+
+    try:
+        assert blockchain.resolve_conflicts() is False
+        assert blockchain.resolve_conflicts(full=True) is False
+    finally:
+        server.shutdown()
+
+    assert len(blockchain.chain) == 4
+
+
+def test_malformed_peer_answers_are_skipped():
+    """Tests that consensus skips peers whose answers have the wrong shape."""
+    blockchain = Blockchain()
+    peer = fork_of(blockchain)
+    mine(peer, 2)
+    answers = [
+        ("no-tip", {"work": 10**9, "length": 5}),
+        ("not-a-dict", ["x"]),
+        ("string-work", {"work": "9", "length": 5, "tip_hash": "x"}),
+    ]
+    assert blockchain.adopt_heaviest(answers) is False
+
+    chain = copy.deepcopy(list(peer.chain))
+    chain[-1]["proof"] = "x"
+    server = serve_chain(chain, work=10**9)
+    blockchain.register_node(f"127.0.0.1:{server.server_port}")
+    try:
+        assert blockchain.resolve_conflicts() is False
+    finally:
+        server.shutdown()
+
+    assert len(blockchain.chain) == 1
+
+
+def test_malformed_full_chains_are_skipped():
+    """Tests that full-chain consensus skips a malformed chain and uses the next."""
+    blockchain = Blockchain()
+    peer = fork_of(blockchain)
+    mine(peer, 2)
+    tip = {k: v for k, v in peer.chain[-1].items() if k != "index"}
+    # The valid peer answers last, so the malformed chain is handled first
+    servers = [
+        serve_chain(list(peer.chain[:-1]) + [tip]),
+        serve_chain(list(peer.chain), delay=0.5),
+    ]
+    for server in servers:
+        blockchain.register_node(f"127.0.0.1:{server.server_port}")
+    try:
+        assert blockchain.resolve_conflicts(full=True) is True
+    finally:
+        for server in servers:
+            server.shutdown()
+
+    assert blockchain.block_hashes == peer.block_hashes
+
+
+def test_invalid_headers_are_rejected_before_downloading_blocks():
+    """Tests that a peer whose headers fail proof of work is skipped early."""
+    blockchain = Blockchain()
+    mine(blockchain, 1)
+    peer = fork_of(blockchain)
+    mine(peer, 2)
+    chain = copy.deepcopy(list(peer.chain))
+    chain[-1]["proof"] += 1
+    server = serve_chain(chain)
+    blockchain.register_node(f"127.0.0.1:{server.server_port}")
+
+    try:
+        assert blockchain.resolve_conflicts() is False
+    finally:
+        server.shutdown()
+
+    assert "/blocks" not in server.requested
+    assert len(blockchain.chain) == 2
+
+
+def test_blocks_must_match_their_merkle_root():
+    """Tests that swapping a block's transactions breaks its Merkle commitment."""
+    alice, bob = Wallet(), Wallet()
+    blockchain = Blockchain()
+    peer = fork_of(blockchain)
+    mine(peer, 1, [signed(alice, bob, 1)])
+    peer.chain[-1]["transactions"] = [signed(alice, bob, 2)]
+
+    # The header (and so the block hash) is unchanged...
+    assert Blockchain.hash(peer.chain[-1]) == peer.block_hashes[-1]
+    # ...but the transactions no longer match the header's Merkle root
+    assert blockchain.validate_candidate(peer.chain) is None
+
+
+def test_full_mode_downloads_whole_chains():
+    """Tests that full consensus still downloads and validates the whole chain."""
+    blockchain = Blockchain()
+    peer = fork_of(blockchain)
+    mine(peer, 1)
+    server = serve_chain(list(peer.chain))
+    blockchain.register_node(f"127.0.0.1:{server.server_port}")
+
+    try:
+        assert blockchain.resolve_conflicts(full=True) is True
+    finally:
+        server.shutdown()
+
+    assert blockchain.chain == peer.chain
+    assert server.requested == ["/chain"]
+
+
+def test_batch_verification_in_worker_processes():
+    """Tests that a large batch verified by a process pool keeps per-item results."""
+    alice, bob = Wallet(), Wallet()
+    blockchain = Blockchain(verify_workers=2)
+    batch = []
+    for amount in range(1, 21):
+        transaction_data = {
+            "sender": alice.address,
+            "recipient": bob.address,
+            "amount": amount / 10,
+            "fee": 0,
+        }
+        signature = alice.sign(json.dumps(transaction_data, sort_keys=True))
+        batch.append(
+            {
+                **transaction_data,
+                "signature": signature,
+                "public_key": alice.public_key_hex,
+            }
+        )
+    batch[3]["amount"] = 1
+
+    try:
+        results = blockchain.new_transactions(batch)
+    finally:
+        blockchain.close()
+
+    assert blockchain._verify_executor is None
+    assert results[3] == (-1, "Invalid transaction signature")
+    assert results.count((2, None)) == 19
+    assert len(blockchain.current_transactions) == 19
+
+
+def signed(sender: Wallet, recipient: Wallet, amount: float, fee: float = 0) -> dict:
+    """Builds a transaction signed by `sender`."""
+    transaction_data = {
+        "sender": sender.address,
+        "recipient": recipient.address,
+        "amount": amount,
+        "fee": fee,
+    }
+    signature = sender.sign(json.dumps(transaction_data, sort_keys=True))
+    return {
+        **transaction_data,
+        "signature": signature,
+        "public_key": sender.public_key_hex,
+    }
+
+
+def test_overspending_is_rejected():
+    """Tests that a sender cannot spend more than its balance minus pending spends."""
+    alice, bob = Wallet(), Wallet()
+    blockchain = Blockchain(initial_balance=10)
+
+    results = blockchain.new_transactions(
+        [signed(alice, bob, 6, 1), signed(alice, bob, 3, 1), signed(bob, alice, 10)]
+    )
+
+    assert results[0] == (2, None)
+    assert results[1][0] == -1
+    assert "Insufficient funds" in results[1][1]
+    assert results[2] == (2, None)
+
+
+def test_mining_rewards_cannot_be_submitted():
+    """Tests that a transaction from the coinbase sender is never pooled."""
+    blockchain = Blockchain()
+    minted = {
+        "sender": "0",
+        "recipient": Wallet().address,
+        "amount": 1e9,
+        "fee": 0,
+        "signature": "junk",
+    }
+
+    index, error = blockchain.new_transactions([minted])[0]
+
+    assert index == -1
+    assert "Mining rewards" in error
+    assert len(blockchain.mempool) == 0
+
+
+def test_peer_blocks_must_be_affordable():
+    """Tests that a peer block with an invalid or unaffordable transfer is rejected."""
+    mallory, victim = Wallet(), Wallet()
+    blockchain = Blockchain()
+    balances = blockchain.ledger.balances()
+    bodies = {
+        "negative": [signed(mallory, victim, -500)],
+        "overspend": [signed(mallory, victim, 1e9)],
+        "string": [signed(mallory, victim, 5), signed(mallory, victim, "5")],
+        "cumulative": [signed(mallory, victim, 60), signed(mallory, victim, 60)],
+    }
+
+    for name, transactions in bodies.items():
+        # The proof does not cover the body, so any transactions can be
+        # swapped into a mined block (the peer's own ledger never sees them)
+        peer = fork_of(blockchain)
+        mine(peer, 1)
+        block = {
+            **peer.chain[-1],
+            "transactions": transactions,
+            "merkle_root": merkle_root(transactions),
+        }
+        assert blockchain.add_peer_block(block, Blockchain.hash(block)) is False, name
+        assert blockchain.ledger.balances() == balances, name
+
+    peer = fork_of(blockchain)
+    mine(peer, 1, [signed(mallory, victim, 60)])
+    assert blockchain.add_peer_block(peer.chain[-1], peer.block_hashes[-1])
+    assert blockchain.ledger.balance(victim.address) == 160
+
+
+def reward(amount: float) -> dict:
+    return {
+        "sender": "0",
+        "recipient": "miner",
+        "amount": amount,
+        "signature": "0",
+        "fee": 0,
+    }
+
+
+def test_blocks_mint_only_the_mining_reward():
+    """Tests that only a first transaction paying the reward plus fees may mint."""
+    alice, bob = Wallet(), Wallet()
+    blockchain = Blockchain()
+    payment = signed(alice, bob, 5, 0.5)
+    bodies = {
+        "valid": [reward(1.5), payment],
+        "inflated": [reward(1000), payment],
+        "second": [payment, reward(1)],
+    }
+
+    for name, transactions in bodies.items():
+        peer = fork_of(blockchain)
+        mine(peer, 1, transactions)
+        valid = blockchain.validate_candidate(peer.chain) is not None
+        assert valid == (name == "valid"), name
+
+
+def test_confirmed_transactions_cannot_be_replayed():
+    """Tests that a mined transaction is neither pooled nor mined again."""
+    alice, bob = Wallet(), Wallet()
+    blockchain = Blockchain()
+    payment = signed(alice, bob, 10, 0.1)
+    assert blockchain.new_transactions([payment])[0][0] == 2
+    mine(blockchain, 1, blockchain.select_transactions())
+
+    index, error = blockchain.new_transactions([dict(payment)])[0]
+    assert index == -1
+    assert "already confirmed" in error
+    assert blockchain.ledger.balance(alice.address) == 89.9
+
+    peer = fork_of(blockchain)
+    mine(peer, 1, [payment])
+    assert blockchain.validate_candidate(peer.chain) is None
+    # Within a single block too
+    peer = fork_of(blockchain)
+    other = signed(alice, bob, 1)
+    mine(peer, 1, [other, other])
+    assert blockchain.validate_candidate(peer.chain) is None
+
+
+def high_s(signature: str) -> str:
+    """Returns the other valid encoding of an ECDSA signature, (r, n - s)."""
+    r, s = decode_dss_signature(bytes.fromhex(signature))
+    return encode_dss_signature(r, CURVE_ORDER - s).hex()
+
+
+def test_encoding_variants_cannot_be_replayed():
+    """Tests that re-spelling a transaction's hex fields gives no new transaction."""
+    alice, bob = Wallet(), Wallet()
+    blockchain = Blockchain()
+    payment = signed(alice, bob, 10)
+    variants = {
+        "upper signature": {**payment, "signature": payment["signature"].upper()},
+        "upper public key": {**payment, "public_key": payment["public_key"].upper()},
+        "high s": {**payment, "signature": high_s(payment["signature"])},
+    }
+    assert blockchain.new_transactions([payment])[0][0] == 2
+
+    for name, variant in variants.items():
+        assert blockchain.new_transactions([variant])[0][0] == -1, name
+    mine(blockchain, 1, blockchain.select_transactions())
+    for name, variant in variants.items():
+        assert blockchain.new_transactions([variant])[0][0] == -1, name
+        peer = fork_of(blockchain)
+        mine(peer, 1, [variant])
+        assert blockchain.validate_candidate(peer.chain) is None, name
+    assert blockchain.ledger.balance(alice.address) == 90
+
+
+def test_balances_follow_chain_reorganizations():
+    """Tests that balances are rolled back and reapplied when the chain is spliced."""
+    alice, bob = Wallet(), Wallet()
+    blockchain = Blockchain()
+    peer = fork_of(blockchain)
+    mine(blockchain, 1, [signed(alice, bob, 40)])
+    assert blockchain.ledger.balance(alice.address) == 60
+
+    mine(peer, 2, [])
+    mine(peer, 1, [signed(bob, alice, 5, 0.5)])
+    fork, blocks, hashes = blockchain.validate_candidate(peer.chain)
+    blockchain._splice_chain(fork, blocks, hashes)
+
+    assert blockchain.ledger.balances() == peer.ledger.balances()
+    assert blockchain.ledger.balance(alice.address) == 105
+    assert blockchain.ledger.balance(bob.address) == 94.5
+
+
+def test_transactions_must_carry_the_senders_public_key():
+    """Tests that the public key has to match the sender's compact address."""
+    alice, bob, mallory = Wallet(), Wallet(), Wallet()
+    transaction = signed(alice, bob, 5)
+
+    assert Blockchain.verify_transaction(transaction)
+    assert not Blockchain.verify_transaction(
+        {**transaction, "public_key": mallory.public_key_hex}
+    )
+    without_key = dict(transaction)
+    del without_key["public_key"]
+    assert not Blockchain.verify_transaction(without_key)
+
+
+def test_difficulty_rises_when_blocks_come_too_fast():
+    """Tests that the retarget adds a bit once a window of blocks is mined fast."""
+    blockchain = Blockchain(difficulty=1, target_block_time=1000, retarget_window=2)
+    mine(blockchain, 4)
+
+    assert [block["difficulty"] for block in blockchain.chain] == [1, 1, 2, 2, 3]
+    assert blockchain.next_difficulty() == 3
+    assert blockchain.validate_chain(list(blockchain.chain))
+
+
+def test_difficulty_falls_when_blocks_come_too_slowly():
+    """Tests the retarget rule on headers spaced further apart than the target."""
+    blockchain = Blockchain(difficulty=8, target_block_time=10, retarget_window=4)
+    headers = [{"timestamp": 100.0 * i, "difficulty": 8} for i in range(8)]
+
+    assert blockchain.expected_difficulty(3, headers.__getitem__) == 8
+    assert blockchain.expected_difficulty(4, headers.__getitem__) == 7
+
+    fixed = Blockchain(difficulty=8, target_block_time=None, retarget_window=4)
+    assert fixed.expected_difficulty(4, headers.__getitem__) == 8
+
+
+def test_blocks_must_claim_the_expected_difficulty():
+    """Tests that a block mined at a lower difficulty than required is rejected."""
+    blockchain = Blockchain()
+    last_block = blockchain.last_block
+    block = {
+        "index": last_block["index"] + 1,
+        "timestamp": time.time(),
+        "transactions": [],
+        "proof": 0,
+        "previous_hash": blockchain.block_hashes[-1],
+        "merkle_root": merkle_root([]),
+        "difficulty": 0,
+    }
+
+    assert blockchain.validate_candidate([last_block, block]) is None
+
+
+def test_block_timestamps_are_checked():
+    """Tests that a block must be stamped after recent blocks and not far ahead."""
+    blockchain = Blockchain()
+    peer = fork_of(blockchain)
+    mine(peer, 1)
+    genesis = blockchain.last_block["timestamp"]
+    timestamps = {
+        "string": "x",
+        "nan": float("nan"),
+        "infinite": float("inf"),
+        "bool": True,
+        "backdated": genesis,
+        "future": time.time() + 3 * 60 * 60,
+    }
+
+    for name, timestamp in timestamps.items():
+        # The proof does not cover the timestamp
+        block = {**peer.last_block, "timestamp": timestamp}
+        assert blockchain.add_peer_block(block, Blockchain.hash(block)) is False, name
+    assert blockchain.add_peer_block(peer.last_block, peer.block_hashes[-1])
+
+
+def test_blocks_are_stamped_after_the_median(monkeypatch):
+    """Tests that a node whose clock lags still mines blocks that validate."""
+    blockchain = Blockchain()
+    mine(blockchain, 2)
+    monkeypatch.setattr(
+        "simple_blockchain.blockchain.time",
+        lambda: blockchain.chain[0]["timestamp"] - 1000,
+    )
+    mine(blockchain, 3)
+
+    assert blockchain.validate_chain(list(blockchain.chain))
+
+
+def test_zero_difficulty_mines_immediately():
+    """Tests that a node configured with difficulty 0 accepts the first proof."""
+    blockchain = Blockchain(difficulty=0, target_block_time=None)
+    mine(blockchain, 3)
+
+    assert all(block["difficulty"] == 0 for block in blockchain.chain)
+    assert blockchain.validate_chain(list(blockchain.chain))
+
+
+# Consensus parameters under which the work of a chain depends on how fast it
+# was mined: the difficulty moves every 2 blocks towards 1 second per block
+RETARGETING = {"difficulty": 2, "target_block_time": 1, "retarget_window": 2}
+
+
+def mine_slowly(blockchain: Blockchain, count: int, monkeypatch) -> None:
+    """Appends `count` blocks 100 seconds apart, lowering the difficulty."""
+    clock = iter(range(1, count + 1))
+    start = blockchain.last_block["timestamp"]
+    with monkeypatch.context() as patch:
+        patch.setattr(
+            "simple_blockchain.blockchain.time", lambda: start + 100 * next(clock)
+        )
+        mine(blockchain, count)
+
+
+def test_heaviest_chain_wins_over_longest(monkeypatch):
+    """Tests that consensus picks the chain with the most work, not the most blocks."""
+    blockchain = Blockchain(**RETARGETING)
+    peer = fork_of(blockchain, **RETARGETING)
+    mine_slowly(blockchain, 4, monkeypatch)
+    mine(peer, 2)
+    assert [b["difficulty"] for b in blockchain.chain] == [2, 2, 1, 1, 0]
+    assert [b["difficulty"] for b in peer.chain] == [2, 2, 3]
+    assert peer.total_work > blockchain.total_work
+    old_hashes = list(blockchain.block_hashes)
+
+    server = serve_chain(list(peer.chain))
+    blockchain.register_node(f"127.0.0.1:{server.server_port}")
+    try:
+        assert blockchain.resolve_conflicts() is True
+    finally:
+        server.shutdown()
+
+    assert blockchain.chain == peer.chain
+    assert blockchain.chain_work == peer.chain_work
+    # The replaced blocks are kept as a side branch
+    assert len(blockchain.side_blocks) == 4
+    assert blockchain.side_blocks.tips() == [
+        (blockchain.side_blocks.work(old_hashes[-1]), old_hashes[-1])
+    ]
+    assert not blockchain._reorg_to(old_hashes[-1])
+
+
+def test_longer_but_lighter_chain_is_ignored(monkeypatch):
+    """Tests that a longer chain with less work does not replace ours."""
+    blockchain = Blockchain(**RETARGETING)
+    peer = fork_of(blockchain, **RETARGETING)
+    mine(blockchain, 2)
+    mine_slowly(peer, 4, monkeypatch)
+    honest = serve_chain(list(peer.chain))
+    # This peer overstates its work, which its headers give away
+    lying = serve_chain(list(peer.chain), work=10**6)
+    blockchain.register_node(f"127.0.0.1:{honest.server_port}")
+    blockchain.register_node(f"127.0.0.1:{lying.server_port}")
+
+    try:
+        assert blockchain.resolve_conflicts() is False
+    finally:
+        honest.shutdown()
+        lying.shutdown()
+
+    assert len(blockchain.chain) == 3
+    assert honest.requested == ["/chain/length"]
+    assert "/headers" in lying.requested
+    assert "/blocks" not in lying.requested
+
+
+def test_reorganization_returns_transactions_to_the_mempool():
+    """Tests that transactions of replaced blocks become pending again."""
+    alice, bob = Wallet(), Wallet()
+    both, dropped = signed(alice, bob, 10), signed(alice, bob, 20)
+    blockchain = Blockchain()
+    peer = fork_of(blockchain)
+    mine(blockchain, 1, [both, dropped])
+    mine(peer, 1, [both])
+    mine(peer, 1)
+
+    fork, blocks, hashes = blockchain.validate_candidate(peer.chain)
+    blockchain._splice_chain(fork, blocks, hashes)
+
+    assert list(blockchain.mempool) == [dropped]
+    assert blockchain.mempool.pending_outflow(alice.address) == 20
+    assert blockchain.total_work == peer.total_work
+
+
+def test_sync_reuses_blocks_of_known_side_branches():
+    """Tests that switching back to a known branch downloads only its new blocks."""
+    base = Blockchain()
+    blockchain = fork_of(base)
+    mine(blockchain, 2)
+    original = fork_of(blockchain)
+    peer = fork_of(base)
+    mine(peer, 3)
+    old_hashes = blockchain.block_hashes[1:]
+    fork, blocks, hashes = blockchain.validate_candidate(peer.chain)
+    blockchain._splice_chain(fork, blocks, hashes)
+    assert blockchain.side_blocks.branch(old_hashes[-1]) == old_hashes
+
+    # Our old branch grows heavier again elsewhere
+    mine(original, 2)
+    server = serve_chain(list(original.chain))
+    blockchain.register_node(f"127.0.0.1:{server.server_port}")
+    try:
+        assert blockchain.resolve_conflicts() is True
+    finally:
+        server.shutdown()
+
+    assert blockchain.chain == original.chain
+    assert blockchain.block_hashes == original.block_hashes
+    # Only the two blocks missing from the side branch were downloaded
+    assert server.queries[server.requested.index("/blocks")]["start"] == 4
+    assert blockchain.side_blocks.branch(peer.block_hashes[-1]) == hashes
+
+
+def test_nodes_sharing_a_store_share_chain_mempool_and_peers(tmp_path):
+    """Tests that worker processes on one data directory see each other's writes."""
+    alice, bob = Wallet(), Wallet()
+    first = Blockchain(store=BlockStore(str(tmp_path), shared=True))
+    second = Blockchain(store=BlockStore(str(tmp_path), shared=True))
+    assert second.block_hashes == first.block_hashes
+
+    transaction = signed(alice, bob, 10)
+    assert first.new_transactions([transaction]) == [(2, None)]
+    second.refresh()
+    assert list(second.mempool) == [transaction]
+
+    with second.synchronized():
+        mine(second, 1, second.select_transactions())
+    first.refresh()
+    assert first.block_hashes == second.block_hashes
+    assert first.chain[-1]["transactions"] == [transaction]
+    assert len(first.mempool) == 0
+    assert first.ledger.balance(alice.address) == 90
+
+    first.register_node("127.0.0.1:5002")
+    second.refresh()
+    assert second.nodes == {"127.0.0.1:5002"}
+
+
+def test_concurrent_writers_on_a_shared_store_lose_no_transactions(tmp_path):
+    """Tests that nodes submitting and mining at the same time keep every transaction."""
+    settings = {"difficulty": 4, "target_block_time": None}
+    nodes = [
+        Blockchain(store=BlockStore(str(tmp_path), shared=True), **settings)
+        for _ in range(3)
+    ]
+    wallets = [Wallet() for _ in range(6)]
+    submitted = {node_id: [] for node_id in range(len(nodes))}
+
+    def work(node_id: int) -> None:
+        node = nodes[node_id]
+        for round_ in range(10):
+            sender = wallets[(node_id + round_) % len(wallets)]
+            transaction = signed(sender, wallets[node_id], 1 + round_ / 100)
+            if node.new_transactions([transaction])[0][1] is None:
+                submitted[node_id].append(transaction["signature"])
+            if round_ % 3 == 2:
+                with node.synchronized():
+                    proof = node.proof_of_work(node.last_block)
+                    node.new_block(proof, node.select_transactions())
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(len(nodes))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for node in nodes:
+        node.refresh()
+
+    accepted = sorted(sig for sigs in submitted.values() for sig in sigs)
+    assert len(accepted) == 30
+    confirmed = [
+        tx["signature"] for block in nodes[0].chain for tx in block["transactions"]
+    ]
+    pending = [tx["signature"] for tx in nodes[0].mempool]
+    assert sorted(confirmed + pending) == accepted
+    assert all(node.block_hashes == nodes[0].block_hashes for node in nodes)
+    assert nodes[0].validate_chain(list(nodes[0].chain))
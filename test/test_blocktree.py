@@ -0,0 +1,36 @@
+# tests/test_blocktree.py
+from simple_blockchain.blocktree import BlockTree
+
+
+def block(previous_hash: str) -> dict:
+    return {"previous_hash": previous_hash, "transactions": []}
+
+
+def test_branches_walk_back_to_the_main_chain():
+    """Tests that a branch is returned oldest first, up to its fork point."""
+    tree = BlockTree()
+    tree.add("a1", block("main"), 2)
+    tree.add("a2", block("a1"), 3)
+    tree.add("b2", block("a1"), 5)
+
+    assert tree.branch("a2") == ["a1", "a2"]
+    assert tree.branch("main") == []
+    assert tree.work("b2") == 5
+    assert tree.get("a1")["previous_hash"] == "main"
+    assert tree.tips() == [(5, "b2"), (3, "a2")]
+
+
+def test_oldest_blocks_are_evicted():
+    """Tests that the tree stays within max_blocks."""
+    tree = BlockTree(max_blocks=2)
+    tree.add("a1", block("main"), 2)
+    tree.add("a2", block("a1"), 3)
+    tree.add("a3", block("a2"), 4)
+
+    assert len(tree) == 2
+    assert "a1" not in tree
+    assert tree.branch("a3") == ["a2", "a3"]
+
+    tree.discard("a2")
+    assert tree.branch("a3") == ["a3"]
+    assert tree.get("a2") is None
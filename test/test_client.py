@@ -0,0 +1,101 @@
+# tests/test_client.py
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from simple_blockchain.client import DEFAULT_TIMEOUT, NodeSession
+
+
+@pytest.fixture
+def server():
+    """
+    A keep-alive HTTP server that answers 503 to the first `failures`
+    requests and 200 afterwards, counting requests and connections.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            self.server.connections += 1
+
+        def handle_request(self):
+            self.server.requests += 1
+            length = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(length)
+            status = 503 if self.server.requests <= self.server.failures else 200
+            self.send_response(status)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        do_GET = do_POST = handle_request
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.requests = httpd.connections = httpd.failures = 0
+    httpd.url = "http://127.0.0.1:%d" % httpd.server_address[1]
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_connections_are_reused(server):
+    """Tests that repeated requests share one keep-alive connection."""
+    session = NodeSession()
+    for _ in range(5):
+        assert session.get(server.url).status_code == 200
+
+    assert server.requests == 5
+    assert server.connections == 1
+
+
+def test_retries_unavailable_node(server):
+    """Tests that GETs answered with 503 are retried with backoff."""
+    server.failures = 2
+    session = NodeSession(retries=3, backoff_factor=0)
+
+    assert session.get(server.url).status_code == 200
+    assert server.requests == 3
+
+
+def test_gives_up_after_retries(server):
+    """Tests that the last response is returned once the retries run out."""
+    server.failures = 10
+    session = NodeSession(retries=2, backoff_factor=0)
+
+    assert session.get(server.url).status_code == 503
+    assert server.requests == 3
+
+
+def test_posts_are_not_retried(server):
+    """Tests that a POST the node may have acted on is sent only once."""
+    server.failures = 1
+    session = NodeSession(retries=3, backoff_factor=0)
+
+    assert session.post(server.url, json={}).status_code == 503
+    assert server.requests == 1
+
+
+def test_default_timeout(monkeypatch):
+    """Tests that requests get the session's timeout unless they pass their own."""
+    timeouts = []
+
+    def send(self, request, **kwargs):
+        timeouts.append(kwargs["timeout"])
+        raise requests.exceptions.ConnectionError("not sent")
+
+    monkeypatch.setattr(requests.adapters.HTTPAdapter, "send", send)
+    session = NodeSession()
+    for timeout in (None, 1.5):
+        kwargs = {} if timeout is None else {"timeout": timeout}
+        with pytest.raises(requests.exceptions.ConnectionError):
+            session.get("http://127.0.0.1:1/", **kwargs)
+
+    assert timeouts == [DEFAULT_TIMEOUT, 1.5]
@@ -0,0 +1,112 @@
+# test/test_codec.py
+import json
+import math
+
+import pytest
+from simple_blockchain import codec
+from simple_blockchain.wallet import Wallet
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        None,
+        True,
+        False,
+        0,
+        -1,
+        2**63 - 1,
+        -(2**63),
+        2**63,
+        -(2**200),
+        0.1,
+        -0.0,
+        1e300,
+        math.inf,
+        "",
+        "0",
+        "1",
+        "ab" * 32,
+        "ABCD",
+        "abc",
+        "héllo ✓",
+        [],
+        [1, "two", 3.0, None, [True]],
+        {},
+        {"b": 1, "a": {"ab": [1.5, "cd"]}},
+    ],
+)
+def test_round_trip(value):
+    """Tests that every JSON-compatible value decodes to an equal value."""
+    decoded = codec.decode(codec.encode(value))
+    assert decoded == value
+    assert type(decoded) is type(value)
+
+
+def test_signed_block_round_trip_is_smaller_than_json():
+    """Tests that a block of signed transactions round-trips and shrinks."""
+    alice, bob = Wallet(), Wallet()
+    transactions = []
+    for amount in (1, 2.5, 3):
+        transaction_data = {
+            "sender": alice.address,
+            "recipient": bob.address,
+            "amount": amount,
+            "fee": 0.01,
+        }
+        signature = alice.sign(json.dumps(transaction_data, sort_keys=True))
+        transactions.append(
+            {
+                **transaction_data,
+                "signature": signature,
+                "public_key": alice.public_key_hex,
+            }
+        )
+    block = {
+        "index": 2,
+        "timestamp": 1700000000.123456,
+        "transactions": transactions,
+        "proof": 35293,
+        "previous_hash": "1",
+    }
+
+    encoded = codec.encode(block)
+    assert codec.decode(encoded) == block
+    assert len(encoded) < len(json.dumps(block, sort_keys=True))
+
+
+def test_encoding_is_canonical():
+    """Tests that key order does not change the encoding (and so the hash)."""
+    first = {"index": 1, "proof": 7, "transactions": [{"a": 1, "b": 2}]}
+    second = {"transactions": [{"b": 2, "a": 1}], "proof": 7, "index": 1}
+
+    assert codec.encode(first) == codec.encode(second)
+    assert codec.encode((1, 2)) == codec.encode([1, 2])
+    # Numbers keep their type: 1 and 1.0 are different values on the chain
+    assert codec.encode(1) != codec.encode(1.0)
+    assert codec.encode(True) != codec.encode(1)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"",
+        b"?",
+        codec.encode("abcd")[:-1],
+        codec.encode([1, 2])[:-3],
+        codec.encode(1) + b"N",
+        b"d\x00\x00\x00\x01i" + b"\x00" * 8 + b"N",
+    ],
+)
+def test_malformed_data_is_rejected(data):
+    """Tests that truncated, trailing or invalid bytes raise ValueError."""
+    with pytest.raises(ValueError):
+        codec.decode(data)
+
+
+def test_unsupported_values_are_rejected():
+    """Tests that values without a JSON equivalent cannot be encoded."""
+    with pytest.raises(TypeError):
+        codec.encode({1: "not a string key"})
+    with pytest.raises(TypeError):
+        codec.encode(b"raw bytes")
@@ -0,0 +1,147 @@
+# tests/test_gossip.py
+import time
+
+import pytest
+import requests
+
+from simple_blockchain.blockchain import Blockchain
+from simple_blockchain.gossip import BLOCK, Gossip
+from simple_blockchain.mempool import transaction_id
+from simple_blockchain.wallet import Wallet
+from test_async_node import RunningNode, signed_transaction
+
+CLUSTER_SIZE = 10
+
+
+def wait_until(condition, timeout: float = 10.0) -> float:
+    """Polls `condition` until it holds and returns how long that took."""
+    start = time.perf_counter()
+    while not condition():
+        if time.perf_counter() - start > timeout:
+            raise AssertionError("Condition not reached in time")
+        time.sleep(0.005)
+    return time.perf_counter() - start
+
+
+@pytest.fixture
+def cluster():
+    """
+    Starts independent local nodes, each with its own genesis block, as
+    separately launched nodes would be. Each node is registered with a few
+    others (not all), so items must be relayed to reach everyone.
+    """
+    nodes = []
+
+    def start(size: int, links=(1, 2, 5)) -> list:
+        for _ in range(size):
+            node = RunningNode(Blockchain(difficulty=8, target_block_time=None))
+            node.node.gossip.port = int(node.address.split(":")[1])
+            nodes.append(node)
+        for i, node in enumerate(nodes):
+            for link in links:
+                peer = nodes[(i + link) % size]
+                if peer is not node:
+                    node.node.blockchain.register_node(peer.address)
+        return nodes
+
+    yield start
+    for node in nodes:
+        node.close()
+
+
+def test_block_propagates_to_every_node(cluster):
+    """Tests that a mined block reaches every node, each fetching it once."""
+    nodes = cluster(CLUSTER_SIZE)
+
+    genesis = nodes[0].node.blockchain.block_hashes[-1]
+    assert requests.get(f"{nodes[0].url}/mine").status_code == 202
+    # Propagation is timed from the moment the block is forged
+    wait_until(lambda: nodes[0].node.blockchain.block_hashes[-1] != genesis)
+    tip = nodes[0].node.blockchain.block_hashes[-1]
+    latency = wait_until(
+        lambda: all(node.node.blockchain.block_hashes[-1] == tip for node in nodes)
+    )
+    assert latency < 5.0
+    print(f"Block reached {CLUSTER_SIZE} nodes in {latency * 1000:.0f}ms")
+
+    # Let the last announcements settle: every node fetched the block once
+    wait_until(
+        lambda: all(node.node.gossip.queue.unfinished_tasks == 0 for node in nodes)
+    )
+    assert [node.node.gossip.counters["fetched"] for node in nodes[1:]] == [1] * (
+        CLUSTER_SIZE - 1
+    )
+
+
+def test_transaction_propagates_to_every_mempool(cluster):
+    """Tests that a transaction submitted to one node reaches every mempool."""
+    nodes = cluster(CLUSTER_SIZE)
+    transaction = signed_transaction(Wallet(), Wallet(), 5)
+    tx_id = transaction_id(transaction)
+
+    response = requests.post(f"{nodes[3].url}/transactions/new", json=transaction)
+    assert response.status_code == 201
+
+    wait_until(lambda: all(tx_id in node.node.blockchain.mempool for node in nodes))
+
+    # Mining it on another node confirms it everywhere
+    requests.get(f"{nodes[7].url}/mine?wait=true")
+    tip = nodes[7].node.blockchain.block_hashes[-1]
+    wait_until(
+        lambda: all(
+            node.node.blockchain.block_hashes[-1] == tip
+            and tx_id not in node.node.blockchain.mempool
+            for node in nodes
+        )
+    )
+
+
+def test_node_behind_catches_up_from_announcement(cluster):
+    """Tests that a block with an unknown parent is synced from its announcer."""
+    ahead, behind = cluster(2, links=())
+    for _ in range(2):
+        requests.get(f"{ahead.url}/mine?wait=true")
+    ahead.node.blockchain.register_node(behind.address)
+
+    requests.get(f"{ahead.url}/mine?wait=true")
+
+    wait_until(
+        lambda: behind.node.blockchain.block_hashes
+        == ahead.node.blockchain.block_hashes
+    )
+
+
+def test_invalid_announcements(cluster):
+    """Tests that bad announcements are rejected and known blocks not fetched."""
+    (node,) = cluster(1)
+    url = f"{node.url}/inv"
+
+    assert requests.post(url, json={"type": "block", "hashes": []}).status_code == 400
+    response = requests.post(url, json={"type": "coin", "hashes": [], "port": 1})
+    assert response.status_code == 400
+    tip = node.node.blockchain.block_hashes[-1]
+    response = requests.post(url, json={"type": "block", "hashes": [tip], "port": 1})
+    assert response.status_code == 202
+    assert response.json()["wanted"] == 0
+
+
+def test_announce_limits_fanout():
+    """Tests that an announcement goes to at most `fanout` peers, not the origin."""
+    blockchain = Blockchain(difficulty=0, target_block_time=None)
+    for port in range(6000, 6020):
+        blockchain.register_node(f"127.0.0.1:{port}")
+    sent = []
+
+    class Session:
+        def post(self, url, json, timeout):
+            sent.append(url)
+            response = requests.Response()
+            response.status_code = 202
+            return response
+
+    blockchain.session = Session()
+    gossip = Gossip(blockchain, fanout=3)
+    gossip._send(BLOCK, ["ab" * 32], exclude="127.0.0.1:6000")
+
+    assert len(sent) == 3
+    assert "http://127.0.0.1:6000/inv" not in sent
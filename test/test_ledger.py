@@ -0,0 +1,117 @@
+# test/test_ledger.py
+import pytest
+from simple_blockchain.ledger import (
+    INITIAL_BALANCE,
+    AddressIndex,
+    ConfirmedTransactions,
+    Ledger,
+)
+from simple_blockchain.mempool import transaction_id
+
+
+def block_of(*transactions) -> dict:
+    return {"transactions": list(transactions)}
+
+
+def test_apply_and_revert_block():
+    """Tests that reverting a block restores the balances before it."""
+    ledger = Ledger()
+    reward = {"sender": "0", "recipient": "miner", "amount": 1.5, "fee": 0}
+    payment = {"sender": "alice", "recipient": "bob", "amount": 10, "fee": 0.5}
+
+    ledger.apply_block(block_of(reward, payment))
+    assert ledger.balance("alice") == INITIAL_BALANCE - 10.5
+    assert ledger.balance("bob") == INITIAL_BALANCE + 10
+    assert ledger.balance("miner") == INITIAL_BALANCE + 1.5
+    assert "0" not in ledger.balances()
+
+    ledger.revert_block(block_of(reward, payment))
+    assert ledger.balance("alice") == INITIAL_BALANCE
+    assert ledger.balance("bob") == INITIAL_BALANCE
+    assert ledger.balance("carol") == INITIAL_BALANCE
+
+
+def test_check_spend_counts_pending_outflows():
+    """Tests that overspends are rejected, including pending spending."""
+    ledger = Ledger(initial_balance=10)
+    payment = {"sender": "alice", "recipient": "bob", "amount": 6, "fee": 1}
+
+    ledger.check_spend(payment)
+    with pytest.raises(ValueError):
+        ledger.check_spend(payment, pending=7)
+    with pytest.raises(ValueError):
+        ledger.check_spend({**payment, "amount": -5})
+
+
+@pytest.mark.parametrize(
+    "field, value",
+    [
+        ("amount", float("nan")),
+        ("amount", float("inf")),
+        ("fee", float("nan")),
+        ("fee", float("inf")),
+    ],
+)
+def test_check_spend_rejects_non_finite(field, value):
+    """Tests that NaN and infinite amounts or fees are rejected."""
+    ledger = Ledger()
+    payment = {"sender": "alice", "recipient": "bob", "amount": 6, "fee": 1}
+
+    with pytest.raises(ValueError):
+        ledger.check_spend({**payment, field: value})
+
+
+def test_address_index_follows_blocks():
+    """Tests that the address index locates transactions and drops reverted ones."""
+    index = AddressIndex()
+    first = {
+        "index": 2,
+        "transactions": [
+            {"sender": "0", "recipient": "miner", "amount": 1},
+            {"sender": "alice", "recipient": "bob", "amount": 5},
+        ],
+    }
+    second = {
+        "index": 3,
+        "transactions": [{"sender": "bob", "recipient": "alice", "amount": 2}],
+    }
+    index.apply_block(first)
+    index.apply_block(second)
+
+    assert index.locations("alice") == [(2, 1), (3, 0)]
+    assert index.locations("miner") == [(2, 0)]
+    assert index.count("0") == 0
+
+    index.revert_block(second)
+    assert index.locations("bob") == [(2, 1)]
+    index.revert_block(first)
+    assert len(index) == 0
+
+
+def test_confirmed_transactions_follow_blocks():
+    """Tests that confirmed ids are recorded per block and forgotten on revert."""
+    confirmed = ConfirmedTransactions()
+    reward = {"sender": "0", "recipient": "miner", "amount": 1}
+    payment = {"sender": "alice", "recipient": "bob", "amount": 5}
+    block = {"index": 2, "transactions": [reward, payment]}
+
+    confirmed.apply_block(block)
+    assert transaction_id(payment) in confirmed
+    assert confirmed.block_index(transaction_id(payment)) == 2
+    assert transaction_id(reward) not in confirmed
+
+    confirmed.revert_block(block)
+    assert len(confirmed) == 0
+
+
+def test_check_block_uses_a_scratch_view():
+    """Tests that blocks are checked in order without touching the ledger."""
+    ledger = Ledger(initial_balance=10)
+    view = ledger.scratch()
+    payment = {"sender": "alice", "recipient": "bob", "amount": 6, "fee": 1}
+
+    view.check_block(block_of(payment))
+    assert view.balance("alice") == 3
+    with pytest.raises(ValueError):
+        view.check_block(block_of(payment))
+    assert ledger.balances() == {}
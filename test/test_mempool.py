@@ -0,0 +1,104 @@
+# test/test_mempool.py
+import pytest
+from simple_blockchain.mempool import Mempool, transaction_id, transaction_size
+
+
+def make_transaction(fee, amount=1, signature=None):
+    """Builds a pending transaction; signatures are not checked by the pool."""
+    return {
+        "sender": "alice",
+        "recipient": "bob",
+        "amount": amount,
+        "fee": fee,
+        "signature": signature or f"sig-{fee}-{amount}",
+    }
+
+
+def test_pop_best_orders_by_fee_rate():
+    """Tests that the highest fee rate transactions are selected first."""
+    mempool = Mempool()
+    for fee in (0.1, 0.5, 0.0, 0.3):
+        mempool.add(make_transaction(fee))
+
+    selected = mempool.pop_best(max_bytes=10_000)
+
+    assert [tx["fee"] for tx in selected] == [0.5, 0.3, 0.1, 0.0]
+    assert len(mempool) == 0
+    assert mempool.size_bytes == 0
+
+
+def test_pop_best_respects_block_size():
+    """Tests that transactions that do not fit stay pending."""
+    mempool = Mempool()
+    transactions = [make_transaction(fee) for fee in (0.3, 0.2, 0.1)]
+    for tx in transactions:
+        mempool.add(tx)
+
+    size = transaction_size(transactions[0])
+    selected = mempool.pop_best(max_bytes=2 * size)
+
+    assert [tx["fee"] for tx in selected] == [0.3, 0.2]
+    assert list(mempool) == [transactions[2]]
+
+
+def test_duplicates_are_rejected():
+    """Tests that a transaction or a replayed signature is only pooled once."""
+    mempool = Mempool()
+    tx = make_transaction(0.1)
+    tx_id = mempool.add(tx)
+
+    assert tx_id == transaction_id(tx)
+    assert tx_id in mempool
+    with pytest.raises(ValueError):
+        mempool.add(dict(tx))
+    with pytest.raises(ValueError):
+        mempool.add(make_transaction(0.2, signature=tx["signature"]))
+    assert len(mempool) == 1
+
+
+def test_non_finite_fee_rejected():
+    """Tests that a NaN or infinite fee cannot enter the fee rate heaps."""
+    mempool = Mempool()
+    for fee in (float("nan"), float("inf")):
+        with pytest.raises(ValueError):
+            mempool.add(make_transaction(fee))
+    assert len(mempool) == 0
+
+
+def test_confirmed_transactions_are_rejected():
+    """Tests that a transaction already on the chain cannot be pooled again."""
+    tx = make_transaction(0.1)
+    mempool = Mempool(confirmed={transaction_id(tx)})
+
+    with pytest.raises(ValueError, match="already confirmed"):
+        mempool.add(tx)
+    assert len(mempool) == 0
+
+
+def test_full_pool_evicts_lowest_fee_rate():
+    """Tests that a full pool evicts its cheapest transaction for a better one."""
+    mempool = Mempool(max_size=2)
+    cheap = make_transaction(0.1)
+    mempool.add(cheap)
+    mempool.add(make_transaction(0.2))
+
+    with pytest.raises(ValueError):
+        mempool.add(make_transaction(0.05))
+    mempool.add(make_transaction(0.3))
+
+    assert len(mempool) == 2
+    assert transaction_id(cheap) not in mempool
+
+
+def test_remove_confirmed():
+    """Tests that transactions included in a block leave the pool."""
+    mempool = Mempool()
+    confirmed, pending = make_transaction(0.1), make_transaction(0.2)
+    mempool.add(confirmed)
+    mempool.add(pending)
+
+    mempool.remove_confirmed([confirmed])
+
+    assert list(mempool) == [pending]
+    # The signature of a confirmed transaction may be pooled again
+    mempool.add(make_transaction(0.1))
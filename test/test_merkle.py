@@ -0,0 +1,46 @@
+# test/test_merkle.py
+import hashlib
+
+import pytest
+from simple_blockchain.merkle import merkle_proof, merkle_root, verify_proof
+
+
+def transactions(count: int) -> list:
+    return [
+        {"sender": "alice", "recipient": "bob", "amount": i, "signature": "%02x" % i}
+        for i in range(count)
+    ]
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 5, 8, 13])
+def test_every_transaction_has_a_valid_proof(count):
+    """Tests that each transaction's proof leads to the block's Merkle root."""
+    txs = transactions(count)
+    root = merkle_root(txs)
+
+    for position, tx in enumerate(txs):
+        proof = merkle_proof(txs, position)
+        assert len(proof) <= count.bit_length()
+        assert verify_proof(tx, proof, root)
+
+
+def test_proofs_do_not_verify_other_transactions():
+    """Tests that a proof is rejected for a transaction not at its position."""
+    txs = transactions(4)
+    root = merkle_root(txs)
+    proof = merkle_proof(txs, 1)
+
+    assert not verify_proof(txs[2], proof, root)
+    assert not verify_proof({**txs[1], "amount": 100}, proof, root)
+    assert not verify_proof(txs[1], [{"hash": "zz", "side": "left"}], root)
+
+
+def test_root_commits_to_order_and_count():
+    """Tests that reordering or duplicating transactions changes the root."""
+    txs = transactions(3)
+
+    assert merkle_root(txs) != merkle_root(txs[::-1])
+    assert merkle_root(txs) != merkle_root(txs + txs[-1:])
+    assert merkle_root([]) == hashlib.sha256(b"").hexdigest()
+    with pytest.raises(IndexError):
+        merkle_proof(txs, 3)
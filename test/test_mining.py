@@ -0,0 +1,94 @@
+# tests/test_mining.py
+from simple_blockchain.blockchain import Blockchain
+from simple_blockchain.mining import (
+    MiningJob,
+    check_proof,
+    parallel_proof_of_work,
+    search_proof,
+)
+
+
+def test_parallel_proof_is_valid():
+    """Tests that a proof found by several worker processes passes validate_proof."""
+    blockchain = Blockchain()
+    last_block = blockchain.last_block
+    last_hash = Blockchain.hash(last_block)
+
+    proof, hashes = parallel_proof_of_work(last_block["proof"], last_hash, workers=2)
+
+    assert Blockchain.validate_proof(last_block["proof"], proof, last_hash)
+    assert hashes >= 1
+
+
+def test_blockchain_uses_parallel_workers():
+    """Tests that proof_of_work with several workers still produces a valid proof."""
+    blockchain = Blockchain(mining_workers=2)
+    last_block = blockchain.last_block
+
+    proof = blockchain.proof_of_work(last_block)
+
+    assert Blockchain.validate_proof(
+        last_block["proof"], proof, Blockchain.hash(last_block)
+    )
+
+
+def test_mining_job_can_search_in_a_process(monkeypatch):
+    """Tests that a job asked to search in a process does so with one worker."""
+    blockchain = Blockchain()
+    calls = []
+
+    def recording(*args, **kwargs):
+        calls.append(kwargs["workers"])
+        return parallel_proof_of_work(*args, **kwargs)
+
+    monkeypatch.setattr(
+        "simple_blockchain.blockchain.parallel_proof_of_work", recording
+    )
+    job = MiningJob(blockchain, lambda last_block, proof: proof, in_process=True)
+    job.start()
+    job.join()
+
+    assert job.status == "done"
+    assert calls == [1]
+    assert Blockchain.validate_proof(
+        blockchain.last_block["proof"],
+        job.result,
+        blockchain.block_hashes[-1],
+    )
+
+
+def test_check_proof_matches_validate_proof():
+    """Tests that the raw-digest check agrees with the hex-based reference rule."""
+    last_hash = Blockchain.hash(Blockchain().last_block)
+    for proof in range(200_000):
+        assert check_proof(100, proof, last_hash) == Blockchain.validate_proof(
+            100, proof, last_hash
+        )
+
+
+def test_search_proof_finds_first_valid_nonce():
+    """Tests that the midstate search returns the same proof as a naive scan."""
+    last_hash = Blockchain.hash(Blockchain().last_block)
+    expected = 0
+    while not Blockchain.validate_proof(100, expected, last_hash):
+        expected += 1
+
+    assert search_proof(100, last_hash, 0, expected + 1) == expected
+    assert search_proof(100, last_hash, 0, expected) is None
+
+
+def test_difficulty_is_configurable():
+    """Tests that the search and the check agree at other difficulties."""
+    last_hash = Blockchain.hash(Blockchain().last_block)
+    for difficulty in (0, 4, 8):
+        proof = search_proof(100, last_hash, 0, 1 << 16, difficulty)
+        assert check_proof(100, proof, last_hash, difficulty)
+        assert Blockchain.validate_proof(100, proof, last_hash, difficulty)
+
+    # Difficulty 0 accepts any proof; more bits never accept more proofs
+    assert search_proof(100, last_hash, 0, 1, 0) == 0
+    assert all(
+        check_proof(100, proof, last_hash, 4)
+        for proof in range(2000)
+        if check_proof(100, proof, last_hash, 8)
+    )
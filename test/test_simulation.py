@@ -0,0 +1,52 @@
+# tests/test_simulation.py
+import pytest
+
+from simple_blockchain.blockchain import Blockchain
+from src.simulation import create_wallets, presign_transactions, run_load
+from test_async_node import RunningNode
+
+
+@pytest.fixture
+def node():
+    running = RunningNode(Blockchain(difficulty=8, target_block_time=None))
+    yield running
+    running.close()
+
+
+@pytest.fixture(scope="module")
+def transactions():
+    return presign_transactions(create_wallets(5), 120)
+
+
+def test_load_at_fixed_rate(node, transactions):
+    """Tests that transactions are sent at the target rate and all accepted."""
+    report = run_load(node.url, transactions[:60], tps=200, senders=4)
+
+    assert report["offered"] == report["accepted"] == 60
+    assert report["rejected"] == report["errors"] == 0
+    # 60 transactions at 200 per second are spread over about 0.3 seconds
+    assert report["elapsed"] >= 0.29
+    assert report["p50_ms"] <= report["p95_ms"] <= report["p99_ms"]
+    assert len(node.node.blockchain.mempool) == 60
+
+
+def test_load_in_batches(node, transactions):
+    """Tests sending as fast as possible through the batch endpoint."""
+    report = run_load(node.url, transactions[60:], tps=0, senders=2, batch_size=25)
+
+    assert report["accepted"] == 60
+    assert report["target_tps"] is None
+
+    # The same transactions again are all rejected as duplicates
+    report = run_load(node.url, transactions[60:], tps=0, senders=2, batch_size=25)
+    assert report["accepted"] == 0
+    assert report["rejection_reasons"] == {"Duplicate transaction": 60}
+
+
+def test_unreachable_node_counts_errors(transactions):
+    """Tests that failed requests are reported as errors, not rejections."""
+    report = run_load("http://127.0.0.1:1", transactions[:5], tps=0, senders=2)
+
+    assert report["errors"] == 5
+    assert report["accepted"] == report["rejected"] == 0
+    assert report["p50_ms"] is None
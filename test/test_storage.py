@@ -0,0 +1,158 @@
+# tests/test_storage.py
+import threading
+
+import pytest
+
+from simple_blockchain import codec
+from simple_blockchain.blockchain import Blockchain
+from simple_blockchain.storage import BlockStore, StoredChain
+
+
+def mine(blockchain: Blockchain, count: int) -> None:
+    """Appends `count` empty blocks with valid proofs."""
+    for _ in range(count):
+        last_block = blockchain.last_block
+        blockchain.new_block(blockchain.proof_of_work(last_block), [])
+
+
+def test_append_read_and_truncate(tmp_path):
+    """Tests that blocks survive reopening the store and can be truncated."""
+    store = BlockStore(str(tmp_path))
+    blocks = [{"index": i, "transactions": [{"amount": i / 3}]} for i in range(1, 6)]
+    hashes = [Blockchain.hash(block) for block in blocks]
+    for block, block_hash in zip(blocks, hashes):
+        store.append(block, block_hash)
+    store.close()
+
+    store = BlockStore(str(tmp_path))
+    assert len(store) == 5
+    assert store.read(2) == blocks[2]
+    # Records hold the canonical binary encoding of the block
+    assert store.read_raw(2) == codec.encode(blocks[2])
+    assert store.read_all() == blocks
+    assert store.hashes() == hashes
+
+    store.truncate(2)
+    store.append(blocks[4], hashes[4])
+    assert store.read_all() == [blocks[0], blocks[1], blocks[4]]
+    assert store.hashes() == [hashes[0], hashes[1], hashes[4]]
+
+
+def test_partial_record_is_dropped(tmp_path):
+    """Tests that a record written without its index entry is discarded on open."""
+    store = BlockStore(str(tmp_path))
+    store.append({"index": 1}, "11" * 32)
+    store.close()
+    with open(tmp_path / "blocks.dat", "ab") as f:
+        f.write(b"\x00\x00\x01\x00{half a blo")
+
+    store = BlockStore(str(tmp_path))
+    assert store.read_all() == [{"index": 1}]
+
+
+def test_restart_replays_chain(tmp_path):
+    """Tests that a node restarted on the same store resumes the same chain."""
+    blockchain = Blockchain(store=BlockStore(str(tmp_path / "node")))
+    mine(blockchain, 2)
+    blockchain.store.close()
+
+    restarted = Blockchain(store=BlockStore(str(tmp_path / "node")))
+    assert restarted.chain == blockchain.chain
+
+    trusted = Blockchain(store=BlockStore(str(tmp_path / "node")), trusted_restart=True)
+    assert trusted.chain == blockchain.chain
+
+
+def test_tampered_store_is_rejected(tmp_path):
+    """Tests that a trusted restart still validates a chain not matching the checkpoint."""
+    blockchain = Blockchain(store=BlockStore(str(tmp_path)))
+    mine(blockchain, 1)
+    tampered = {**blockchain.chain[1], "proof": 0}
+    blockchain.store.truncate(1)
+    blockchain.store.append(tampered, Blockchain.hash(tampered))
+    blockchain.store.close()
+
+    with pytest.raises(ValueError):
+        Blockchain(store=BlockStore(str(tmp_path)), trusted_restart=True)
+
+
+def test_stored_chain_sequence(tmp_path):
+    """Tests that StoredChain indexes, slices and iterates like a list."""
+    store = BlockStore(str(tmp_path))
+    blocks = [{"index": i} for i in range(1, 5)]
+    for block in blocks:
+        store.append(block, Blockchain.hash(block))
+    chain = StoredChain(store)
+
+    assert len(chain) == 4
+    assert chain[0] == blocks[0]
+    assert chain[-1] == blocks[-1]
+    assert chain[1:3] == blocks[1:3]
+    assert list(chain) == blocks
+    with pytest.raises(IndexError):
+        chain[4]
+
+    store.append({"index": 5}, "55" * 32)
+    assert chain[-1] == {"index": 5}
+    store.truncate(4)
+    store.append({"index": 6}, "66" * 32)
+    assert chain[-1] == {"index": 6}
+
+
+def test_mmap_chain_mines_and_restarts(tmp_path):
+    """Tests that a memory-mapped chain mines, persists and restarts like a list."""
+    blockchain = Blockchain(store=BlockStore(str(tmp_path)), mmap_chain=True)
+    mine(blockchain, 2)
+    assert isinstance(blockchain.chain, StoredChain)
+    assert blockchain.last_block["index"] == 3
+    blocks = list(blockchain.chain)
+    blockchain.store.close()
+
+    restarted = Blockchain(store=BlockStore(str(tmp_path)), mmap_chain=True)
+    assert list(restarted.chain) == blocks
+    assert restarted.validate_chain(restarted.chain)
+
+
+def test_shared_store_sees_other_writers(tmp_path):
+    """Tests that a shared store picks up appends and truncations by another one."""
+    first = BlockStore(str(tmp_path), shared=True)
+    second = BlockStore(str(tmp_path), shared=True)
+    blocks = [{"index": i, "transactions": []} for i in range(1, 4)]
+    hashes = [Blockchain.hash(block) for block in blocks]
+
+    with first.locked():
+        first.append(blocks[0], hashes[0])
+        first.append(blocks[1], hashes[1])
+    with second.locked():
+        assert second.refresh()
+        assert second.read_all() == blocks[:2]
+        assert not second.refresh()
+
+    # Replacing the tip keeps the length but must still be noticed
+    with first.locked():
+        first.truncate(1)
+        first.append(blocks[2], hashes[2])
+    with second.locked():
+        assert second.refresh()
+        assert second.hashes() == [hashes[0], hashes[2]]
+        assert second.read(1) == blocks[2]
+
+
+def test_shared_store_lock_is_exclusive(tmp_path):
+    """Tests that a second shared store waits while the first holds the lock."""
+    first = BlockStore(str(tmp_path), shared=True)
+    second = BlockStore(str(tmp_path), shared=True)
+    events = []
+
+    def contend():
+        with second.locked():
+            events.append("second")
+
+    with first.locked():
+        thread = threading.Thread(target=contend)
+        thread.start()
+        thread.join(0.2)
+        events.append("first")
+    thread.join()
+
+    assert events == ["first", "second"]
@@ -1,5 +1,10 @@
 # tests/test_wallet.py
-from simple_blockchain.wallet import Wallet
+from simple_blockchain.wallet import CURVE_ORDER, Wallet
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.utils import (
+    decode_dss_signature,
+    encode_dss_signature,
+)
 import json
 
 
@@ -9,7 +14,8 @@ def test_wallet_creation():
     assert wallet.private_key is not None
     assert wallet.public_key is not None
     assert isinstance(wallet.address, str)
-    assert len(wallet.address) > 100  # PEM format is long
+    assert len(wallet.address) == 40  # 20-byte hash of the public key
+    assert wallet.address == Wallet.address_of(wallet.public_key_hex)
 
 
 def test_sign_and_verify():
@@ -22,7 +28,7 @@ def test_sign_and_verify():
     assert isinstance(signature, str)
 
     # Verification should succeed with the correct data and public key
-    is_valid = Wallet.verify_signature(wallet.address, signature, data_string)
+    is_valid = Wallet.verify_signature(wallet.public_key_hex, signature, data_string)
     assert is_valid is True
 
 
@@ -38,9 +44,59 @@ def test_verify_invalid_signature():
 
     # Fails: Data was changed
     assert (
-        Wallet.verify_signature(wallet1.address, signature, tampered_data_string)
+        Wallet.verify_signature(wallet1.public_key_hex, signature, tampered_data_string)
         is False
     )
 
     # Fails: Signature from a different wallet
-    assert Wallet.verify_signature(wallet2.address, signature, data_string) is False
+    assert (
+        Wallet.verify_signature(wallet2.public_key_hex, signature, data_string) is False
+    )
+
+
+def test_public_keys_are_cached():
+    """Tests that repeated verifications for one sender parse its key only once."""
+    wallet = Wallet()
+    data_string = json.dumps({"message": "cached"}, sort_keys=True)
+    signature = wallet.sign(data_string)
+    before = Wallet.public_key_cache_info()
+
+    assert (
+        Wallet.verify_signature(wallet.public_key_hex, signature, data_string) is True
+    )
+    assert (
+        Wallet.verify_signature(wallet.public_key_hex, signature, data_string) is True
+    )
+
+    after = Wallet.public_key_cache_info()
+    assert after["misses"] == before["misses"] + 1
+    assert after["hits"] == before["hits"] + 1
+
+
+def test_legacy_pem_addresses_still_verify():
+    """Tests that a hex-encoded PEM public key is still accepted as a key."""
+    wallet = Wallet()
+    legacy_address = wallet.public_key.public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo,
+    ).hex()
+    data_string = json.dumps({"message": "legacy"}, sort_keys=True)
+    signature = wallet.sign(data_string)
+
+    assert Wallet.is_legacy_address(legacy_address)
+    assert not Wallet.is_legacy_address(wallet.address)
+    assert Wallet.verify_signature(legacy_address, signature, data_string) is True
+
+
+def test_signatures_have_one_encoding():
+    """Tests that only lowercase, low-s DER signatures verify."""
+    wallet = Wallet()
+    data_string = json.dumps({"message": "canonical"}, sort_keys=True)
+    signature = wallet.sign(data_string)
+    r, s = decode_dss_signature(bytes.fromhex(signature))
+    flipped = encode_dss_signature(r, CURVE_ORDER - s).hex()
+
+    assert s <= CURVE_ORDER // 2
+    assert Wallet.verify_signature(wallet.public_key_hex, signature, data_string)
+    for variant in (signature.upper(), flipped, signature + "00"):
+        assert not Wallet.verify_signature(wallet.public_key_hex, variant, data_string)